@@ -3,7 +3,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from app.core.auth import verify_app_key
-from app.core.batch import create_task, expire_task
+from app.core.batch import register_runner, submit_task
 from app.services.grok.batch_services.assets import ListService, DeleteService
 from app.services.token.manager import get_token_manager
 router = APIRouter()
@@ -16,8 +16,8 @@ async def cache_stats(request: Request):
 
     try:
         cache_service = CacheService()
-        image_stats = cache_service.get_stats("image")
-        video_stats = cache_service.get_stats("video")
+        image_stats = await cache_service.get_stats("image")
+        video_stats = await cache_service.get_stats("video")
 
         mgr = await get_token_manager()
         pools = mgr.pools
@@ -183,7 +183,7 @@ async def list_local(
         if type_:
             cache_type = type_
         cache_service = CacheService()
-        result = cache_service.list_files(cache_type, page, page_size)
+        result = await cache_service.list_files(cache_type, page, page_size)
         return {"status": "success", **result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -198,7 +198,7 @@ async def clear_local(data: dict):
 
     try:
         cache_service = CacheService()
-        result = cache_service.clear(cache_type)
+        result = await cache_service.clear(cache_type)
         return {"status": "success", "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -215,7 +215,7 @@ async def delete_local_item(data: dict):
         raise HTTPException(status_code=400, detail="Missing file name")
     try:
         cache_service = CacheService()
-        result = cache_service.delete_file(cache_type, name)
+        result = await cache_service.delete_file(cache_type, name)
         return {"status": "success", "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -270,7 +270,6 @@ async def clear_online(data: dict):
 @router.post("/cache/online/clear/async", dependencies=[Depends(verify_app_key)])
 async def clear_online_async(data: dict):
     """清理在线缓存（异步批量 + SSE 进度）"""
-    mgr = await get_token_manager()
     tokens = data.get("tokens")
     if not isinstance(tokens, list):
         raise HTTPException(status_code=400, detail="No tokens provided")
@@ -279,71 +278,61 @@ async def clear_online_async(data: dict):
     if not token_list:
         raise HTTPException(status_code=400, detail="No tokens provided")
 
-    task = create_task(len(token_list))
-
-    async def _run():
-        try:
-            async def _on_item(item: str, res: dict):
-                ok = bool(res.get("data", {}).get("ok"))
-                task.record(ok)
+    token_list = list(dict.fromkeys(token_list))
+    task = await submit_task("cache.online_clear", token_list)
 
-            raw_results = await DeleteService.clear_assets(
-                token_list,
-                mgr,
-                include_ok=True,
-                on_item=_on_item,
-                should_cancel=lambda: task.cancelled,
-            )
+    return {
+        "status": "success",
+        "task_id": task.id,
+        "total": len(token_list),
+    }
 
-            if task.cancelled:
-                task.finish_cancelled()
-                return
 
-            results = {}
-            ok_count = 0
-            fail_count = 0
-            for token, res in raw_results.items():
-                data = res.get("data", {})
-                if data.get("ok"):
-                    ok_count += 1
-                    results[token] = {"status": "success", "result": data.get("result")}
-                else:
-                    fail_count += 1
-                    results[token] = {"status": "error", "error": data.get("error")}
-
-            result = {
-                "status": "success",
-                "summary": {
-                    "total": len(token_list),
-                    "ok": ok_count,
-                    "fail": fail_count,
-                },
-                "results": results,
-            }
-            task.finish(result)
-        except Exception as e:
-            task.fail_task(str(e))
-        finally:
-            import asyncio
-            asyncio.create_task(expire_task(task.id, 300))
+async def _clear_online_runner(task, token_list: List[str], params: dict) -> dict:
+    mgr = await get_token_manager()
 
-    import asyncio
-    asyncio.create_task(_run())
+    async def _on_item(item: str, res: dict):
+        ok = bool(res.get("data", {}).get("ok"))
+        task.record(ok, key=item)
+
+    raw_results = await DeleteService.clear_assets(
+        token_list,
+        mgr,
+        include_ok=True,
+        on_item=_on_item,
+        should_cancel=lambda: task.cancelled,
+    )
+
+    if task.cancelled:
+        return {}
+
+    results = {}
+    ok_count = 0
+    fail_count = 0
+    for token, res in raw_results.items():
+        data = res.get("data", {})
+        if data.get("ok"):
+            ok_count += 1
+            results[token] = {"status": "success", "result": data.get("result")}
+        else:
+            fail_count += 1
+            results[token] = {"status": "error", "error": data.get("error")}
 
     return {
         "status": "success",
-        "task_id": task.id,
-        "total": len(token_list),
+        "summary": {
+            "total": len(token_list),
+            "ok": ok_count,
+            "fail": fail_count,
+        },
+        "results": results,
     }
 
 
-@router.post("/cache/online/load/async", dependencies=[Depends(verify_app_key)])
-async def load_cache_async(data: dict):
-    """在线资产统计（异步批量 + SSE 进度）"""
-    from app.services.grok.utils.cache import CacheService
+register_runner("cache.online_clear", _clear_online_runner)
 
-    mgr = await get_token_manager()
 
+def _collect_accounts(mgr) -> List[dict]:
     accounts = []
     for pool_name, pool in mgr.pools.items():
         for info in pool.list():
@@ -362,8 +351,14 @@ async def load_cache_async(data: dict):
                     "last_asset_clear_at": info.last_asset_clear_at,
                 }
             )
+    return accounts
 
-    account_map = {a["token"]: a for a in accounts}
+
+@router.post("/cache/online/load/async", dependencies=[Depends(verify_app_key)])
+async def load_cache_async(data: dict):
+    """在线资产统计（异步批量 + SSE 进度）"""
+    mgr = await get_token_manager()
+    accounts = _collect_accounts(mgr)
 
     tokens = data.get("tokens")
     scope = data.get("scope")
@@ -379,67 +374,68 @@ async def load_cache_async(data: dict):
     else:
         raise HTTPException(status_code=400, detail="No tokens provided")
 
-    task = create_task(len(selected_tokens))
-
-    async def _run():
-        try:
-            cache_service = CacheService()
-            image_stats = cache_service.get_stats("image")
-            video_stats = cache_service.get_stats("video")
-
-            async def _on_item(item: str, res: dict):
-                ok = bool(res.get("data", {}).get("ok"))
-                task.record(ok)
+    selected_tokens = list(dict.fromkeys(selected_tokens))
+    task = await submit_task("cache.online_load", selected_tokens, {"scope": scope})
 
-            raw_results = await ListService.fetch_assets_details(
-                selected_tokens,
-                account_map,
-                include_ok=True,
-                on_item=_on_item,
-                should_cancel=lambda: task.cancelled,
-            )
-
-            if task.cancelled:
-                task.finish_cancelled()
-                return
+    return {
+        "status": "success",
+        "task_id": task.id,
+        "total": len(selected_tokens),
+    }
 
-            online_details = []
-            total = 0
-            for token, res in raw_results.items():
-                data = res.get("data", {})
-                detail = data.get("detail")
-                if detail:
-                    online_details.append(detail)
-                total += data.get("count", 0)
 
-            online_stats = {
-                "count": total,
-                "status": "ok" if selected_tokens else "no_token",
-                "token": None,
-                "last_asset_clear_at": None,
-            }
-
-            result = {
-                "local_image": image_stats,
-                "local_video": video_stats,
-                "online": online_stats,
-                "online_accounts": accounts,
-                "online_scope": scope or "none",
-                "online_details": online_details,
-            }
-            task.finish(result)
-        except Exception as e:
-            task.fail_task(str(e))
-        finally:
-            import asyncio
-            asyncio.create_task(expire_task(task.id, 300))
+async def _load_online_runner(task, selected_tokens: List[str], params: dict) -> dict:
+    from app.services.grok.utils.cache import CacheService
 
-    import asyncio
-    asyncio.create_task(_run())
+    mgr = await get_token_manager()
+    accounts = _collect_accounts(mgr)
+    account_map = {a["token"]: a for a in accounts}
+    scope = params.get("scope")
+
+    cache_service = CacheService()
+    image_stats = await cache_service.get_stats("image")
+    video_stats = await cache_service.get_stats("video")
+
+    async def _on_item(item: str, res: dict):
+        ok = bool(res.get("data", {}).get("ok"))
+        task.record(ok, key=item)
+
+    raw_results = await ListService.fetch_assets_details(
+        selected_tokens,
+        account_map,
+        include_ok=True,
+        on_item=_on_item,
+        should_cancel=lambda: task.cancelled,
+    )
+
+    if task.cancelled:
+        return {}
+
+    online_details = []
+    total = 0
+    for token, res in raw_results.items():
+        data = res.get("data", {})
+        detail = data.get("detail")
+        if detail:
+            online_details.append(detail)
+        total += data.get("count", 0)
+
+    online_stats = {
+        "count": total,
+        "status": "ok" if selected_tokens else "no_token",
+        "token": None,
+        "last_asset_clear_at": None,
+    }
 
     return {
-        "status": "success",
-        "task_id": task.id,
-        "total": len(selected_tokens),
+        "local_image": image_stats,
+        "local_video": video_stats,
+        "online": online_stats,
+        "online_accounts": accounts,
+        "online_scope": scope or "none",
+        "online_details": online_details,
     }
 
+
+register_runner("cache.online_load", _load_online_runner)
+
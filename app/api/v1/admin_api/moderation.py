@@ -2,7 +2,6 @@
 Admin endpoint: Test SSO token for NSFW video moderation.
 """
 
-import orjson
 from typing import Optional
 
 from fastapi import APIRouter, Depends
@@ -12,6 +11,7 @@ from curl_cffi.requests import AsyncSession
 from app.core.config import get_config
 from app.core.logger import logger
 from app.core.auth import verify_app_key
+from app.services.grok.utils.frames import FRAME_VIDEO, iter_frames
 from app.services.reverse.app_chat import AppChatReverse
 
 router = APIRouter()
@@ -68,18 +68,8 @@ async def test_moderation(data: ModerationTestRequest):
                 model_config_override=model_config_override,
             )
 
-            async for line in response:
-                if isinstance(line, bytes):
-                    line = line.decode("utf-8", errors="replace")
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = orjson.loads(line)
-                except Exception:
-                    continue
-
-                r = obj.get("result", {}).get("response", {})
+            async for frame in iter_frames(response):
+                r = frame.resp
 
                 # Check error
                 err_type = r.get("errorType")
@@ -89,7 +79,7 @@ async def test_moderation(data: ModerationTestRequest):
                     return result
 
                 # Check video response
-                vr = r.get("streamingVideoGenerationResponse")
+                vr = frame.payload if frame.kind == FRAME_VIDEO else None
                 if vr and vr.get("progress") == 100:
                     result.moderated = vr.get("moderated")
                     result.mode = vr.get("mode")
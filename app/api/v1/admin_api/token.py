@@ -1,11 +1,9 @@
-import asyncio
-
 import orjson
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from app.core.auth import get_app_key, verify_app_key
-from app.core.batch import create_task, expire_task, get_task
+from app.core.batch import cancel_task, open_stream, register_runner, submit_task
 from app.core.logger import logger
 from app.core.storage import get_storage
 from app.services.grok.batch_services.usage import UsageService
@@ -138,7 +136,6 @@ async def refresh_tokens(data: dict):
 @router.post("/tokens/refresh/async", dependencies=[Depends(verify_app_key)])
 async def refresh_tokens_async(data: dict):
     """刷新 Token 状态（异步批量 + SSE 进度）"""
-    mgr = await get_token_manager()
     tokens = []
     if isinstance(data.get("token"), str) and data["token"].strip():
         tokens.append(data["token"].strip())
@@ -150,64 +147,58 @@ async def refresh_tokens_async(data: dict):
 
     unique_tokens = list(dict.fromkeys(tokens))
 
-    task = create_task(len(unique_tokens))
+    task = await submit_task("tokens.refresh", unique_tokens)
 
-    async def _run():
-        try:
+    return {
+        "status": "success",
+        "task_id": task.id,
+        "total": len(unique_tokens),
+    }
 
-            async def _on_item(item: str, res: dict):
-                task.record(bool(res.get("ok")))
-
-            raw_results = await UsageService.batch(
-                unique_tokens,
-                mgr,
-                on_item=_on_item,
-                should_cancel=lambda: task.cancelled,
-            )
-
-            if task.cancelled:
-                task.finish_cancelled()
-                return
-
-            results: dict[str, bool] = {}
-            ok_count = 0
-            fail_count = 0
-            for token, res in raw_results.items():
-                if res.get("ok") and res.get("data") is True:
-                    ok_count += 1
-                    results[token] = True
-                else:
-                    fail_count += 1
-                    results[token] = False
-
-            await mgr._save(force=True)
-
-            result = {
-                "status": "success",
-                "summary": {
-                    "total": len(unique_tokens),
-                    "ok": ok_count,
-                    "fail": fail_count,
-                },
-                "results": results,
-            }
-            task.finish(result)
-        except Exception as e:
-            task.fail_task(str(e))
-        finally:
-            import asyncio
-            asyncio.create_task(expire_task(task.id, 300))
 
-    import asyncio
-    asyncio.create_task(_run())
+async def _refresh_runner(task, tokens: list[str], params: dict) -> dict:
+    mgr = await get_token_manager()
+
+    async def _on_item(item: str, res: dict):
+        task.record(bool(res.get("ok")), key=item)
+
+    raw_results = await UsageService.batch(
+        tokens,
+        mgr,
+        on_item=_on_item,
+        should_cancel=lambda: task.cancelled,
+    )
+
+    if task.cancelled:
+        return {}
+
+    results: dict[str, bool] = {}
+    ok_count = 0
+    fail_count = 0
+    for token, res in raw_results.items():
+        if res.get("ok") and res.get("data") is True:
+            ok_count += 1
+            results[token] = True
+        else:
+            fail_count += 1
+            results[token] = False
+
+    await mgr._save(force=True)
 
     return {
         "status": "success",
-        "task_id": task.id,
-        "total": len(unique_tokens),
+        "summary": {
+            "total": len(tokens),
+            "ok": ok_count,
+            "fail": fail_count,
+        },
+        "results": results,
     }
 
 
+register_runner("tokens.refresh", _refresh_runner)
+
+
 @router.get("/batch/{task_id}/stream")
 async def batch_stream(task_id: str, request: Request):
     app_key = get_app_key()
@@ -215,46 +206,27 @@ async def batch_stream(task_id: str, request: Request):
         key = request.query_params.get("app_key")
         if key != app_key:
             raise HTTPException(status_code=401, detail="Invalid authentication token")
-    task = get_task(task_id)
-    if not task:
+    stream = await open_stream(task_id)
+    if stream is None:
         raise HTTPException(status_code=404, detail="Task not found")
 
     async def event_stream():
-        queue = task.attach()
         try:
-            yield f"data: {orjson.dumps({'type': 'snapshot', **task.snapshot()}).decode()}\n\n"
-
-            final = task.final_event()
-            if final:
-                yield f"data: {orjson.dumps(final).decode()}\n\n"
-                return
-
-            while True:
-                try:
-                    event = await asyncio.wait_for(queue.get(), timeout=15)
-                except asyncio.TimeoutError:
+            async for event in stream:
+                if event is None:
                     yield ": ping\n\n"
-                    final = task.final_event()
-                    if final:
-                        yield f"data: {orjson.dumps(final).decode()}\n\n"
-                        return
                     continue
-
                 yield f"data: {orjson.dumps(event).decode()}\n\n"
-                if event.get("type") in ("done", "error", "cancelled"):
-                    return
         finally:
-            task.detach(queue)
+            await stream.aclose()
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @router.post("/batch/{task_id}/cancel", dependencies=[Depends(verify_app_key)])
 async def batch_cancel(task_id: str):
-    task = get_task(task_id)
-    if not task:
+    if not await cancel_task(task_id):
         raise HTTPException(status_code=404, detail="Task not found")
-    task.cancel()
     return {"status": "success"}
 
 
@@ -342,61 +314,55 @@ async def enable_nsfw_async(data: dict):
 
     unique_tokens = list(dict.fromkeys(tokens))
 
-    task = create_task(len(unique_tokens))
+    task = await submit_task("tokens.nsfw", unique_tokens)
 
-    async def _run():
-        try:
+    return {
+        "status": "success",
+        "task_id": task.id,
+        "total": len(unique_tokens),
+    }
 
-            async def _on_item(item: str, res: dict):
-                ok = bool(res.get("ok") and res.get("data", {}).get("success"))
-                task.record(ok)
-
-            raw_results = await NSFWService.batch(
-                unique_tokens,
-                mgr,
-                on_item=_on_item,
-                should_cancel=lambda: task.cancelled,
-            )
-
-            if task.cancelled:
-                task.finish_cancelled()
-                return
-
-            results = {}
-            ok_count = 0
-            fail_count = 0
-            for token, res in raw_results.items():
-                masked = f"{token[:8]}...{token[-8:]}" if len(token) > 20 else token
-                if res.get("ok") and res.get("data", {}).get("success"):
-                    ok_count += 1
-                    results[masked] = res.get("data", {})
-                else:
-                    fail_count += 1
-                    results[masked] = res.get("data") or {"error": res.get("error")}
-
-            await mgr._save(force=True)
-
-            result = {
-                "status": "success",
-                "summary": {
-                    "total": len(unique_tokens),
-                    "ok": ok_count,
-                    "fail": fail_count,
-                },
-                "results": results,
-            }
-            task.finish(result)
-        except Exception as e:
-            task.fail_task(str(e))
-        finally:
-            import asyncio
-            asyncio.create_task(expire_task(task.id, 300))
 
-    import asyncio
-    asyncio.create_task(_run())
+async def _nsfw_runner(task, tokens: list[str], params: dict) -> dict:
+    mgr = await get_token_manager()
+
+    async def _on_item(item: str, res: dict):
+        ok = bool(res.get("ok") and res.get("data", {}).get("success"))
+        task.record(ok, key=item)
+
+    raw_results = await NSFWService.batch(
+        tokens,
+        mgr,
+        on_item=_on_item,
+        should_cancel=lambda: task.cancelled,
+    )
+
+    if task.cancelled:
+        return {}
+
+    results = {}
+    ok_count = 0
+    fail_count = 0
+    for token, res in raw_results.items():
+        masked = f"{token[:8]}...{token[-8:]}" if len(token) > 20 else token
+        if res.get("ok") and res.get("data", {}).get("success"):
+            ok_count += 1
+            results[masked] = res.get("data", {})
+        else:
+            fail_count += 1
+            results[masked] = res.get("data") or {"error": res.get("error")}
+
+    await mgr._save(force=True)
 
     return {
         "status": "success",
-        "task_id": task.id,
-        "total": len(unique_tokens),
+        "summary": {
+            "total": len(tokens),
+            "ok": ok_count,
+            "fail": fail_count,
+        },
+        "results": results,
     }
+
+
+register_runner("tokens.nsfw", _nsfw_runner)
@@ -16,11 +16,12 @@ from app.services.grok.services.chat import ChatService
 from app.services.grok.services.image import ImageGenerationService
 from app.services.grok.services.image_edit import ImageEditService
 from app.services.grok.services.model import ModelService
+from app.services.grok.utils.retry import pick_token, no_token_error
 from app.services.grok.services.video import VideoService
 from app.services.grok.utils.response import make_chat_response
 from app.services.token import get_token_manager
 from app.core.config import get_config
-from app.core.exceptions import ValidationException, AppException, ErrorType
+from app.core.exceptions import ValidationException
 
 
 class MessageItem(BaseModel):
@@ -46,6 +47,13 @@ class ImageConfig(BaseModel):
     response_format: Optional[str] = Field(None, description="响应格式")
 
 
+class StreamOptions(BaseModel):
+    """流式输出选项"""
+
+    coalesce_ms: Optional[int] = Field(None, ge=0, le=10000, description="合并 token 的最长等待时间(毫秒)，0 表示逐 token 输出")
+    coalesce_bytes: Optional[int] = Field(None, ge=0, le=65536, description="合并 token 的最大字节数，0 表示不按字节刷新")
+
+
 class ChatCompletionRequest(BaseModel):
     """Chat Completions 请求"""
 
@@ -59,6 +67,8 @@ class ChatCompletionRequest(BaseModel):
     video_config: Optional[VideoConfig] = Field(None, description="视频生成参数")
     # 图片生成配置
     image_config: Optional[ImageConfig] = Field(None, description="图片生成参数")
+    # 流式输出选项
+    stream_options: Optional[StreamOptions] = Field(None, description="流式输出选项")
 
 
 VALID_ROLES = {"developer", "system", "user", "assistant"}
@@ -536,19 +546,9 @@ async def chat_completions(request: ChatCompletionRequest):
         token_mgr = await get_token_manager()
         await token_mgr.reload_if_stale()
 
-        token = None
-        for pool_name in ModelService.pool_candidates_for_model(request.model):
-            token = token_mgr.get_token(pool_name)
-            if token:
-                break
-
+        token = await pick_token(token_mgr, request.model, set())
         if not token:
-            raise AppException(
-                message="No available tokens. Please try again later.",
-                error_type=ErrorType.RATE_LIMIT.value,
-                code="rate_limit_exceeded",
-                status_code=429,
-            )
+            raise no_token_error(token_mgr)
 
         result = await ImageEditService().edit(
             token_mgr=token_mgr,
@@ -598,19 +598,9 @@ async def chat_completions(request: ChatCompletionRequest):
         token_mgr = await get_token_manager()
         await token_mgr.reload_if_stale()
 
-        token = None
-        for pool_name in ModelService.pool_candidates_for_model(request.model):
-            token = token_mgr.get_token(pool_name)
-            if token:
-                break
-
+        token = await pick_token(token_mgr, request.model, set())
         if not token:
-            raise AppException(
-                message="No available tokens. Please try again later.",
-                error_type=ErrorType.RATE_LIMIT.value,
-                code="rate_limit_exceeded",
-                status_code=429,
-            )
+            raise no_token_error(token_mgr)
 
         result = await ImageGenerationService().generate(
             token_mgr=token_mgr,
@@ -660,6 +650,11 @@ async def chat_completions(request: ChatCompletionRequest):
             reasoning_effort=request.reasoning_effort,
             temperature=request.temperature,
             top_p=request.top_p,
+            stream_options=(
+                request.stream_options.model_dump()
+                if request.stream_options
+                else None
+            ),
         )
 
     if isinstance(result, dict):
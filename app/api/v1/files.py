@@ -2,13 +2,20 @@
 文件服务 API 路由
 """
 
-import aiofiles.os
+import re
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from typing import AsyncIterator, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from app.core.logger import logger
 from app.core.storage import DATA_DIR
+from app.services.grok.utils.cache_index import get_cache_index
+from app.services.grok.utils.download import iter_partial
 
 router = APIRouter(tags=["Files"])
 
@@ -18,8 +25,167 @@ IMAGE_DIR = BASE_DIR / "image"
 VIDEO_DIR = BASE_DIR / "video"
 
 
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _image_content_type(file_path: Path) -> str:
+    suffix = file_path.suffix.lower()
+    if suffix == ".png":
+        return "image/png"
+    if suffix == ".webp":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _sniff_content_type(head: bytes) -> Optional[str]:
+    """根据文件头魔数识别类型"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:2] == b"BM":
+        return "image/bmp"
+    if head[4:8] == b"ftyp":
+        return "video/quicktime" if head[8:10] == b"qt" else "video/mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    return None
+
+
+async def _read_head(file_path: Path, size: int = 16) -> bytes:
+    try:
+        async with aiofiles.open(file_path, "rb") as f:
+            return await f.read(size)
+    except OSError:
+        return b""
+
+
+def _not_modified(request: Request, etag: str, mtime: int) -> bool:
+    """条件请求：If-None-Match 优先于 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(parsedate_to_datetime(if_modified_since).timestamp()) >= mtime
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(
+    request: Request, size: int, etag: str, last_modified: str
+) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 请求
+
+    Returns:
+        (start, end) 闭区间；无 Range、多段 Range 或 If-Range 不匹配时返回 None
+
+    Raises:
+        ValueError: 区间无法满足（416）
+    """
+    range_header = request.headers.get("range")
+    if not range_header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (etag, last_modified):
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        # 多段或无法识别的 Range：按规范可以返回完整内容
+        return None
+    start_s, end_s = match.groups()
+    if not start_s and not end_s:
+        return None
+    if start_s:
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    else:
+        # bytes=-N：最后 N 字节
+        suffix = int(end_s)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        start = max(0, size - suffix)
+        end = size - 1
+    end = min(end, size - 1)
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class _WholeFileResponse(FileResponse):
+    """完整文件响应：Range 已由 _parse_range 处理（或忽略），不再让 FileResponse 二次解析"""
+
+    async def __call__(self, scope, receive, send):
+        headers = [(k, v) for k, v in scope["headers"] if k != b"range"]
+        await super().__call__({**scope, "headers": headers}, receive, send)
+
+
+async def _iter_range(file_path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    remaining = end - start + 1
+    async with aiofiles.open(file_path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _serve_file(request: Request, file_path: Path, fallback_type: str) -> Response:
+    """返回缓存文件，支持 ETag / Last-Modified 协商缓存与单段 Range（206）"""
+    stat = await aiofiles.os.stat(file_path)
+    mtime = int(stat.st_mtime)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = formatdate(mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    content_type = _sniff_content_type(await _read_head(file_path)) or fallback_type
+
+    try:
+        byte_range = _parse_range(request, stat.st_size, etag, last_modified)
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{stat.st_size}"},
+        )
+
+    if byte_range is None:
+        return _WholeFileResponse(
+            file_path, media_type=content_type, headers=headers, stat_result=stat
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_range(file_path, start, end),
+        status_code=206,
+        media_type=content_type,
+        headers=headers,
+    )
+
+
 @router.get("/image/{filename:path}")
-async def get_image(filename: str):
+async def get_image(request: Request, filename: str):
     """
     获取图片文件
     """
@@ -30,25 +196,25 @@ async def get_image(filename: str):
 
     if await aiofiles.os.path.exists(file_path):
         if await aiofiles.os.path.isfile(file_path):
-            content_type = "image/jpeg"
-            if file_path.suffix.lower() == ".png":
-                content_type = "image/png"
-            elif file_path.suffix.lower() == ".webp":
-                content_type = "image/webp"
-
+            await get_cache_index().atouch("image", filename)
             # 增加缓存头，支持高并发场景下的浏览器/CDN缓存
-            return FileResponse(
-                file_path,
-                media_type=content_type,
-                headers={"Cache-Control": "public, max-age=31536000, immutable"},
-            )
+            return await _serve_file(request, file_path, _image_content_type(file_path))
+
+    # 尚在下载中：边下载边返回
+    partial = iter_partial("image", filename)
+    if partial is not None:
+        return StreamingResponse(
+            partial,
+            media_type=_image_content_type(file_path),
+            headers={"Cache-Control": "no-cache"},
+        )
 
     logger.warning(f"Image not found: {filename}")
     raise HTTPException(status_code=404, detail="Image not found")
 
 
 @router.get("/video/{filename:path}")
-async def get_video(filename: str):
+async def get_video(request: Request, filename: str):
     """
     获取视频文件
     """
@@ -59,11 +225,16 @@ async def get_video(filename: str):
 
     if await aiofiles.os.path.exists(file_path):
         if await aiofiles.os.path.isfile(file_path):
-            return FileResponse(
-                file_path,
-                media_type="video/mp4",
-                headers={"Cache-Control": "public, max-age=31536000, immutable"},
-            )
+            await get_cache_index().atouch("video", filename)
+            return await _serve_file(request, file_path, "video/mp4")
+
+    partial = iter_partial("video", filename)
+    if partial is not None:
+        return StreamingResponse(
+            partial,
+            media_type="video/mp4",
+            headers={"Cache-Control": "no-cache"},
+        )
 
     logger.warning(f"Video not found: {filename}")
     raise HTTPException(status_code=404, detail="Video not found")
@@ -2,7 +2,6 @@
 Image Generation API 路由
 """
 
-import base64
 import time
 from pathlib import Path
 from typing import List, Optional, Union
@@ -14,13 +13,18 @@ from pydantic import BaseModel, Field, ValidationError
 from app.services.grok.services.image import ImageGenerationService
 from app.services.grok.services.image_edit import ImageEditService
 from app.services.grok.services.model import ModelService
+from app.services.grok.utils.retry import pick_token, no_token_error
+from app.services.grok.utils.spool import UploadSpool, upload_max_bytes
 from app.services.token import get_token_manager
-from app.core.exceptions import ValidationException, AppException, ErrorType
+from app.core.exceptions import ValidationException
 from app.core.config import get_config
 
 
 router = APIRouter(tags=["Images"])
 
+MAX_EDIT_IMAGE_BYTES = 50 * 1024 * 1024
+UPLOAD_READ_SIZE = 64 * 1024
+
 ALLOWED_IMAGE_SIZES = {
     "1280x720",
     "720x1280",
@@ -228,19 +232,9 @@ async def _get_token(model: str):
     token_mgr = await get_token_manager()
     await token_mgr.reload_if_stale()
 
-    token = None
-    for pool_name in ModelService.pool_candidates_for_model(model):
-        token = token_mgr.get_token(pool_name)
-        if token:
-            break
-
+    token = await pick_token(token_mgr, model, set())
     if not token:
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_token_error(token_mgr)
 
     return token_mgr, token
 
@@ -372,59 +366,33 @@ async def edit_image(
     # 参数验证
     validate_edit_request(edit_request, image)
 
-    max_image_bytes = 50 * 1024 * 1024
+    # 单图上限 50MB，全局 asset.upload_max_mb 更小时以其为准
+    max_image_bytes = min(MAX_EDIT_IMAGE_BYTES, upload_max_bytes() or MAX_EDIT_IMAGE_BYTES)
     allowed_types = {"image/png", "image/jpeg", "image/webp", "image/jpg"}
 
-    images: List[str] = []
-    for item in image:
-        content = await item.read()
-        await item.close()
-        if not content:
-            raise ValidationException(
-                message="File content is empty",
-                param="image",
-                code="empty_file",
-            )
-        if len(content) > max_image_bytes:
-            raise ValidationException(
-                message="Image file too large. Maximum is 50MB.",
-                param="image",
-                code="file_too_large",
-            )
-        mime = (item.content_type or "").lower()
-        if mime == "image/jpg":
-            mime = "image/jpeg"
-        ext = Path(item.filename or "").suffix.lower()
-        if mime not in allowed_types:
-            if ext in (".jpg", ".jpeg"):
-                mime = "image/jpeg"
-            elif ext == ".png":
-                mime = "image/png"
-            elif ext == ".webp":
-                mime = "image/webp"
-            else:
-                raise ValidationException(
-                    message="Unsupported image type. Supported: png, jpg, webp.",
-                    param="image",
-                    code="invalid_image_type",
-                )
-        b64 = base64.b64encode(content).decode()
-        images.append(f"data:{mime};base64,{b64}")
-
-    # 获取 token 和模型信息
-    token_mgr, token = await _get_token(edit_request.model)
-    model_info = ModelService.get(edit_request.model)
-
-    result = await ImageEditService().edit(
-        token_mgr=token_mgr,
-        token=token,
-        model_info=model_info,
-        prompt=edit_request.prompt,
-        images=images,
-        n=edit_request.n,
-        response_format=response_format,
-        stream=bool(edit_request.stream),
-    )
+    images: List[UploadSpool] = []
+    try:
+        for item in image:
+            images.append(await _spool_upload(item, max_image_bytes, allowed_types))
+
+        # 获取 token 和模型信息
+        token_mgr, token = await _get_token(edit_request.model)
+        model_info = ModelService.get(edit_request.model)
+
+        # 上传在 edit 返回前完成，之后即可释放暂存文件
+        result = await ImageEditService().edit(
+            token_mgr=token_mgr,
+            token=token,
+            model_info=model_info,
+            prompt=edit_request.prompt,
+            images=images,
+            n=edit_request.n,
+            response_format=response_format,
+            stream=bool(edit_request.stream),
+        )
+    finally:
+        for spool in images:
+            spool.close()
 
     if result.stream:
         return StreamingResponse(
@@ -449,4 +417,57 @@ async def edit_image(
     )
 
 
+async def _spool_upload(
+    item: UploadFile, max_bytes: int, allowed_types: set
+) -> UploadSpool:
+    """校验上传图片并分块写入暂存区（超出阈值落盘），避免整文件读入内存"""
+    try:
+        mime = (item.content_type or "").lower()
+        if mime == "image/jpg":
+            mime = "image/jpeg"
+        ext = Path(item.filename or "").suffix.lower()
+        if mime not in allowed_types:
+            if ext in (".jpg", ".jpeg"):
+                mime = "image/jpeg"
+            elif ext == ".png":
+                mime = "image/png"
+            elif ext == ".webp":
+                mime = "image/webp"
+            else:
+                raise ValidationException(
+                    message="Unsupported image type. Supported: png, jpg, webp.",
+                    param="image",
+                    code="invalid_image_type",
+                )
+        spool = UploadSpool(item.filename or "image", mime, max_bytes=max_bytes)
+        try:
+            while True:
+                chunk = await item.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                spool.write(chunk)
+        except ValidationException as e:
+            spool.close()
+            if e.code == "file_too_large":
+                raise ValidationException(
+                    message=f"Image file too large. Maximum is {max_bytes // (1024 * 1024)}MB.",
+                    param="image",
+                    code="file_too_large",
+                )
+            raise
+        except BaseException:
+            spool.close()
+            raise
+        if not spool.size:
+            spool.close()
+            raise ValidationException(
+                message="File content is empty",
+                param="image",
+                code="empty_file",
+            )
+        return spool
+    finally:
+        await item.close()
+
+
 __all__ = ["router"]
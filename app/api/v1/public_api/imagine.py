@@ -4,7 +4,7 @@ import uuid
 from typing import Optional, List, Dict, Any
 
 import orjson
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
@@ -12,25 +12,19 @@ from app.core.auth import verify_public_key, get_public_api_key, is_public_enabl
 from app.core.config import get_config
 from app.core.logger import logger
 from app.api.v1.image import resolve_aspect_ratio
+from app.api.v1.public_api.sessions import (
+    apply_sticky_hint,
+    drop_sessions,
+    get_session,
+    new_session,
+)
 from app.services.grok.services.image import ImageGenerationService
 from app.services.grok.services.model import ModelService
 from app.services.token.manager import get_token_manager
 
 router = APIRouter()
 
-IMAGINE_SESSION_TTL = 600
-_IMAGINE_SESSIONS: dict[str, dict] = {}
-_IMAGINE_SESSIONS_LOCK = asyncio.Lock()
-
-
-async def _clean_sessions(now: float) -> None:
-    expired = [
-        key
-        for key, info in _IMAGINE_SESSIONS.items()
-        if now - float(info.get("created_at") or 0) > IMAGINE_SESSION_TTL
-    ]
-    for key in expired:
-        _IMAGINE_SESSIONS.pop(key, None)
+_SESSION_KIND = "imagine"
 
 
 def _parse_sse_chunk(chunk: str) -> Optional[Dict[str, Any]]:
@@ -62,52 +56,22 @@ def _parse_sse_chunk(chunk: str) -> Optional[Dict[str, Any]]:
 
 
 async def _new_session(prompt: str, aspect_ratio: str, nsfw: Optional[bool]) -> str:
-    task_id = uuid.uuid4().hex
-    now = time.time()
-    async with _IMAGINE_SESSIONS_LOCK:
-        await _clean_sessions(now)
-        _IMAGINE_SESSIONS[task_id] = {
-            "prompt": prompt,
-            "aspect_ratio": aspect_ratio,
-            "nsfw": nsfw,
-            "created_at": now,
-        }
-    return task_id
+    return await new_session(
+        _SESSION_KIND,
+        {"prompt": prompt, "aspect_ratio": aspect_ratio, "nsfw": nsfw},
+    )
 
 
 async def _get_session(task_id: str) -> Optional[dict]:
-    if not task_id:
-        return None
-    now = time.time()
-    async with _IMAGINE_SESSIONS_LOCK:
-        await _clean_sessions(now)
-        info = _IMAGINE_SESSIONS.get(task_id)
-        if not info:
-            return None
-        created_at = float(info.get("created_at") or 0)
-        if now - created_at > IMAGINE_SESSION_TTL:
-            _IMAGINE_SESSIONS.pop(task_id, None)
-            return None
-        return dict(info)
+    return await get_session(_SESSION_KIND, task_id)
 
 
 async def _drop_session(task_id: str) -> None:
-    if not task_id:
-        return
-    async with _IMAGINE_SESSIONS_LOCK:
-        _IMAGINE_SESSIONS.pop(task_id, None)
+    await drop_sessions(_SESSION_KIND, [task_id])
 
 
 async def _drop_sessions(task_ids: List[str]) -> int:
-    if not task_ids:
-        return 0
-    removed = 0
-    async with _IMAGINE_SESSIONS_LOCK:
-        for task_id in task_ids:
-            if task_id and task_id in _IMAGINE_SESSIONS:
-                _IMAGINE_SESSIONS.pop(task_id, None)
-                removed += 1
-    return removed
+    return await drop_sessions(_SESSION_KIND, task_ids)
 
 
 @router.websocket("/imagine/ws")
@@ -486,12 +450,13 @@ class ImagineStartRequest(BaseModel):
 
 
 @router.post("/imagine/start", dependencies=[Depends(verify_public_key)])
-async def public_imagine_start(data: ImagineStartRequest):
+async def public_imagine_start(data: ImagineStartRequest, response: Response):
     prompt = (data.prompt or "").strip()
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
     ratio = resolve_aspect_ratio(str(data.aspect_ratio or "2:3").strip() or "2:3")
     task_id = await _new_session(prompt, ratio, data.nsfw)
+    apply_sticky_hint(response)
     return {"task_id": task_id, "aspect_ratio": ratio}
 
 
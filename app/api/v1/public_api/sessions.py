@@ -0,0 +1,198 @@
+"""
+Public imagine/video session registry.
+
+``/imagine/start`` and ``/video/start`` register a short-lived session that
+the follow-up ``/sse`` or ``/ws`` request consumes. The registry is either
+in-process (a dict with an expiry heap) or shared through the storage
+backend (a Redis hash per session with a native TTL). ``app.public_session_store``
+picks one: "memory", "storage", or "auto" (storage when the backend is Redis).
+
+When sessions are shared, every lookup reads the backend, so a session
+dropped by ``/stop`` on one worker is gone for the SSE/WS loop on every
+other worker. When they are not shared, start responses carry a sticky
+routing hint (``X-Grok2API-Worker`` header and ``grok2api_worker`` cookie)
+so a load balancer can pin the follow-up request to the same worker.
+"""
+
+import hashlib
+import heapq
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Response
+
+from app.core.config import get_config
+from app.core.logger import logger
+from app.core.storage import RedisStorage, get_storage
+
+DEFAULT_SESSION_TTL = 600
+DEFAULT_SESSION_STORE = "auto"
+WORKER_HEADER = "X-Grok2API-Worker"
+WORKER_COOKIE = "grok2api_worker"
+
+_WORKER_ID = hashlib.sha1(
+    f"{socket.gethostname()}:{os.getpid()}".encode()
+).hexdigest()[:12]
+
+
+def session_ttl() -> int:
+    try:
+        return max(1, int(get_config("app.public_session_ttl", DEFAULT_SESSION_TTL)))
+    except (TypeError, ValueError):
+        return DEFAULT_SESSION_TTL
+
+
+class MemorySessionRegistry:
+    """In-process registry; an expiry heap replaces full scans on every access."""
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], Tuple[dict, float]] = {}
+        self._heap: List[Tuple[float, Tuple[str, str]]] = []
+
+    def _evict(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._sessions.get(key)
+            if entry and entry[1] == expires_at:
+                del self._sessions[key]
+
+    async def put(self, kind: str, task_id: str, info: dict, ttl: int):
+        now = time.time()
+        expires_at = now + ttl
+        self._sessions[(kind, task_id)] = (dict(info), expires_at)
+        heapq.heappush(self._heap, (expires_at, (kind, task_id)))
+        self._evict(now)
+
+    async def get(self, kind: str, task_id: str) -> Optional[dict]:
+        now = time.time()
+        self._evict(now)
+        entry = self._sessions.get((kind, task_id))
+        if not entry or entry[1] <= now:
+            return None
+        return dict(entry[0])
+
+    async def drop(self, kind: str, task_ids: List[str]) -> int:
+        removed = 0
+        for task_id in task_ids:
+            if task_id and self._sessions.pop((kind, task_id), None):
+                removed += 1
+        return removed
+
+
+def _backend_shares_sessions() -> bool:
+    return isinstance(get_storage(), RedisStorage)
+
+
+class StorageSessionRegistry:
+    """
+    Registry shared through the storage backend.
+
+    The backend is the source of truth when it shares sessions; the local map
+    only serves backends that do not (they keep sessions per worker).
+    """
+
+    def __init__(self):
+        self._local = MemorySessionRegistry()
+
+    @property
+    def shared(self) -> bool:
+        return _backend_shares_sessions()
+
+    async def put(self, kind: str, task_id: str, info: dict, ttl: int):
+        if not self.shared:
+            await self._local.put(kind, task_id, info, ttl)
+            return
+        try:
+            await get_storage().set_public_session(kind, task_id, info, ttl)
+        except Exception as e:
+            logger.debug(f"Public session store failed: {e}")
+
+    async def get(self, kind: str, task_id: str) -> Optional[dict]:
+        if not self.shared:
+            return await self._local.get(kind, task_id)
+        # Always ask the backend: a copy cached here would outlive a drop
+        # made by another worker (e.g. /imagine/stop) until its TTL expires
+        try:
+            info = await get_storage().get_public_session(kind, task_id)
+        except Exception as e:
+            logger.debug(f"Public session lookup failed: {e}")
+            return None
+        if not info:
+            return None
+        remaining = session_ttl() - (time.time() - float(info.get("created_at") or 0))
+        if remaining <= 0:
+            return None
+        return dict(info)
+
+    async def drop(self, kind: str, task_ids: List[str]) -> int:
+        if not self.shared:
+            return await self._local.drop(kind, task_ids)
+        try:
+            return await get_storage().delete_public_sessions(kind, task_ids)
+        except Exception as e:
+            logger.debug(f"Public session delete failed: {e}")
+            return 0
+
+
+_REGISTRIES: Dict[str, object] = {}
+
+
+def get_session_registry():
+    """Return the registry selected by ``app.public_session_store``."""
+    kind = str(get_config("app.public_session_store", DEFAULT_SESSION_STORE) or "").lower()
+    if kind not in ("memory", "storage"):
+        kind = "storage" if isinstance(get_storage(), RedisStorage) else "memory"
+    registry = _REGISTRIES.get(kind)
+    if registry is None:
+        registry = MemorySessionRegistry() if kind == "memory" else StorageSessionRegistry()
+        _REGISTRIES[kind] = registry
+    return registry
+
+
+async def new_session(kind: str, info: dict) -> str:
+    task_id = uuid.uuid4().hex
+    data = dict(info)
+    data["created_at"] = time.time()
+    data["worker"] = _WORKER_ID
+    await get_session_registry().put(kind, task_id, data, session_ttl())
+    return task_id
+
+
+async def get_session(kind: str, task_id: str) -> Optional[dict]:
+    if not task_id:
+        return None
+    return await get_session_registry().get(kind, task_id)
+
+
+async def drop_sessions(kind: str, task_ids: List[str]) -> int:
+    task_ids = [task_id for task_id in (task_ids or []) if task_id]
+    if not task_ids:
+        return 0
+    return await get_session_registry().drop(kind, task_ids)
+
+
+def apply_sticky_hint(response: Response):
+    """Tag a response with this worker's id for sticky load balancing.
+
+    Skipped when sessions are shared, since any worker can serve the follow-up.
+    """
+    registry = get_session_registry()
+    if isinstance(registry, StorageSessionRegistry) and registry.shared:
+        return
+    response.headers[WORKER_HEADER] = _WORKER_ID
+    response.set_cookie(
+        WORKER_COOKIE, _WORKER_ID, max_age=session_ttl(), httponly=True, samesite="lax"
+    )
+
+
+__all__ = [
+    "get_session_registry",
+    "new_session",
+    "get_session",
+    "drop_sessions",
+    "apply_sticky_hint",
+]
@@ -1,24 +1,25 @@
-import asyncio
-import time
-import uuid
 from typing import Optional, List, Dict, Any
 
 import orjson
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.core.auth import verify_public_key
 from app.core.logger import logger
 from app.core.exceptions import AppException
+from app.api.v1.public_api.sessions import (
+    apply_sticky_hint,
+    drop_sessions,
+    get_session,
+    new_session,
+)
 from app.services.grok.services.video import VideoService
 from app.services.grok.services.model import ModelService
 
 router = APIRouter()
 
-VIDEO_SESSION_TTL = 600
-_VIDEO_SESSIONS: dict[str, dict] = {}
-_VIDEO_SESSIONS_LOCK = asyncio.Lock()
+_SESSION_KIND = "video"
 
 _VIDEO_RATIO_MAP = {
     "1280x720": "16:9",
@@ -34,16 +35,6 @@ _VIDEO_RATIO_MAP = {
 }
 
 
-async def _clean_sessions(now: float) -> None:
-    expired = [
-        key
-        for key, info in _VIDEO_SESSIONS.items()
-        if now - float(info.get("created_at") or 0) > VIDEO_SESSION_TTL
-    ]
-    for key in expired:
-        _VIDEO_SESSIONS.pop(key, None)
-
-
 async def _new_session(
     prompt: str,
     aspect_ratio: str,
@@ -54,11 +45,9 @@ async def _new_session(
     parent_post_id: Optional[str],
     reasoning_effort: Optional[str],
 ) -> str:
-    task_id = uuid.uuid4().hex
-    now = time.time()
-    async with _VIDEO_SESSIONS_LOCK:
-        await _clean_sessions(now)
-        _VIDEO_SESSIONS[task_id] = {
+    return await new_session(
+        _SESSION_KIND,
+        {
             "prompt": prompt,
             "aspect_ratio": aspect_ratio,
             "video_length": video_length,
@@ -67,44 +56,20 @@ async def _new_session(
             "image_url": image_url,
             "parent_post_id": parent_post_id,
             "reasoning_effort": reasoning_effort,
-            "created_at": now,
-        }
-    return task_id
+        },
+    )
 
 
 async def _get_session(task_id: str) -> Optional[dict]:
-    if not task_id:
-        return None
-    now = time.time()
-    async with _VIDEO_SESSIONS_LOCK:
-        await _clean_sessions(now)
-        info = _VIDEO_SESSIONS.get(task_id)
-        if not info:
-            return None
-        created_at = float(info.get("created_at") or 0)
-        if now - created_at > VIDEO_SESSION_TTL:
-            _VIDEO_SESSIONS.pop(task_id, None)
-            return None
-        return dict(info)
+    return await get_session(_SESSION_KIND, task_id)
 
 
 async def _drop_session(task_id: str) -> None:
-    if not task_id:
-        return
-    async with _VIDEO_SESSIONS_LOCK:
-        _VIDEO_SESSIONS.pop(task_id, None)
+    await drop_sessions(_SESSION_KIND, [task_id])
 
 
 async def _drop_sessions(task_ids: List[str]) -> int:
-    if not task_ids:
-        return 0
-    removed = 0
-    async with _VIDEO_SESSIONS_LOCK:
-        for task_id in task_ids:
-            if task_id and task_id in _VIDEO_SESSIONS:
-                _VIDEO_SESSIONS.pop(task_id, None)
-                removed += 1
-    return removed
+    return await drop_sessions(_SESSION_KIND, task_ids)
 
 
 def _normalize_ratio(value: Optional[str]) -> str:
@@ -139,7 +104,7 @@ class VideoStartRequest(BaseModel):
 
 
 @router.post("/video/start", dependencies=[Depends(verify_public_key)])
-async def public_video_start(data: VideoStartRequest):
+async def public_video_start(data: VideoStartRequest, response: Response):
     prompt = (data.prompt or "").strip()
     image_url = (data.image_url or "").strip() or None
     parent_post_id = (data.parent_post_id or data.parentPostId or "").strip() or None
@@ -201,6 +166,7 @@ async def public_video_start(data: VideoStartRequest):
         parent_post_id,
         reasoning_effort,
     )
+    apply_sticky_hint(response)
     return {"task_id": task_id, "aspect_ratio": aspect_ratio}
 
 
@@ -1,19 +1,47 @@
 """
 Batch utilities.
 
-- run_batch: generic batch concurrency runner
+- run_batch: generic sliding-window concurrency runner
 - BatchTask: SSE task manager for admin batch operations
+- Batch engine: submit/cancel/stream/resume tasks; state is persisted to the
+  configured storage so progress and cancel work from any worker and tasks
+  interrupted by a restart resume from their cursor
 """
 
 import asyncio
+import os
+import socket
 import time
 import uuid
-from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from contextlib import suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
 
 from app.core.logger import logger
+from app.core.storage import get_storage
 
 T = TypeVar("T")
 
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# 运行中任务状态的保留时间（秒）
+RUNNING_TTL = 86400
+# 结束后任务状态的保留时间（秒）
+FINISHED_TTL = 300
+# 进度广播间隔（秒）
+PUBLISH_INTERVAL_SEC = 0.5
+# 状态持久化 / 心跳间隔（秒）
+PERSIST_INTERVAL_SEC = 2.0
+# 心跳超过该时长的运行中任务视为失去归属，可被接管（秒）
+HEARTBEAT_STALE_SEC = 30
+# 扫描可接管任务的间隔（秒）
+RESUME_INTERVAL_SEC = 30
+# 跨 Worker 订阅时轮询状态的间隔（秒）
+POLL_INTERVAL_SEC = 1.0
+# SSE 心跳间隔（秒）
+PING_INTERVAL_SEC = 15
+
+FINAL_EVENT_TYPES = ("done", "error", "cancelled")
+
 
 async def run_batch(
     items: List[str],
@@ -25,15 +53,15 @@ async def run_batch(
     should_cancel: Optional[Callable[[], bool]] = None,
 ) -> Dict[str, Dict[str, Any]]:
     """
-    分批并发执行，单项失败不影响整体
+    滑动窗口并发执行，单项失败不影响整体
 
     Args:
         items: 待处理项列表
         worker: 异步处理函数
-        batch_size: 每批大小
+        batch_size: 并发窗口大小（任一项完成即补入下一项，不等待整批）
 
     Returns:
-        {item: {"ok": bool, "data": ..., "error": ...}}
+        {item: {"ok": bool, "data": ..., "error": ...}}（按输入顺序）
     """
     try:
         batch_size = int(batch_size)
@@ -42,14 +70,17 @@ async def run_batch(
 
     batch_size = max(1, batch_size)
 
+    def _cancelled() -> bool:
+        return bool((should_cancel and should_cancel()) or (task and task.cancelled))
+
     async def _one(item: str) -> tuple[str, dict]:
-        if (should_cancel and should_cancel()) or (task and task.cancelled):
+        if _cancelled():
             return item, {"ok": False, "error": "cancelled", "cancelled": True}
         try:
             data = await worker(item)
             result = {"ok": True, "data": data}
             if task:
-                task.record(True)
+                task.record(True, key=item)
             if on_item:
                 try:
                     await on_item(item, result)
@@ -60,7 +91,7 @@ async def run_batch(
             logger.warning(f"Batch item failed: {item[:16]}... - {e}")
             result = {"ok": False, "error": str(e)}
             if task:
-                task.record(False, error=str(e))
+                task.record(False, error=str(e), key=item)
             if on_item:
                 try:
                     await on_item(item, result)
@@ -69,21 +100,35 @@ async def run_batch(
             return item, result
 
     results: Dict[str, dict] = {}
+    pending = iter(items)
 
-    # 分批执行，避免一次性创建所有 task
-    for i in range(0, len(items), batch_size):
-        if (should_cancel and should_cancel()) or (task and task.cancelled):
-            break
-        chunk = items[i : i + batch_size]
-        pairs = await asyncio.gather(*(_one(x) for x in chunk))
-        results.update(dict(pairs))
+    # 固定数量的 worker 共享同一个迭代器：慢项只占一个槽位，不阻塞后续项
+    async def _lane():
+        for item in pending:
+            if _cancelled():
+                return
+            key, result = await _one(item)
+            results[key] = result
 
-    return results
+    await asyncio.gather(*(_lane() for _ in range(min(batch_size, len(items)))))
+
+    return {item: results[item] for item in items if item in results}
 
 
 class BatchTask:
-    def __init__(self, total: int):
-        self.id = uuid.uuid4().hex
+    def __init__(
+        self,
+        total: int,
+        *,
+        kind: str = "",
+        items: Optional[List[str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        task_id: Optional[str] = None,
+    ):
+        self.id = task_id or uuid.uuid4().hex
+        self.kind = kind
+        self.items = items
+        self.params = params or {}
         self.total = int(total)
         self.processed = 0
         self.ok = 0
@@ -93,8 +138,16 @@ class BatchTask:
         self.result: Optional[Dict[str, Any]] = None
         self.error: Optional[str] = None
         self.created_at = time.time()
+        # 游标：items[:cursor] 均已完成；窗口内提前完成的项记录在 _done_ahead
+        self.cursor = 0
+        self.resumed_from: Optional[int] = None
+        self._done_ahead: set = set()
+        self._index: Optional[Dict[str, int]] = None
+        # 每次状态变化递增，用于判断是否需要广播/持久化
+        self.version = 0
         self._queues: List[asyncio.Queue] = []
         self._final_event: Optional[Dict[str, Any]] = None
+        self._driver: Optional[asyncio.Task] = None
         self.cancelled = False
 
     def snapshot(self) -> Dict[str, Any]:
@@ -108,6 +161,64 @@ class BatchTask:
             "warning": self.warning,
         }
 
+    def state(self) -> Dict[str, Any]:
+        """可持久化的任务状态（不含处理项）"""
+        return {
+            **self.snapshot(),
+            "kind": self.kind,
+            "params": self.params,
+            "error": self.error,
+            "created_at": self.created_at,
+            "cursor": self.cursor,
+            "done_ahead": sorted(self._done_ahead),
+            "resumed_from": self.resumed_from,
+            "cancel_requested": self.cancelled,
+            "final": self._final_event,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "BatchTask":
+        """从持久化状态恢复（用于接管中断的任务）"""
+        task = cls(
+            int(state.get("total") or 0),
+            kind=state.get("kind") or "",
+            items=list(state.get("items") or []),
+            params=state.get("params") or {},
+            task_id=state.get("task_id"),
+        )
+        task.processed = int(state.get("processed") or 0)
+        task.ok = int(state.get("ok") or 0)
+        task.fail = int(state.get("fail") or 0)
+        task.warning = state.get("warning")
+        task.created_at = float(state.get("created_at") or task.created_at)
+        task.cursor = int(state.get("cursor") or 0)
+        task._done_ahead = {int(i) for i in state.get("done_ahead") or []}
+        task.resumed_from = task.cursor
+        task.cancelled = bool(state.get("cancel_requested"))
+        return task
+
+    def pending_items(self) -> List[str]:
+        """尚未完成的处理项（从游标开始，跳过窗口内已完成的项）"""
+        items = self.items or []
+        return [
+            item
+            for index, item in enumerate(items[self.cursor :], self.cursor)
+            if index not in self._done_ahead
+        ]
+
+    def _advance(self, key: str) -> None:
+        if not self.items:
+            return
+        if self._index is None:
+            self._index = {item: i for i, item in enumerate(self.items)}
+        index = self._index.get(key)
+        if index is None or index < self.cursor:
+            return
+        self._done_ahead.add(index)
+        while self.cursor in self._done_ahead:
+            self._done_ahead.discard(self.cursor)
+            self.cursor += 1
+
     def attach(self) -> asyncio.Queue:
         q: asyncio.Queue = asyncio.Queue(maxsize=200)
         self._queues.append(q)
@@ -118,6 +229,7 @@ class BatchTask:
             self._queues.remove(q)
 
     def _publish(self, event: Dict[str, Any]) -> None:
+        self.version += 1
         for q in list(self._queues):
             try:
                 q.put_nowait(event)
@@ -125,15 +237,8 @@ class BatchTask:
                 # Drop if queue is full or closed
                 pass
 
-    def record(
-        self, ok: bool, *, item: Any = None, detail: Any = None, error: str = ""
-    ) -> None:
-        self.processed += 1
-        if ok:
-            self.ok += 1
-        else:
-            self.fail += 1
-        event: Dict[str, Any] = {
+    def progress_event(self) -> Dict[str, Any]:
+        return {
             "type": "progress",
             "task_id": self.id,
             "total": self.total,
@@ -141,6 +246,24 @@ class BatchTask:
             "ok": self.ok,
             "fail": self.fail,
         }
+
+    def record(
+        self,
+        ok: bool,
+        *,
+        item: Any = None,
+        detail: Any = None,
+        error: str = "",
+        key: Optional[str] = None,
+    ) -> None:
+        self.processed += 1
+        if ok:
+            self.ok += 1
+        else:
+            self.fail += 1
+        if key is not None:
+            self._advance(key)
+        event = self.progress_event()
         if item is not None:
             event["item"] = item
         if detail is not None:
@@ -201,10 +324,15 @@ class BatchTask:
         return self._final_event
 
 
+Runner = Callable[[BatchTask, List[str], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
 _TASKS: Dict[str, BatchTask] = {}
+_RUNNERS: Dict[str, Runner] = {}
+_RESUME_TASK: Optional[asyncio.Task] = None
 
 
 def create_task(total: int) -> BatchTask:
+    """创建仅存在于本进程的任务（不持久化、不可接管）"""
     task = BatchTask(total)
     _TASKS[task.id] = task
     return task
@@ -223,6 +351,306 @@ async def expire_task(task_id: str, delay: int = 300) -> None:
     delete_task(task_id)
 
 
+def register_runner(kind: str, runner: Runner) -> None:
+    """
+    注册任务类型的执行函数
+
+    runner(task, items, params) 处理 items（接管时为剩余项），每项完成后调用
+    task.record(ok, key=item) 推进游标，返回最终结果；取消时返回值被忽略。
+    """
+    _RUNNERS[kind] = runner
+
+
+async def _save_state(task: BatchTask, items: Optional[List[str]] = None) -> None:
+    state = task.state()
+    state["owner"] = WORKER_ID
+    state["heartbeat"] = time.time()
+    ttl = RUNNING_TTL if task.status == "running" else FINISHED_TTL
+    try:
+        await get_storage().save_batch_task(task.id, state, ttl, items=items)
+    except Exception as e:
+        logger.warning(f"Batch task persist failed: {task.id} - {e}")
+
+
+async def _pump(task: BatchTask) -> None:
+    """定期广播进度、持久化状态（兼作心跳），并接收其他 Worker 发起的取消"""
+    storage = get_storage()
+    published = task.version
+    saved_at = time.monotonic()
+    while True:
+        await asyncio.sleep(PUBLISH_INTERVAL_SEC)
+        if task.version != published:
+            published = task.version
+            with suppress(Exception):
+                await storage.publish_batch_event(task.id, task.progress_event())
+        if time.monotonic() - saved_at < PERSIST_INTERVAL_SEC:
+            continue
+        saved_at = time.monotonic()
+        with suppress(Exception):
+            stored = await storage.load_batch_task(task.id)
+            if stored and stored.get("cancel_requested"):
+                task.cancel()
+        await _save_state(task)
+
+
+async def _drive(task: BatchTask, runner: Runner, items: List[str]) -> None:
+    pump = asyncio.create_task(_pump(task))
+    try:
+        result = await runner(task, items, task.params)
+        if task.cancelled:
+            task.finish_cancelled()
+        else:
+            if task.resumed_from is not None and isinstance(result, dict):
+                result.setdefault("resumed_from", task.resumed_from)
+            task.finish(result)
+    except Exception as e:
+        logger.warning(f"Batch task failed: {task.kind} {task.id} - {e}")
+        task.fail_task(str(e))
+    finally:
+        pump.cancel()
+        with suppress(asyncio.CancelledError):
+            await pump
+        # 进程退出时 status 仍为 running：保留状态，等待其他 Worker 或重启后接管
+        await _save_state(task)
+        final = task.final_event()
+        if final:
+            with suppress(Exception):
+                await get_storage().publish_batch_event(task.id, final)
+            asyncio.create_task(expire_task(task.id, FINISHED_TTL))
+
+
+async def submit_task(
+    kind: str, items: List[str], params: Optional[Dict[str, Any]] = None
+) -> BatchTask:
+    """
+    创建并启动持久化任务
+
+    处理项按值去重（保留首次出现的顺序）：进度游标按项值定位，
+    重复项会让较早的位置永远无法标记完成
+    """
+    runner = _RUNNERS.get(kind)
+    if runner is None:
+        raise ValueError(f"Unknown batch task kind: {kind}")
+    items = list(dict.fromkeys(items))
+    task = BatchTask(len(items), kind=kind, items=items, params=params)
+    _TASKS[task.id] = task
+    await _save_state(task, items=items)
+    task._driver = asyncio.create_task(_drive(task, runner, items))
+    return task
+
+
+async def cancel_task(task_id: str) -> bool:
+    """取消任务；任务在其他 Worker 上时写入取消标记，由其归属 Worker 响应"""
+    task = _TASKS.get(task_id)
+    if task:
+        task.cancel()
+        return True
+    storage = get_storage()
+    state = await storage.load_batch_task(task_id)
+    if not state:
+        return False
+    if state.get("status") == "running" and not state.get("cancel_requested"):
+        # 单独的取消标记：归属 Worker 保存状态时不会把它覆盖掉
+        await storage.request_batch_cancel(task_id, RUNNING_TTL)
+    return True
+
+
+async def _local_stream(task: BatchTask) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    queue = task.attach()
+    try:
+        yield {"type": "snapshot", **task.snapshot()}
+
+        final = task.final_event()
+        if final:
+            yield final
+            return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=PING_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                yield None
+                final = task.final_event()
+                if final:
+                    yield final
+                    return
+                continue
+
+            yield event
+            if event.get("type") in FINAL_EVENT_TYPES:
+                return
+    finally:
+        task.detach(queue)
+
+
+def _state_progress(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "progress",
+        "task_id": state.get("task_id"),
+        "total": state.get("total", 0),
+        "processed": state.get("processed", 0),
+        "ok": state.get("ok", 0),
+        "fail": state.get("fail", 0),
+    }
+
+
+async def _remote_stream(
+    task_id: str, state: Dict[str, Any]
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    storage = get_storage()
+    subscription = storage.subscribe_batch_events(
+        task_id, idle_timeout=PERSIST_INTERVAL_SEC * 2
+    )
+    try:
+        snapshot = {
+            key: state.get(key)
+            for key in ("task_id", "status", "total", "processed", "ok", "fail", "warning")
+        }
+        yield {"type": "snapshot", **snapshot}
+        if state.get("final"):
+            yield state["final"]
+            return
+
+        if subscription is not None:
+            idle = 0.0
+            async for event in subscription:
+                if event is not None:
+                    idle = 0.0
+                    yield event
+                    if event.get("type") in FINAL_EVENT_TYPES:
+                        return
+                    continue
+                # 空闲时回查状态，避免错过订阅建立前的结束事件
+                state = await storage.load_batch_task(task_id)
+                if not state:
+                    return
+                if state.get("final"):
+                    yield state["final"]
+                    return
+                idle += PERSIST_INTERVAL_SEC * 2
+                if idle >= PING_INTERVAL_SEC:
+                    idle = 0.0
+                    yield None
+            return
+
+        # 存储不支持广播：轮询持久化状态
+        processed = state.get("processed")
+        idle = 0.0
+        while True:
+            await asyncio.sleep(POLL_INTERVAL_SEC)
+            state = await storage.load_batch_task(task_id)
+            if not state:
+                return
+            if state.get("final"):
+                yield state["final"]
+                return
+            if state.get("processed") != processed:
+                processed = state.get("processed")
+                idle = 0.0
+                yield _state_progress(state)
+                continue
+            idle += POLL_INTERVAL_SEC
+            if idle >= PING_INTERVAL_SEC:
+                idle = 0.0
+                yield None
+    finally:
+        if subscription is not None:
+            await subscription.aclose()
+
+
+async def open_stream(task_id: str) -> Optional[AsyncIterator[Optional[Dict[str, Any]]]]:
+    """
+    订阅任务事件（snapshot/progress/done/error/cancelled，None 表示心跳）
+
+    任务不在本 Worker 时通过存储后端的广播或状态轮询获取进度；任务不存在返回 None。
+    """
+    task = _TASKS.get(task_id)
+    if task:
+        return _local_stream(task)
+    state = await get_storage().load_batch_task(task_id)
+    if not state:
+        return None
+    return _remote_stream(task_id, state)
+
+
+async def resume_tasks() -> int:
+    """接管心跳超时的运行中任务，从游标处继续执行"""
+    storage = get_storage()
+    resumed = 0
+    for state in await storage.list_batch_tasks():
+        task_id = state.get("task_id")
+        if (
+            not task_id
+            or state.get("status") != "running"
+            or task_id in _TASKS
+            or time.time() - float(state.get("heartbeat") or 0) < HEARTBEAT_STALE_SEC
+        ):
+            continue
+        runner = _RUNNERS.get(state.get("kind") or "")
+        if runner is None:
+            continue
+
+        try:
+            async with storage.acquire_lock(f"batch_resume_{task_id}", timeout=5):
+                fresh = await storage.load_batch_task(task_id, with_items=True)
+                if (
+                    not fresh
+                    or fresh.get("status") != "running"
+                    or time.time() - float(fresh.get("heartbeat") or 0)
+                    < HEARTBEAT_STALE_SEC
+                ):
+                    continue
+                task = BatchTask.from_state(fresh)
+                _TASKS[task_id] = task
+                # 写入新的归属与心跳，其他 Worker 不再接管
+                await _save_state(task)
+        except Exception as e:
+            logger.warning(f"Batch task resume failed: {task_id} - {e}")
+            continue
+
+        items = task.pending_items()
+        logger.info(
+            f"Resuming batch task {task.kind} {task_id}: "
+            f"{len(items)}/{task.total} items left"
+        )
+        task._driver = asyncio.create_task(_drive(task, runner, items))
+        resumed += 1
+    return resumed
+
+
+async def _resume_loop() -> None:
+    while True:
+        try:
+            await resume_tasks()
+        except Exception as e:
+            logger.warning(f"Batch task resume scan failed: {e}")
+        await asyncio.sleep(RESUME_INTERVAL_SEC)
+
+
+def start_engine() -> None:
+    """启动可接管任务的定期扫描"""
+    global _RESUME_TASK
+    if _RESUME_TASK is None or _RESUME_TASK.done():
+        _RESUME_TASK = asyncio.create_task(_resume_loop())
+
+
+async def stop_engine() -> None:
+    """停止扫描并中断本 Worker 的任务（状态已持久化，可由其他 Worker 或重启后接管）"""
+    global _RESUME_TASK
+    drivers = [
+        task._driver
+        for task in _TASKS.values()
+        if task._driver is not None and not task._driver.done()
+    ]
+    if _RESUME_TASK is not None:
+        drivers.append(_RESUME_TASK)
+        _RESUME_TASK = None
+    for driver in drivers:
+        driver.cancel()
+    if drivers:
+        await asyncio.gather(*drivers, return_exceptions=True)
+
+
 __all__ = [
     "run_batch",
     "BatchTask",
@@ -230,4 +658,11 @@ __all__ = [
     "get_task",
     "delete_task",
     "expire_task",
+    "register_runner",
+    "submit_task",
+    "cancel_task",
+    "open_stream",
+    "resume_tasks",
+    "start_engine",
+    "stop_engine",
 ]
@@ -88,6 +88,23 @@ class AuthenticationException(AppException):
         )
 
 
+class RateLimitException(AppException):
+    """无可用 Token（429），可携带 Retry-After 秒数"""
+
+    def __init__(
+        self,
+        message: str = "No available tokens. Please try again later.",
+        retry_after: int = None,
+    ):
+        super().__init__(
+            message=message,
+            error_type=ErrorType.RATE_LIMIT.value,
+            code="rate_limit_exceeded",
+            status_code=429,
+        )
+        self.retry_after = retry_after
+
+
 class UpstreamException(AppException):
     """上游服务错误"""
 
@@ -116,6 +133,11 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
     """处理应用异常"""
     logger.warning(f"AppException: {exc.error_type} - {exc.message}")
 
+    headers = None
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after:
+        headers = {"Retry-After": str(int(retry_after))}
+
     return JSONResponse(
         status_code=exc.status_code,
         content=error_response(
@@ -124,6 +146,7 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
             param=exc.param,
             code=exc.code,
         ),
+        headers=headers,
     )
 
 
@@ -225,6 +248,7 @@ __all__ = [
     "AppException",
     "ValidationException",
     "AuthenticationException",
+    "RateLimitException",
     "UpstreamException",
     "StreamIdleTimeoutError",
     "error_response",
@@ -0,0 +1,278 @@
+"""
+进程内 + 跨进程的按名加锁
+
+- 同一进程内的竞争只走 asyncio.Lock，不轮询
+- 跨进程使用 fcntl.flock：先非阻塞尝试，冲突时由独立线程阻塞等待，释放后立即唤醒；
+  同一名字每个进程最多一个等待线程。等待者超时或取消后，线程拿到锁时自行解锁并关闭 fd，
+  不占用共享线程池（线程池只用于清理过期锁文件）
+- 同一个名字在本进程内只持有一次 OS 锁，有本地排队者时直接移交，不反复加解锁
+- 释放时删除锁文件（加锁后校验 inode，避免删除与打开的竞争），并定期清理遗留的过期锁文件
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-posix platforms
+    fcntl = None
+
+from app.core.logger import logger
+from app.core.storage import LOCK_DIR
+
+# 超过该时长未被修改的遗留锁文件会被清理（秒）
+STALE_LOCK_SEC = 3600
+# 清理间隔（秒）
+LOCK_GC_INTERVAL_SEC = 3600
+
+
+class _KeyState:
+    """单个锁名的进程内状态"""
+
+    __slots__ = ("lock", "users", "fd")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # 持有者 + 排队者
+        self.fd: Optional[int] = None  # 已持有的 OS 锁文件描述符
+
+
+class LockManager:
+    """按名字加锁的管理器"""
+
+    def __init__(self, lock_dir: Path = LOCK_DIR):
+        self.lock_dir = lock_dir
+        self._keys: Dict[str, _KeyState] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_gc = 0.0
+
+    @asynccontextmanager
+    async def acquire(self, name: str, timeout: float = 10):
+        """
+        获取锁
+
+        Raises:
+            TimeoutError: 超时未获取到锁
+        """
+        state = self._keys.get(name)
+        if state is None:
+            state = self._keys[name] = _KeyState()
+        state.users += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, float(timeout))
+        try:
+            try:
+                async with asyncio.timeout(deadline - loop.time()):
+                    await state.lock.acquire()
+            except TimeoutError:
+                raise TimeoutError(f"Failed to acquire lock: {name}") from None
+            try:
+                if fcntl is not None and state.fd is None:
+                    state.fd = await self._lock_file(name, deadline - loop.time())
+                yield
+            finally:
+                # 没有本地排队者时才释放 OS 锁，否则直接交给下一个
+                if state.fd is not None and state.users <= 1:
+                    self._unlock_file(name, state.fd)
+                    state.fd = None
+                state.lock.release()
+        finally:
+            state.users -= 1
+            if state.users == 0:
+                if state.fd is not None:
+                    # 最后的排队者超时离开时 OS 锁可能仍被保留
+                    self._unlock_file(name, state.fd)
+                    state.fd = None
+                if self._keys.get(name) is state:
+                    del self._keys[name]
+
+    def _path(self, name: str) -> Path:
+        return self.lock_dir / f"{name}.lock"
+
+    @staticmethod
+    def _same_file(fd: int, path: Path) -> bool:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        fst = os.fstat(fd)
+        return st.st_ino == fst.st_ino and st.st_dev == fst.st_dev
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="file-lock-gc"
+            )
+        return self._executor
+
+    async def _lock_file(self, name: str, timeout: float) -> int:
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._maybe_gc()
+        path = self._path(name)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, timeout)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = await self._flock_blocking(fd, deadline - loop.time())
+            except BaseException:
+                os.close(fd)
+                raise
+            if not acquired:
+                raise TimeoutError(f"Failed to acquire lock: {name}")
+            if self._same_file(fd, path):
+                return fd
+            # 持有者释放时删除了文件：锁住的是旧 inode，重新打开
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    async def _flock_blocking(fd: int, timeout: float) -> bool:
+        """
+        在独立线程中阻塞等待 OS 锁
+
+        返回 False 表示超时。失败、超时或取消后 fd 不再归调用方：
+        线程仍在等待时由它在拿到锁后解锁并关闭 fd，否则在这里关闭。
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        guard = threading.Lock()
+        # acquired/failed 由线程设置，abandoned 由等待方设置，均在 guard 下读写
+        flags = {"acquired": False, "failed": False, "abandoned": False}
+
+        def _resolve(error: Optional[BaseException]):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(True)
+            else:
+                future.set_exception(error)
+
+        def _notify(error: Optional[BaseException] = None):
+            try:
+                loop.call_soon_threadsafe(_resolve, error)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+        def _wait():
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except OSError as e:
+                with guard:
+                    if flags["abandoned"]:
+                        os.close(fd)
+                        return
+                    flags["failed"] = True
+                _notify(e)
+                return
+            with guard:
+                if flags["abandoned"]:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                    return
+                flags["acquired"] = True
+            _notify()
+
+        threading.Thread(target=_wait, name="file-lock-wait", daemon=True).start()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, timeout))
+        except TimeoutError:
+            with guard:
+                if flags["acquired"]:
+                    return True
+                flags["abandoned"] = True
+                if flags["failed"]:
+                    os.close(fd)
+            return False
+        except asyncio.CancelledError:
+            with guard:
+                flags["abandoned"] = True
+                if flags["acquired"]:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                if flags["acquired"] or flags["failed"]:
+                    os.close(fd)
+            raise
+        except OSError:
+            # 线程中的 flock 出错后不会再使用 fd
+            os.close(fd)
+            raise
+
+    def _unlock_file(self, name: str, fd: int):
+        path = self._path(name)
+        try:
+            # 仍持有锁时删除，后来者加锁后通过 inode 校验发现并重新打开
+            if self._same_file(fd, path):
+                os.unlink(path)
+        except OSError:
+            pass
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+    def _maybe_gc(self):
+        now = time.monotonic()
+        if self._last_gc and now - self._last_gc < LOCK_GC_INTERVAL_SEC:
+            return
+        self._last_gc = now
+        asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), self._collect_stale
+        )
+
+    def _collect_stale(self):
+        """删除无人持有且长时间未使用的锁文件（旧版本遗留或进程崩溃残留）"""
+        cutoff = time.time() - STALE_LOCK_SEC
+        removed = 0
+        try:
+            entries = list(self.lock_dir.glob("*.lock"))
+        except OSError:
+            return
+        for path in entries:
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                fd = os.open(path, os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            try:
+                if self._same_file(fd, path):
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        if removed:
+            logger.debug(f"LockManager: 清理过期锁文件 {removed} 个")
+
+
+_LOCK_MANAGER: Optional[LockManager] = None
+
+
+def get_lock_manager() -> LockManager:
+    global _LOCK_MANAGER
+    if _LOCK_MANAGER is None:
+        _LOCK_MANAGER = LockManager()
+    return _LOCK_MANAGER
+
+
+__all__ = ["LockManager", "get_lock_manager"]
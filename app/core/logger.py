@@ -4,9 +4,16 @@
 
 import sys
 import os
-import json
+import atexit
+import time
+import queue
+import threading
 import traceback
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
+
+import orjson
 from loguru import logger
 
 # Provide logging.Logger compatibility for legacy calls
@@ -18,6 +25,16 @@ DEFAULT_LOG_DIR = Path(__file__).parent.parent.parent / "logs"
 LOG_DIR = Path(os.getenv("LOG_DIR", str(DEFAULT_LOG_DIR)))
 _LOG_DIR_READY = False
 
+# 文件日志写入队列容量（超出后丢弃并计数）
+LOG_QUEUE_SIZE = 10000
+# 单次批量写入的最大条数
+LOG_BATCH_SIZE = 512
+# 两次检查日志目录总大小之间的最短间隔（秒）
+LOG_RETENTION_CHECK_SEC = 60
+
+# 当前请求的 TraceID（由请求中间件设置，未显式绑定 traceID 的日志自动带上）
+TRACE_ID: ContextVar[str] = ContextVar("trace_id", default="")
+
 
 def _prepare_log_dir() -> bool:
     """确保日志目录可用"""
@@ -33,8 +50,20 @@ def _prepare_log_dir() -> bool:
         return False
 
 
-def _format_json(record) -> str:
-    """格式化日志"""
+def get_trace_id() -> str:
+    """获取当前请求的 TraceID"""
+    return TRACE_ID.get()
+
+
+def _inject_trace(record):
+    """为日志记录注入当前请求的 TraceID"""
+    trace_id = TRACE_ID.get()
+    if trace_id and "traceID" not in record["extra"]:
+        record["extra"]["traceID"] = trace_id
+
+
+def _build_entry(record) -> dict:
+    """构建日志字段"""
     # ISO8601 时间
     time_str = record["time"].strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
     tz = record["time"].strftime("%z")
@@ -70,7 +99,16 @@ def _format_json(record) -> str:
             )
         )
 
-    return json.dumps(log_entry, ensure_ascii=False)
+    return log_entry
+
+
+def _dumps(log_entry: dict) -> bytes:
+    return orjson.dumps(log_entry, default=str)
+
+
+def _format_json(record) -> str:
+    """格式化日志"""
+    return _dumps(_build_entry(record)).decode("utf-8")
 
 def _env_flag(name: str, default: bool) -> bool:
     raw = os.getenv(name)
@@ -79,6 +117,16 @@ def _env_flag(name: str, default: bool) -> bool:
     return raw.strip().lower() in ("1", "true", "yes", "on", "y")
 
 
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw.strip())
+    except ValueError:
+        return default
+
+
 def _make_json_sink(output):
     """创建 JSON sink"""
 
@@ -89,13 +137,142 @@ def _make_json_sink(output):
     return sink
 
 
-def _file_json_sink(message):
-    """写入日志文件"""
-    record = message.record
-    json_str = _format_json(record)
-    log_file = LOG_DIR / f"app_{record['time'].strftime('%Y-%m-%d')}.log"
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(json_str + "\n")
+class _BatchedFileSink:
+    """
+    批量文件日志
+    - 调用方只做序列化并放入有界队列，满时丢弃并计数
+    - 后台线程批量写入，文件句柄常驻，按日期（跨零点）切换文件
+    - 可选按目录总大小清理最旧的日志文件
+    """
+
+    def __init__(self, log_dir: Path, max_total_bytes: int = 0):
+        self.log_dir = log_dir
+        self.max_total_bytes = max_total_bytes
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._file = None
+        self._date = ""
+        self._retention_checked_at = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="log-file-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, message):
+        record = message.record
+        line = _dumps(_build_entry(record)) + b"\n"
+        try:
+            self._queue.put_nowait((record["time"].strftime("%Y-%m-%d"), line))
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self, date: str):
+        if self._file:
+            self._file.close()
+        self._file = open(self.log_dir / f"app_{date}.log", "ab")
+        self._date = date
+        self._retention_checked_at = 0.0
+
+    def _write(self, batch: list):
+        if self.dropped != self._reported_dropped:
+            lost = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+            note = {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "level": "warning",
+                "msg": f"File log queue full, dropped {lost} records",
+                "dropped_total": self.dropped,
+            }
+            batch.append((batch[-1][0], _dumps(note) + b"\n"))
+        lines = []
+        for date, line in batch:
+            if date != self._date:
+                if lines:
+                    self._file.write(b"".join(lines))
+                    lines = []
+                self._open(date)
+            lines.append(line)
+        if lines:
+            self._file.write(b"".join(lines))
+        self._file.flush()
+
+    def _enforce_retention(self):
+        if self.max_total_bytes <= 0:
+            return
+        now = time.monotonic()
+        if self._retention_checked_at and now - self._retention_checked_at < LOG_RETENTION_CHECK_SEC:
+            return
+        self._retention_checked_at = now
+        files = sorted(self.log_dir.glob("app_*.log"))
+        sizes = []
+        for path in files:
+            try:
+                sizes.append((path, path.stat().st_size))
+            except OSError:
+                pass
+        total = sum(size for _, size in sizes)
+        current = self.log_dir / f"app_{self._date}.log"
+        for path, size in sizes:
+            if total <= self.max_total_bytes:
+                break
+            if path == current:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            stop = False
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+                self._enforce_retention()
+            except Exception as e:
+                print(f"File logging failed: {e}", file=sys.stderr)
+            if stop:
+                break
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def stop(self, timeout: float = 5.0):
+        """写完队列中剩余的日志并关闭文件"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_FILE_SINK: Optional[_BatchedFileSink] = None
+
+
+def _stop_file_sink():
+    global _FILE_SINK
+    if _FILE_SINK is not None:
+        _FILE_SINK.stop()
+        _FILE_SINK = None
+
+
+atexit.register(_stop_file_sink)
 
 
 def setup_logging(
@@ -104,7 +281,10 @@ def setup_logging(
     file_logging: bool = True,
 ):
     """设置日志配置"""
+    global _FILE_SINK
     logger.remove()
+    _stop_file_sink()
+    logger.configure(patcher=_inject_trace)
     file_logging = _env_flag("LOG_FILE_ENABLED", file_logging)
 
     # 控制台输出
@@ -126,11 +306,12 @@ def setup_logging(
     # 文件输出
     if file_logging:
         if _prepare_log_dir():
+            max_mb = _env_int("LOG_FILE_MAX_MB", 0)
+            _FILE_SINK = _BatchedFileSink(LOG_DIR, max(0, max_mb) * 1024 * 1024)
             logger.add(
-                _file_json_sink,
+                _FILE_SINK,
                 level=level,
                 format="{message}",
-                enqueue=True,
             )
         else:
             logger.warning("File logging disabled: no writable log directory.")
@@ -148,4 +329,11 @@ def get_logger(trace_id: str = "", span_id: str = ""):
     return logger.bind(**bound) if bound else logger
 
 
-__all__ = ["logger", "setup_logging", "get_logger", "LOG_DIR"]
+__all__ = [
+    "logger",
+    "setup_logging",
+    "get_logger",
+    "get_trace_id",
+    "TRACE_ID",
+    "LOG_DIR",
+]
@@ -3,83 +3,131 @@
 Response Middleware
 
 用于记录请求日志、生成 TraceID 和计算请求耗时
+
+纯 ASGI 实现：send 消息原样透传（不经过额外的任务与内存流），
+在最后一个响应体块发送后记录首字节耗时、总耗时、发送字节数与块数。
 """
 
 import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
-from app.core.logger import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import TRACE_ID, logger
+
+# 不记录日志的页面路径
+_SKIP_PATHS = frozenset(
+    (
+        "/",
+        "/login",
+        "/imagine",
+        "/voice",
+        "/admin",
+        "/admin/login",
+        "/admin/config",
+        "/admin/cache",
+        "/admin/token",
+    )
+)
 
 
-class ResponseLoggerMiddleware(BaseHTTPMiddleware):
+class ResponseLoggerMiddleware:
     """
     请求日志/响应追踪中间件
     Request Logging and Response Tracking Middleware
     """
 
-    async def dispatch(self, request: Request, call_next):
-        # 生成请求 ID
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # 生成请求 ID（同时写入 request.state 与 contextvar，下游日志自动带上）
         trace_id = str(uuid.uuid4())
-        request.state.trace_id = trace_id
-
-        start_time = time.time()
-        path = request.url.path
-
-        if path.startswith("/static/") or path in (
-            "/",
-            "/login",
-            "/imagine",
-            "/voice",
-            "/admin",
-            "/admin/login",
-            "/admin/config",
-            "/admin/cache",
-            "/admin/token",
-        ):
-            return await call_next(request)
+        scope.setdefault("state", {})["trace_id"] = trace_id
+        token = TRACE_ID.set(trace_id)
+        try:
+            path = scope["path"]
+            if path.startswith("/static/") or path in _SKIP_PATHS:
+                await self.app(scope, receive, send)
+                return
+            await self._handle(scope, receive, send, trace_id, path)
+        finally:
+            TRACE_ID.reset(token)
+
+    async def _handle(
+        self, scope: Scope, receive: Receive, send: Send, trace_id: str, path: str
+    ):
+        method = scope["method"]
 
         # 记录请求信息
         logger.info(
-            f"Request: {request.method} {request.url.path}",
+            f"Request: {method} {path}",
             extra={
                 "traceID": trace_id,
-                "method": request.method,
-                "path": request.url.path,
+                "method": method,
+                "path": path,
             },
         )
 
-        try:
-            response = await call_next(request)
+        start_time = time.perf_counter()
+        status = 0
+        first_byte_at = 0.0
+        bytes_sent = 0
+        chunks = 0
 
-            # 计算耗时
-            duration = (time.time() - start_time) * 1000
-
-            # 记录响应信息
-            logger.info(
-                f"Response: {request.method} {request.url.path} - {response.status_code} ({duration:.2f}ms)",
-                extra={
-                    "traceID": trace_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status": response.status_code,
-                    "duration_ms": round(duration, 2),
-                },
-            )
-
-            return response
+        async def send_wrapper(message: Message):
+            nonlocal status, first_byte_at, bytes_sent, chunks
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status = message["status"]
+            elif message_type == "http.response.body":
+                body = message.get("body", b"")
+                if body:
+                    chunks += 1
+                    bytes_sent += len(body)
+                    if not first_byte_at:
+                        first_byte_at = time.perf_counter()
+            await send(message)
 
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            duration = (time.time() - start_time) * 1000
+            duration = (time.perf_counter() - start_time) * 1000
             logger.error(
-                f"Response Error: {request.method} {request.url.path} - {str(e)} ({duration:.2f}ms)",
+                f"Response Error: {method} {path} - {str(e)} ({duration:.2f}ms)",
                 extra={
                     "traceID": trace_id,
-                    "method": request.method,
-                    "path": request.url.path,
+                    "method": method,
+                    "path": path,
                     "duration_ms": round(duration, 2),
+                    "bytes": bytes_sent,
+                    "chunks": chunks,
                     "error": str(e),
                 },
             )
-            raise e
+            raise
+
+        # 计算耗时：首字节 / 最后一个字节
+        end_time = time.perf_counter()
+        duration = (end_time - start_time) * 1000
+        ttfb = ((first_byte_at or end_time) - start_time) * 1000
+
+        # 记录响应信息
+        logger.info(
+            f"Response: {method} {path} - {status} "
+            f"({duration:.2f}ms, ttfb {ttfb:.2f}ms, {bytes_sent}B/{chunks} chunks)",
+            extra={
+                "traceID": trace_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round(duration, 2),
+                "ttfb_ms": round(ttfb, 2),
+                "bytes": bytes_sent,
+                "chunks": chunks,
+            },
+        )
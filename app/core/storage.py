@@ -15,14 +15,10 @@ import asyncio
 import hashlib
 import time
 import tomllib
-from typing import Any, ClassVar, Dict, Optional
+from typing import Any, AsyncIterator, ClassVar, Dict, List, Optional
 from pathlib import Path
 from enum import Enum
 
-try:
-    import fcntl
-except ImportError:  # pragma: no cover - non-posix platforms
-    fcntl = None
 from contextlib import asynccontextmanager
 
 import orjson
@@ -37,6 +33,48 @@ DATA_DIR = Path(os.getenv("DATA_DIR", str(DEFAULT_DATA_DIR))).expanduser()
 CONFIG_FILE = DATA_DIR / "config.toml"
 TOKEN_FILE = DATA_DIR / "token.json"
 LOCK_DIR = DATA_DIR / ".locks"
+BATCH_DIR = DATA_DIR / "batch"
+
+# Redis Token 变更流：保留条数 / 单次增量同步最多读取条数（超过则回退全量加载）
+REDIS_TOKEN_CHANGES_MAXLEN = 10000
+REDIS_TOKEN_CHANGES_BATCH = 1000
+# SQL 增量同步回看窗口（毫秒）
+SQL_TOKEN_CHANGES_LOOKBACK_MS = 2000
+
+# Redis 原子扣减配额（与 TokenInfo.consume 语义一致）
+# KEYS[1]=token hash, ARGV[1]=cost, ARGV[2]=now_ms
+REDIS_CONSUME_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local quota = tonumber(redis.call('HGET', KEYS[1], 'quota')) or 0
+local cost = math.max(0, math.min(tonumber(ARGV[1]), quota))
+quota = quota - cost
+local use_count = redis.call('HINCRBY', KEYS[1], 'use_count', cost)
+local status = redis.call('HGET', KEYS[1], 'status') or 'active'
+if quota == 0 then
+    status = 'cooling'
+elseif status == 'cooling' then
+    status = 'active'
+end
+redis.call('HSET', KEYS[1], 'quota', quota, 'last_used_at', ARGV[2], 'status', status)
+return {quota, use_count, status}
+"""
+
+# Redis 原子记录 401 失败（与 TokenInfo.record_fail 语义一致）
+# KEYS[1]=token hash, ARGV[1]=now_ms, ARGV[2]=reason, ARGV[3]=threshold
+REDIS_RECORD_FAIL_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local fail_count = redis.call('HINCRBY', KEYS[1], 'fail_count', 1)
+local status = redis.call('HGET', KEYS[1], 'status') or 'active'
+if fail_count >= tonumber(ARGV[3]) then
+    status = 'expired'
+end
+redis.call('HSET', KEYS[1], 'last_fail_at', ARGV[1], 'last_fail_reason', ARGV[2], 'status', status)
+return {fail_count, status}
+"""
 
 
 # JSON 序列化优化助手函数
@@ -52,6 +90,13 @@ def json_dumps_sorted(obj: Any) -> str:
     return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
 
 
+def _stream_id_gt(a: str, b: str) -> bool:
+    """比较 Redis Stream ID（ms-seq）"""
+    a_ms, _, a_seq = a.partition("-")
+    b_ms, _, b_seq = b.partition("-")
+    return (int(a_ms), int(a_seq or 0)) > (int(b_ms), int(b_seq or 0))
+
+
 class StorageError(Exception):
     """存储服务基础异常"""
 
@@ -86,7 +131,16 @@ class BaseStorage(abc.ABC):
     ):
         """增量保存 Token（默认回退到全量保存）"""
         existing = await self.load_tokens() or {}
+        self._merge_tokens_delta(existing, updated, deleted)
+        await self.save_tokens(existing)
 
+    @staticmethod
+    def _merge_tokens_delta(
+        existing: Dict[str, Any],
+        updated: list[Dict[str, Any]],
+        deleted: Optional[list[str]] = None,
+    ):
+        """将增量变更合并到全量 Token 数据（原地修改）"""
         deleted_set = set(deleted or [])
         if deleted_set:
             for pool_name, tokens in list(existing.items()):
@@ -132,7 +186,163 @@ class BaseStorage(abc.ABC):
             if not replaced:
                 pool_list.append(normalized)
 
-        await self.save_tokens(existing)
+    async def consume_token(
+        self, token: str, pool_name: str, cost: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        在存储端原子扣减配额
+
+        Args:
+            token: Token 字符串
+            pool_name: 所属池
+            cost: 期望扣除的配额
+
+        Returns:
+            存储中的最新 {quota, use_count, last_used_at, status}；
+            不支持原子操作或 Token 不存在时返回 None
+        """
+        return None
+
+    async def record_token_fail(
+        self, token: str, pool_name: str, reason: str, threshold: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        在存储端原子记录一次 401 失败
+
+        Returns:
+            存储中的最新 {fail_count, last_fail_at, last_fail_reason, status}；
+            不支持原子操作或 Token 不存在时返回 None
+        """
+        return None
+
+    async def get_tokens_cursor(self) -> Optional[str]:
+        """获取当前 Token 变更游标（不支持增量同步时返回 None）"""
+        return None
+
+    async def load_tokens_changes(self, cursor: str) -> Optional[Dict[str, Any]]:
+        """
+        读取游标之后变更的 Token（增量同步）
+
+        Args:
+            cursor: 上次同步得到的游标
+
+        Returns:
+            {"cursor": str, "tokens": {pool_name: [token_data]}, "deleted": [token],
+             "total": Optional[int]}；
+            不支持增量或游标已失效时返回 None（调用方应回退到全量加载）
+        """
+        return None
+
+    async def get_upload_ref(self, owner: str, digest: str) -> Optional[Dict[str, Any]]:
+        """
+        读取共享的上传缓存记录
+
+        Args:
+            owner: Token 的摘要（不直接存储 Token）
+            digest: 文件内容 sha256
+
+        Returns:
+            {"file_id", "file_uri", "ts"}；不支持共享或未命中时返回 None
+        """
+        return None
+
+    async def set_upload_ref(
+        self, owner: str, digest: str, ref: Dict[str, Any], ttl: int
+    ):
+        """写入共享的上传缓存记录（默认不共享）"""
+        return None
+
+    async def clear_upload_refs(self, owner: str):
+        """清除某个 Token 的全部共享上传缓存记录"""
+        return None
+
+    async def get_video_context(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取共享的视频上下文（用于视频续写）
+
+        Returns:
+            {"token", "conversation_id", "ts"}；不支持共享或未命中/已过期时返回 None
+        """
+        return None
+
+    async def set_video_context(self, video_id: str, ctx: Dict[str, Any], ttl: int):
+        """写入共享的视频上下文，ttl 秒后过期（默认不共享）"""
+        return None
+
+    async def get_public_session(
+        self, kind: str, task_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取共享的 Public 会话（imagine/video 的 start 与后续 sse/ws 可落在不同 Worker）
+
+        Returns:
+            会话信息；不支持共享或未命中/已过期时返回 None
+        """
+        return None
+
+    async def set_public_session(
+        self, kind: str, task_id: str, info: Dict[str, Any], ttl: int
+    ):
+        """写入共享的 Public 会话，ttl 秒后过期（默认不共享）"""
+        return None
+
+    async def delete_public_sessions(self, kind: str, task_ids: list) -> int:
+        """删除共享的 Public 会话，返回实际删除的数量"""
+        return 0
+
+    async def save_batch_task(
+        self,
+        task_id: str,
+        state: Dict[str, Any],
+        ttl: int,
+        items: Optional[List[str]] = None,
+    ):
+        """
+        持久化批量任务状态（默认不持久化）
+
+        Args:
+            state: 任务状态（进度、游标、归属 Worker 等）
+            ttl: 过期时间（秒）
+            items: 任务全部处理项，仅在创建/接管时写入一次
+        """
+        return None
+
+    async def load_batch_task(
+        self, task_id: str, with_items: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取批量任务状态；with_items 时附带 "items" 字段
+
+        已写入取消标记时 "cancel_requested" 为 True
+        """
+        return None
+
+    async def request_batch_cancel(self, task_id: str, ttl: int):
+        """
+        写入批量任务的取消标记（默认不持久化）
+
+        标记与任务状态分开存放：归属 Worker 定期保存状态时不会覆盖它
+        """
+        return None
+
+    async def list_batch_tasks(self) -> List[Dict[str, Any]]:
+        """列出未过期的批量任务状态"""
+        return []
+
+    async def publish_batch_event(self, task_id: str, event: Dict[str, Any]) -> bool:
+        """跨 Worker 广播批量任务事件，不支持时返回 False"""
+        return False
+
+    def subscribe_batch_events(
+        self, task_id: str, idle_timeout: float = 15.0
+    ) -> Optional[AsyncIterator[Optional[Dict[str, Any]]]]:
+        """
+        订阅批量任务事件
+
+        Returns:
+            异步迭代器（空闲时产出 None 作为心跳）；不支持时返回 None
+        """
+        return None
 
     @abc.abstractmethod
     async def close(self):
@@ -161,58 +371,23 @@ class LocalStorage(BaseStorage):
     """
     本地文件存储
     - 使用 aiofiles 进行异步 I/O
-    - 使用 asyncio.Lock 进行进程内并发控制
-    - 如果需要多进程安全，需要系统级文件锁 (fcntl)
+    - 使用 LockManager 加锁：进程内按名字排队，跨进程使用 fcntl 文件锁
     """
 
-    def __init__(self):
-        self._lock = asyncio.Lock()
-
     @asynccontextmanager
     async def acquire_lock(self, name: str, timeout: int = 10):
-        if fcntl is None:
-            try:
-                async with asyncio.timeout(timeout):
-                    async with self._lock:
-                        yield
-            except asyncio.TimeoutError:
-                logger.warning(f"LocalStorage: 获取锁 '{name}' 超时 ({timeout}s)")
-                raise StorageError(f"无法获取锁 '{name}'")
-            return
+        from app.core.locks import get_lock_manager
 
-        lock_path = LOCK_DIR / f"{name}.lock"
-        lock_path.parent.mkdir(parents=True, exist_ok=True)
-        fd = None
-        locked = False
-        start = time.monotonic()
-
-        async with self._lock:
-            try:
-                fd = open(lock_path, "a+")
-                while True:
-                    try:
-                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                        locked = True
-                        break
-                    except BlockingIOError:
-                        if time.monotonic() - start >= timeout:
-                            raise StorageError(f"无法获取锁 '{name}'")
-                        await asyncio.sleep(0.05)
+        acquired = False
+        try:
+            async with get_lock_manager().acquire(name, timeout):
+                acquired = True
                 yield
-            except StorageError:
-                logger.warning(f"LocalStorage: 获取锁 '{name}' 超时 ({timeout}s)")
+        except TimeoutError:
+            if acquired:
                 raise
-            finally:
-                if fd:
-                    if locked:
-                        try:
-                            fcntl.flock(fd, fcntl.LOCK_UN)
-                        except Exception:
-                            pass
-                    try:
-                        fd.close()
-                    except Exception:
-                        pass
+            logger.warning(f"LocalStorage: 获取锁 '{name}' 超时 ({timeout}s)")
+            raise StorageError(f"无法获取锁 '{name}'")
 
     async def load_config(self) -> Dict[str, Any]:
         if not CONFIG_FILE.exists():
@@ -283,6 +458,87 @@ class LocalStorage(BaseStorage):
             logger.error(f"LocalStorage: 保存 Token 失败: {e}")
             raise StorageError(f"保存 Token 失败: {e}")
 
+    @staticmethod
+    async def _write_json_atomic(path: Path, data: Any):
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(orjson.dumps(data))
+        os.replace(temp_path, path)
+
+    @staticmethod
+    async def _read_json(path: Path) -> Any:
+        try:
+            async with aiofiles.open(path, "rb") as f:
+                return json_loads(await f.read())
+        except FileNotFoundError:
+            return None
+
+    async def save_batch_task(
+        self,
+        task_id: str,
+        state: Dict[str, Any],
+        ttl: int,
+        items: Optional[List[str]] = None,
+    ):
+        try:
+            BATCH_DIR.mkdir(parents=True, exist_ok=True)
+            data = dict(state)
+            data["expires_at"] = time.time() + max(1, int(ttl))
+            if items is not None:
+                await self._write_json_atomic(BATCH_DIR / f"{task_id}.items", items)
+            await self._write_json_atomic(BATCH_DIR / f"{task_id}.json", data)
+        except Exception as e:
+            logger.warning(f"LocalStorage: 保存批量任务失败: {e}")
+
+    async def load_batch_task(
+        self, task_id: str, with_items: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            state = await self._read_json(BATCH_DIR / f"{task_id}.json")
+            if not state or float(state.get("expires_at") or 0) <= time.time():
+                return None
+            if with_items:
+                state["items"] = (
+                    await self._read_json(BATCH_DIR / f"{task_id}.items") or []
+                )
+            if not state.get("cancel_requested"):
+                state["cancel_requested"] = bool(
+                    await self._read_json(BATCH_DIR / f"{task_id}.cancel")
+                )
+            return state
+        except Exception as e:
+            logger.warning(f"LocalStorage: 读取批量任务失败: {e}")
+            return None
+
+    async def request_batch_cancel(self, task_id: str, ttl: int):
+        try:
+            BATCH_DIR.mkdir(parents=True, exist_ok=True)
+            await self._write_json_atomic(BATCH_DIR / f"{task_id}.cancel", True)
+        except Exception as e:
+            logger.warning(f"LocalStorage: 写入批量任务取消标记失败: {e}")
+
+    async def list_batch_tasks(self) -> List[Dict[str, Any]]:
+        if not BATCH_DIR.exists():
+            return []
+        now = time.time()
+        states = []
+        for path in BATCH_DIR.glob("*.json"):
+            try:
+                state = await self._read_json(path)
+            except Exception:
+                state = None
+            if state and float(state.get("expires_at") or 0) > now:
+                states.append(state)
+                continue
+            # 清理过期任务
+            for suffix in (".json", ".items", ".cancel"):
+                stale = path.with_suffix(suffix)
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        return states
+
     async def close(self):
         pass
 
@@ -310,7 +566,21 @@ class RedisStorage(BaseStorage):
         self.key_pools = "grok2api:pools"  # Set: pool_names
         self.prefix_pool_set = "grok2api:pool:"  # Set: pool -> token_ids
         self.prefix_token_hash = "grok2api:token:"  # Hash: token_id -> token_data
+        self.key_token_changes = "grok2api:tokens:changes"  # Stream: token 变更通知
+        self.prefix_upload_refs = "grok2api:uploads:"  # Hash: digest -> 上传结果
+        self.prefix_video_ctx = "grok2api:video_ctx:"  # String: 视频续写上下文
+        self.prefix_public_session = "grok2api:public_session:"  # Hash: Public 会话
+        self.prefix_batch = "grok2api:batch:"  # String: 批量任务状态 / 处理项
+        self.batch_index_key = "grok2api:batch_tasks"  # Set: 批量任务 ID
+        self.prefix_batch_events = "grok2api:batch_events:"  # Pub/Sub: 批量任务事件
         self.lock_prefix = "grok2api:lock:"
+        # 区分本进程写入的变更，同步时跳过
+        self.writer_id = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self._consume_script = self.redis.register_script(REDIS_CONSUME_LUA)
+        self._record_fail_script = self.redis.register_script(REDIS_RECORD_FAIL_LUA)
+        # 最近一次读写到的 Token Hash 与池成员关系，用于增量保存时只写差异
+        self._hash_cache: Dict[str, Dict[str, str]] = {}
+        self._member_cache: Dict[str, set] = {}
 
     @asynccontextmanager
     async def acquire_lock(self, name: str, timeout: int = 10):
@@ -381,6 +651,140 @@ class RedisStorage(BaseStorage):
             logger.error(f"RedisStorage: 保存配置失败: {e}")
             raise
 
+    @staticmethod
+    def _parse_token_hash(t_data: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """将 Token Hash（全 string）还原为 token_data"""
+        if not t_data:
+            return None
+
+        # 恢复 tags (JSON -> List)
+        if "tags" in t_data:
+            try:
+                t_data["tags"] = json_loads(t_data["tags"])
+            except Exception:
+                t_data["tags"] = []
+
+        # 类型转换 (Redis 返回全 string)
+        for int_field in [
+            "quota",
+            "created_at",
+            "use_count",
+            "fail_count",
+            "last_used_at",
+            "last_fail_at",
+            "last_sync_at",
+        ]:
+            if t_data.get(int_field) and t_data[int_field] != "None":
+                try:
+                    t_data[int_field] = int(t_data[int_field])
+                except Exception:
+                    pass
+
+        return t_data
+
+    @staticmethod
+    def _flatten_token(t: Dict[str, Any]) -> tuple[Dict[str, str], list[str]]:
+        """Token 数据 -> (Hash 字段, 需删除的空字段)"""
+        t_flat = {k: v for k, v in t.items() if k not in ("pool_name", "_update_kind")}
+        if "tags" in t_flat:
+            t_flat["tags"] = json_dumps(t_flat["tags"])
+        status = t_flat.get("status")
+        if isinstance(status, str) and status.startswith("TokenStatus."):
+            t_flat["status"] = status.split(".", 1)[1].lower()
+        elif isinstance(status, Enum):
+            t_flat["status"] = status.value
+        empty = [k for k, v in t_flat.items() if v is None]
+        return {k: str(v) for k, v in t_flat.items() if v is not None}, empty
+
+    def _publish_token_changes(
+        self,
+        pipe,
+        updated: Optional[list[tuple[str, str]]] = None,
+        deleted: Optional[list[str]] = None,
+        full: bool = False,
+    ):
+        """在写入 pipeline 中追加一条变更通知（供其他 worker 增量同步）"""
+        fields = {"w": self.writer_id}
+        if full:
+            fields["full"] = "1"
+        else:
+            fields["u"] = json_dumps(updated or [])
+            fields["d"] = json_dumps(deleted or [])
+        pipe.xadd(
+            self.key_token_changes,
+            fields,
+            maxlen=REDIS_TOKEN_CHANGES_MAXLEN,
+            approximate=True,
+        )
+
+    async def get_tokens_cursor(self) -> Optional[str]:
+        try:
+            last = await self.redis.xrevrange(self.key_token_changes, count=1)
+            return last[0][0] if last else "0-0"
+        except Exception as e:
+            logger.warning(f"RedisStorage: 获取变更游标失败: {e}")
+            return None
+
+    async def load_tokens_changes(self, cursor: str) -> Optional[Dict[str, Any]]:
+        try:
+            if cursor != "0-0":
+                first = await self.redis.xrange(self.key_token_changes, count=1)
+                if first and _stream_id_gt(first[0][0], cursor):
+                    # 游标之前的记录已被裁剪，可能丢失变更
+                    return None
+
+            res = await self.redis.xread(
+                {self.key_token_changes: cursor}, count=REDIS_TOKEN_CHANGES_BATCH
+            )
+            entries = res[0][1] if res else []
+            if len(entries) >= REDIS_TOKEN_CHANGES_BATCH:
+                return None
+
+            changed: Dict[str, str] = {}
+            deleted = set()
+            for entry_id, fields in entries:
+                cursor = entry_id
+                if fields.get("w") == self.writer_id:
+                    continue
+                if fields.get("full"):
+                    return None
+                for pool_name, token_str in json_loads(fields.get("u") or "[]"):
+                    changed[token_str] = pool_name
+                    deleted.discard(token_str)
+                for token_str in json_loads(fields.get("d") or "[]"):
+                    deleted.add(token_str)
+                    changed.pop(token_str, None)
+
+            tokens: Dict[str, list] = {}
+            if changed:
+                token_ids = list(changed)
+                async with self.redis.pipeline() as pipe:
+                    for tid in token_ids:
+                        pipe.hgetall(f"{self.prefix_token_hash}{tid}")
+                    token_data_list = await pipe.execute()
+                for tid, t_data in zip(token_ids, token_data_list):
+                    if t_data:
+                        self._hash_cache[tid] = dict(t_data)
+                        self._member_cache.setdefault(tid, set()).add(changed[tid])
+                    t_data = self._parse_token_hash(t_data)
+                    if t_data:
+                        tokens.setdefault(changed[tid], []).append(t_data)
+                    else:
+                        deleted.add(tid)
+
+            for tid in deleted:
+                self._forget(tid)
+
+            return {
+                "cursor": cursor,
+                "tokens": tokens,
+                "deleted": list(deleted),
+                "total": None,
+            }
+        except Exception as e:
+            logger.warning(f"RedisStorage: 读取 Token 变更失败: {e}")
+            return None
+
     async def load_tokens(self) -> Dict[str, Any]:
         """加载所有 Token"""
         try:
@@ -415,35 +819,20 @@ class RedisStorage(BaseStorage):
 
             # 重组数据结构
             token_lookup = {}
+            hash_cache = {}
             for i, tid in enumerate(all_token_ids):
-                t_data = token_data_list[i]
-                if not t_data:
-                    continue
-
-                # 恢复 tags (JSON -> List)
-                if "tags" in t_data:
-                    try:
-                        t_data["tags"] = json_loads(t_data["tags"])
-                    except Exception:
-                        t_data["tags"] = []
-
-                # 类型转换 (Redis 返回全 string)
-                for int_field in [
-                    "quota",
-                    "created_at",
-                    "use_count",
-                    "fail_count",
-                    "last_used_at",
-                    "last_fail_at",
-                    "last_sync_at",
-                ]:
-                    if t_data.get(int_field) and t_data[int_field] != "None":
-                        try:
-                            t_data[int_field] = int(t_data[int_field])
-                        except Exception:
-                            pass
-
-                token_lookup[tid] = t_data
+                if token_data_list[i]:
+                    hash_cache[tid] = dict(token_data_list[i])
+                t_data = self._parse_token_hash(token_data_list[i])
+                if t_data:
+                    token_lookup[tid] = t_data
+
+            member_cache: Dict[str, set] = {}
+            for pool_name, tids in pool_map.items():
+                for tid in tids:
+                    member_cache.setdefault(tid, set()).add(pool_name)
+            self._hash_cache = hash_cache
+            self._member_cache = member_cache
 
             # 按 Pool 分组返回
             for pool_name in pool_names:
@@ -460,6 +849,9 @@ class RedisStorage(BaseStorage):
 
     async def save_tokens(self, data: Dict[str, Any]):
         """保存所有 Token"""
+        await self._write_tokens(data, publish=True)
+
+    async def _write_tokens(self, data: Dict[str, Any], publish: bool):
         if data is None:
             return
         try:
@@ -515,27 +907,384 @@ class RedisStorage(BaseStorage):
                         token_str = t.get("token")
                         if not token_str:
                             continue
-                        t_flat = t.copy()
-                        if "tags" in t_flat:
-                            t_flat["tags"] = json_dumps(t_flat["tags"])
-                        status = t_flat.get("status")
-                        if isinstance(status, str) and status.startswith(
-                            "TokenStatus."
-                        ):
-                            t_flat["status"] = status.split(".", 1)[1].lower()
-                        elif isinstance(status, Enum):
-                            t_flat["status"] = status.value
-                        t_flat = {k: str(v) for k, v in t_flat.items() if v is not None}
+                        t_flat, _ = self._flatten_token(t)
                         pipe.hset(
                             f"{self.prefix_token_hash}{token_str}", mapping=t_flat
                         )
 
+                if publish:
+                    self._publish_token_changes(pipe, full=True)
                 await pipe.execute()
 
+            hash_cache: Dict[str, Dict[str, str]] = {}
+            member_cache: Dict[str, set] = {}
+            for pool_name, tokens in (data or {}).items():
+                for t in tokens:
+                    token_str = t.get("token")
+                    if not token_str:
+                        continue
+                    flat, _ = self._flatten_token(t)
+                    hash_cache.setdefault(token_str, {}).update(flat)
+                    member_cache.setdefault(token_str, set()).add(pool_name)
+            self._hash_cache = hash_cache
+            self._member_cache = member_cache
+
         except Exception as e:
             logger.error(f"RedisStorage: 保存 Token 失败: {e}")
             raise
 
+    def _forget(self, token_str: str):
+        self._hash_cache.pop(token_str, None)
+        self._member_cache.pop(token_str, None)
+
+    async def save_tokens_delta(
+        self, updated: list[Dict[str, Any]], deleted: Optional[list[str]] = None
+    ):
+        """增量保存：仅写入变更的字段与池成员关系"""
+        try:
+            deleted_set = set(deleted or [])
+            changed: list[tuple[str, str]] = []
+            hash_updates: Dict[str, tuple[Dict[str, str], list[str]]] = {}
+            member_adds: list[tuple[str, str]] = []
+            member_removes: list[tuple[str, str]] = []
+
+            # 未知归属的删除需要查询所有池
+            pool_names = set()
+            if any(t not in self._member_cache for t in deleted_set):
+                pool_names = set(await self.redis.smembers(self.key_pools) or [])
+
+            for item in updated or []:
+                if not isinstance(item, dict):
+                    continue
+                pool_name = item.get("pool_name")
+                token_str = item.get("token")
+                if not pool_name or not token_str or token_str in deleted_set:
+                    continue
+
+                t_flat, empty = self._flatten_token(item)
+                cached = self._hash_cache.get(token_str)
+                if cached is not None:
+                    t_flat = {k: v for k, v in t_flat.items() if cached.get(k) != v}
+                    empty = [k for k in empty if k in cached]
+
+                pools = self._member_cache.get(token_str)
+                if pools is None:
+                    member_adds.append((pool_name, token_str))
+                elif pool_name not in pools:
+                    # 池变更：从旧池移出，加入新池
+                    member_removes.extend((p, token_str) for p in pools)
+                    member_adds.append((pool_name, token_str))
+
+                if not t_flat and not empty and (
+                    pools is not None and pool_name in pools
+                ):
+                    continue
+                hash_updates[token_str] = (t_flat, empty)
+                changed.append((pool_name, token_str))
+
+            if not changed and not deleted_set:
+                return
+
+            async with self.redis.pipeline() as pipe:
+                for token_str in deleted_set:
+                    pipe.delete(f"{self.prefix_token_hash}{token_str}")
+                    for pool_name in self._member_cache.get(token_str, pool_names):
+                        pipe.srem(f"{self.prefix_pool_set}{pool_name}", token_str)
+
+                for token_str, (t_flat, empty) in hash_updates.items():
+                    key = f"{self.prefix_token_hash}{token_str}"
+                    if t_flat:
+                        pipe.hset(key, mapping=t_flat)
+                    if empty:
+                        pipe.hdel(key, *empty)
+
+                for pool_name, token_str in member_removes:
+                    pipe.srem(f"{self.prefix_pool_set}{pool_name}", token_str)
+                new_pools = {pool_name for pool_name, _ in member_adds}
+                if new_pools:
+                    pipe.sadd(self.key_pools, *new_pools)
+                for pool_name, token_str in member_adds:
+                    pipe.sadd(f"{self.prefix_pool_set}{pool_name}", token_str)
+
+                self._publish_token_changes(pipe, changed, list(deleted_set))
+                await pipe.execute()
+
+            for token_str in deleted_set:
+                self._forget(token_str)
+            for token_str, (t_flat, empty) in hash_updates.items():
+                cached = self._hash_cache.setdefault(token_str, {})
+                cached.update(t_flat)
+                for k in empty:
+                    cached.pop(k, None)
+            for pool_name, token_str in member_removes:
+                self._member_cache.get(token_str, set()).discard(pool_name)
+            for pool_name, token_str in member_adds:
+                self._member_cache.setdefault(token_str, set()).add(pool_name)
+        except Exception as e:
+            logger.error(f"RedisStorage: 增量保存 Token 失败: {e}")
+            raise
+
+    def _remember_fields(self, token_str: str, fields: Dict[str, Any]):
+        cached = self._hash_cache.get(token_str)
+        if cached is not None:
+            cached.update({k: str(v) for k, v in fields.items() if v is not None})
+
+    async def _run_token_script(
+        self, script, token: str, pool_name: str, args: list
+    ) -> Optional[list]:
+        async with self.redis.pipeline() as pipe:
+            await script(
+                keys=[f"{self.prefix_token_hash}{token}"], args=args, client=pipe
+            )
+            self._publish_token_changes(pipe, [(pool_name, token)])
+            results = await pipe.execute()
+        return results[0] or None
+
+    async def get_upload_ref(self, owner: str, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.redis.hget(f"{self.prefix_upload_refs}{owner}", digest)
+            return json_loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"RedisStorage: 读取上传缓存失败: {e}")
+            return None
+
+    async def set_upload_ref(
+        self, owner: str, digest: str, ref: Dict[str, Any], ttl: int
+    ):
+        key = f"{self.prefix_upload_refs}{owner}"
+        try:
+            async with self.redis.pipeline() as pipe:
+                pipe.hset(key, digest, json_dumps(ref))
+                # 整个 Hash 的过期时间随最近一次写入顺延，单条记录由调用方按 ts 判断
+                pipe.expire(key, max(1, int(ttl)))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"RedisStorage: 写入上传缓存失败: {e}")
+
+    async def clear_upload_refs(self, owner: str):
+        try:
+            await self.redis.delete(f"{self.prefix_upload_refs}{owner}")
+        except Exception as e:
+            logger.warning(f"RedisStorage: 清除上传缓存失败: {e}")
+
+    async def get_video_context(self, video_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.redis.get(f"{self.prefix_video_ctx}{video_id}")
+            return json_loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"RedisStorage: 读取视频上下文失败: {e}")
+            return None
+
+    async def set_video_context(self, video_id: str, ctx: Dict[str, Any], ttl: int):
+        try:
+            await self.redis.set(
+                f"{self.prefix_video_ctx}{video_id}",
+                json_dumps(ctx),
+                ex=max(1, int(ttl)),
+            )
+        except Exception as e:
+            logger.warning(f"RedisStorage: 写入视频上下文失败: {e}")
+
+    async def get_public_session(
+        self, kind: str, task_id: str
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.redis.hgetall(
+                f"{self.prefix_public_session}{kind}:{task_id}"
+            )
+        except Exception as e:
+            logger.warning(f"RedisStorage: 读取 Public 会话失败: {e}")
+            return None
+        if not raw:
+            return None
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json_loads(v)
+            for k, v in raw.items()
+        }
+
+    async def set_public_session(
+        self, kind: str, task_id: str, info: Dict[str, Any], ttl: int
+    ):
+        key = f"{self.prefix_public_session}{kind}:{task_id}"
+        try:
+            async with self.redis.pipeline() as pipe:
+                pipe.hset(key, mapping={k: json_dumps(v) for k, v in info.items()})
+                pipe.expire(key, max(1, int(ttl)))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"RedisStorage: 写入 Public 会话失败: {e}")
+
+    async def delete_public_sessions(self, kind: str, task_ids: list) -> int:
+        keys = [f"{self.prefix_public_session}{kind}:{tid}" for tid in task_ids if tid]
+        if not keys:
+            return 0
+        try:
+            return int(await self.redis.delete(*keys) or 0)
+        except Exception as e:
+            logger.warning(f"RedisStorage: 删除 Public 会话失败: {e}")
+            return 0
+
+    async def save_batch_task(
+        self,
+        task_id: str,
+        state: Dict[str, Any],
+        ttl: int,
+        items: Optional[List[str]] = None,
+    ):
+        ttl = max(1, int(ttl))
+        key = f"{self.prefix_batch}{task_id}"
+        try:
+            async with self.redis.pipeline() as pipe:
+                pipe.set(key, json_dumps(state), ex=ttl)
+                if items is not None:
+                    pipe.set(f"{key}:items", json_dumps(items), ex=ttl)
+                else:
+                    pipe.expire(f"{key}:items", ttl)
+                pipe.expire(f"{key}:cancel", ttl)
+                pipe.sadd(self.batch_index_key, task_id)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"RedisStorage: 保存批量任务失败: {e}")
+
+    async def load_batch_task(
+        self, task_id: str, with_items: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        key = f"{self.prefix_batch}{task_id}"
+        try:
+            if with_items:
+                raw, cancel, raw_items = await self.redis.mget(
+                    key, f"{key}:cancel", f"{key}:items"
+                )
+            else:
+                raw, cancel = await self.redis.mget(key, f"{key}:cancel")
+                raw_items = None
+        except Exception as e:
+            logger.warning(f"RedisStorage: 读取批量任务失败: {e}")
+            return None
+        if not raw:
+            return None
+        state = json_loads(raw)
+        if cancel:
+            state["cancel_requested"] = True
+        if with_items:
+            state["items"] = json_loads(raw_items) if raw_items else []
+        return state
+
+    async def request_batch_cancel(self, task_id: str, ttl: int):
+        try:
+            await self.redis.set(
+                f"{self.prefix_batch}{task_id}:cancel", "1", ex=max(1, int(ttl))
+            )
+        except Exception as e:
+            logger.warning(f"RedisStorage: 写入批量任务取消标记失败: {e}")
+
+    async def list_batch_tasks(self) -> List[Dict[str, Any]]:
+        try:
+            task_ids = list(await self.redis.smembers(self.batch_index_key))
+            if not task_ids:
+                return []
+            raws = await self.redis.mget([f"{self.prefix_batch}{tid}" for tid in task_ids])
+        except Exception as e:
+            logger.warning(f"RedisStorage: 列出批量任务失败: {e}")
+            return []
+        states = []
+        expired = []
+        for task_id, raw in zip(task_ids, raws):
+            if raw:
+                states.append(json_loads(raw))
+            else:
+                expired.append(task_id)
+        if expired:
+            try:
+                await self.redis.srem(self.batch_index_key, *expired)
+            except Exception:
+                pass
+        return states
+
+    async def publish_batch_event(self, task_id: str, event: Dict[str, Any]) -> bool:
+        try:
+            await self.redis.publish(
+                f"{self.prefix_batch_events}{task_id}", json_dumps(event)
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"RedisStorage: 广播批量任务事件失败: {e}")
+            return False
+
+    async def subscribe_batch_events(
+        self, task_id: str, idle_timeout: float = 15.0
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(f"{self.prefix_batch_events}{task_id}")
+        try:
+            idle = 0.0
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message and message.get("type") == "message":
+                    idle = 0.0
+                    yield json_loads(message["data"])
+                    continue
+                idle += 1.0
+                if idle >= idle_timeout:
+                    idle = 0.0
+                    yield None
+        finally:
+            try:
+                await pubsub.unsubscribe()
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                await close()
+            except Exception:
+                pass
+
+    async def consume_token(
+        self, token: str, pool_name: str, cost: int
+    ) -> Optional[Dict[str, Any]]:
+        now_ms = int(time.time() * 1000)
+        try:
+            res = await self._run_token_script(
+                self._consume_script, token, pool_name, [cost, now_ms]
+            )
+        except Exception as e:
+            logger.warning(f"RedisStorage: 原子扣减配额失败: {e}")
+            return None
+        if not res:
+            return None
+        quota, use_count, status = res
+        fields = {
+            "quota": int(quota),
+            "use_count": int(use_count),
+            "last_used_at": now_ms,
+            "status": status,
+        }
+        self._remember_fields(token, fields)
+        return fields
+
+    async def record_token_fail(
+        self, token: str, pool_name: str, reason: str, threshold: int
+    ) -> Optional[Dict[str, Any]]:
+        now_ms = int(time.time() * 1000)
+        try:
+            res = await self._run_token_script(
+                self._record_fail_script,
+                token,
+                pool_name,
+                [now_ms, reason or "", threshold],
+            )
+        except Exception as e:
+            logger.warning(f"RedisStorage: 原子记录失败次数失败: {e}")
+            return None
+        if not res:
+            return None
+        fail_count, status = res
+        fields = {
+            "fail_count": int(fail_count),
+            "last_fail_at": now_ms,
+            "last_fail_reason": reason or "",
+            "status": status,
+        }
+        self._remember_fields(token, fields)
+        return fields
+
     async def close(self):
         try:
             await self.redis.close()
@@ -574,6 +1323,11 @@ class SQLStorage(BaseStorage):
         )
         self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
         self._initialized = False
+        # 本进程最近一次写入的 data_hash（跳过未变化的行）与已知的全部 token
+        self._row_hashes: Dict[str, str] = {}
+        self._known_tokens: Optional[set] = None
+        # 上次清理过期视频上下文的时间
+        self._video_ctx_purged_at = 0.0
 
     async def _ensure_schema(self):
         """确保数据库表存在"""
@@ -620,20 +1374,52 @@ class SQLStorage(BaseStorage):
                 """)
                 )
 
+                # 视频续写上下文表（expires_at 过期，写入时顺带清理）
+                await conn.execute(
+                    text("""
+                    CREATE TABLE IF NOT EXISTS video_contexts (
+                        video_id VARCHAR(128) PRIMARY KEY,
+                        token VARCHAR(512) NOT NULL,
+                        conversation_id VARCHAR(128),
+                        created_at BIGINT,
+                        expires_at BIGINT NOT NULL
+                    )
+                """)
+                )
+
+                # 批量任务表（状态频繁更新，处理项只在创建时写入）
+                await conn.execute(
+                    text("""
+                    CREATE TABLE IF NOT EXISTS batch_tasks (
+                        task_id VARCHAR(64) PRIMARY KEY,
+                        state TEXT,
+                        items TEXT,
+                        cancel_requested INT NOT NULL DEFAULT 0,
+                        expires_at BIGINT NOT NULL
+                    )
+                """)
+                )
+
                 # 索引
+                index_defs = [
+                    ("idx_tokens_pool", "pool_name"),
+                    ("idx_tokens_updated", "updated_at"),
+                ]
                 if self.dialect in ("postgres", "postgresql", "pgsql"):
-                    await conn.execute(
-                        text(
-                            "CREATE INDEX IF NOT EXISTS idx_tokens_pool ON tokens (pool_name)"
-                        )
-                    )
-                else:
-                    try:
+                    for index_name, column in index_defs:
                         await conn.execute(
-                            text("CREATE INDEX idx_tokens_pool ON tokens (pool_name)")
+                            text(
+                                f"CREATE INDEX IF NOT EXISTS {index_name} ON tokens ({column})"
+                            )
                         )
-                    except Exception:
-                        pass
+                else:
+                    for index_name, column in index_defs:
+                        try:
+                            await conn.execute(
+                                text(f"CREATE INDEX {index_name} ON tokens ({column})")
+                            )
+                        except Exception:
+                            pass
 
                 # 补齐旧表字段
                 columns = [
@@ -760,9 +1546,79 @@ class SQLStorage(BaseStorage):
             "last_asset_clear_at": token_data.get("last_asset_clear_at"),
             "data": data_json,
             "data_hash": data_hash,
-            "updated_at": 0,
+            "updated_at": int(time.time() * 1000),
         }
 
+    _TOKEN_COLUMNS = (
+        "token, pool_name, status, quota, created_at, "
+        "last_used_at, use_count, fail_count, last_fail_at, "
+        "last_fail_reason, last_sync_at, tags, note, "
+        "last_asset_clear_at, data"
+    )
+
+    def _row_to_token_data(self, row) -> Optional[Dict[str, Any]]:
+        """将 _TOKEN_COLUMNS 查询行还原为 token_data"""
+        (
+            token_str,
+            _pool_name,
+            status,
+            quota,
+            created_at,
+            last_used_at,
+            use_count,
+            fail_count,
+            last_fail_at,
+            last_fail_reason,
+            last_sync_at,
+            tags,
+            note,
+            last_asset_clear_at,
+            data_json,
+        ) = tuple(row)[:15]
+
+        try:
+            token_data = {}
+            if token_str:
+                token_data["token"] = token_str
+            if status is not None:
+                token_data["status"] = self._normalize_status(status)
+            if quota is not None:
+                token_data["quota"] = int(quota)
+            if created_at is not None:
+                token_data["created_at"] = int(created_at)
+            if last_used_at is not None:
+                token_data["last_used_at"] = int(last_used_at)
+            if use_count is not None:
+                token_data["use_count"] = int(use_count)
+            if fail_count is not None:
+                token_data["fail_count"] = int(fail_count)
+            if last_fail_at is not None:
+                token_data["last_fail_at"] = int(last_fail_at)
+            if last_fail_reason is not None:
+                token_data["last_fail_reason"] = last_fail_reason
+            if last_sync_at is not None:
+                token_data["last_sync_at"] = int(last_sync_at)
+            if tags is not None:
+                token_data["tags"] = self._parse_tags(tags)
+            if note is not None:
+                token_data["note"] = note
+            if last_asset_clear_at is not None:
+                token_data["last_asset_clear_at"] = int(last_asset_clear_at)
+
+            legacy_data = None
+            if data_json:
+                if isinstance(data_json, str):
+                    legacy_data = json_loads(data_json)
+                else:
+                    legacy_data = data_json
+            if isinstance(legacy_data, dict):
+                for key, val in legacy_data.items():
+                    if key not in token_data or token_data[key] is None:
+                        token_data[key] = val
+            return token_data
+        except Exception:
+            return None
+
     async def _migrate_legacy_tokens(self):
         """将旧版 data JSON 回填到平铺字段"""
         from sqlalchemy import text
@@ -965,89 +1821,86 @@ class SQLStorage(BaseStorage):
         try:
             async with self.async_session() as session:
                 res = await session.execute(
-                    text(
-                        "SELECT token, pool_name, status, quota, created_at, "
-                        "last_used_at, use_count, fail_count, last_fail_at, "
-                        "last_fail_reason, last_sync_at, tags, note, "
-                        "last_asset_clear_at, data "
-                        "FROM tokens"
-                    )
+                    text(f"SELECT {self._TOKEN_COLUMNS} FROM tokens")
                 )
                 rows = res.fetchall()
                 if not rows:
                     return None
 
                 pools = {}
-                for (
-                    token_str,
-                    pool_name,
-                    status,
-                    quota,
-                    created_at,
-                    last_used_at,
-                    use_count,
-                    fail_count,
-                    last_fail_at,
-                    last_fail_reason,
-                    last_sync_at,
-                    tags,
-                    note,
-                    last_asset_clear_at,
-                    data_json,
-                ) in rows:
+                for row in rows:
+                    pool_name = row[1]
                     if pool_name not in pools:
                         pools[pool_name] = []
-
-                    try:
-                        token_data = {}
-                        if token_str:
-                            token_data["token"] = token_str
-                        if status is not None:
-                            token_data["status"] = self._normalize_status(status)
-                        if quota is not None:
-                            token_data["quota"] = int(quota)
-                        if created_at is not None:
-                            token_data["created_at"] = int(created_at)
-                        if last_used_at is not None:
-                            token_data["last_used_at"] = int(last_used_at)
-                        if use_count is not None:
-                            token_data["use_count"] = int(use_count)
-                        if fail_count is not None:
-                            token_data["fail_count"] = int(fail_count)
-                        if last_fail_at is not None:
-                            token_data["last_fail_at"] = int(last_fail_at)
-                        if last_fail_reason is not None:
-                            token_data["last_fail_reason"] = last_fail_reason
-                        if last_sync_at is not None:
-                            token_data["last_sync_at"] = int(last_sync_at)
-                        if tags is not None:
-                            token_data["tags"] = self._parse_tags(tags)
-                        if note is not None:
-                            token_data["note"] = note
-                        if last_asset_clear_at is not None:
-                            token_data["last_asset_clear_at"] = int(
-                                last_asset_clear_at
-                            )
-
-                        legacy_data = None
-                        if data_json:
-                            if isinstance(data_json, str):
-                                legacy_data = json_loads(data_json)
-                            else:
-                                legacy_data = data_json
-                        if isinstance(legacy_data, dict):
-                            for key, val in legacy_data.items():
-                                if key not in token_data or token_data[key] is None:
-                                    token_data[key] = val
-
+                    token_data = self._row_to_token_data(row)
+                    if token_data is not None:
                         pools[pool_name].append(token_data)
-                    except Exception:
-                        pass
+                self._known_tokens = {row[0] for row in rows}
+                self._row_hashes.clear()
                 return pools
         except Exception as e:
             logger.error(f"SQLStorage: 加载 Token 失败: {e}")
             return None
 
+    async def get_tokens_cursor(self) -> Optional[str]:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        try:
+            async with self.async_session() as session:
+                res = await session.execute(text("SELECT MAX(updated_at) FROM tokens"))
+                return str(int(res.scalar() or 0))
+        except Exception as e:
+            logger.warning(f"SQLStorage: 获取变更游标失败: {e}")
+            return None
+
+    async def load_tokens_changes(self, cursor: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        try:
+            since = int(cursor)
+        except (TypeError, ValueError):
+            return None
+
+        try:
+            async with self.async_session() as session:
+                # 回看一小段时间窗口，兼容多写入方的时钟偏差与提交顺序
+                res = await session.execute(
+                    text(
+                        f"SELECT {self._TOKEN_COLUMNS}, updated_at FROM tokens "
+                        "WHERE updated_at > :since"
+                    ),
+                    {"since": since - SQL_TOKEN_CHANGES_LOOKBACK_MS},
+                )
+                rows = res.fetchall()
+                total = (
+                    await session.execute(text("SELECT COUNT(*) FROM tokens"))
+                ).scalar()
+
+            tokens: Dict[str, list] = {}
+            latest = since
+            for row in rows:
+                # 其他进程改写过的行不能再按本地 hash 跳过
+                self._row_hashes.pop(row[0], None)
+                if self._known_tokens is not None:
+                    self._known_tokens.add(row[0])
+                token_data = self._row_to_token_data(row)
+                if token_data is not None:
+                    tokens.setdefault(row[1], []).append(token_data)
+                if row[15] is not None:
+                    latest = max(latest, int(row[15]))
+
+            return {
+                "cursor": str(latest),
+                "tokens": tokens,
+                "deleted": [],
+                "total": int(total or 0),
+            }
+        except Exception as e:
+            logger.warning(f"SQLStorage: 读取 Token 变更失败: {e}")
+            return None
+
     async def save_tokens(self, data: Dict[str, Any]):
         await self._ensure_schema()
         from sqlalchemy import text
@@ -1077,7 +1930,8 @@ class SQLStorage(BaseStorage):
                 new_tokens.add(token_str)
 
         try:
-            existing_tokens = set()
+            # 全量替换较少发生：以数据库实际内容为准，
+            # 本进程的 _known_tokens 看不到其他 Worker 新增的 Token
             async with self.async_session() as session:
                 res = await session.execute(text("SELECT token FROM tokens"))
                 rows = res.fetchall()
@@ -1109,6 +1963,7 @@ class SQLStorage(BaseStorage):
 
                 updates = []
                 usage_updates = []
+                known = self._known_tokens or set()
 
                 for item in updated or []:
                     if not isinstance(item, dict):
@@ -1126,7 +1981,12 @@ class SQLStorage(BaseStorage):
                         if k not in ("pool_name", "_update_kind")
                     }
                     row = self._token_to_row(token_data, pool_name)
-                    if update_kind == "usage":
+                    # 与本进程上次写入的内容一致，跳过
+                    if self._row_hashes.get(row["token"]) == row["data_hash"]:
+                        continue
+                    if update_kind == "usage" and (
+                        row["token"] in self._row_hashes or row["token"] in known
+                    ):
                         usage_updates.append(row)
                     else:
                         updates.append(row)
@@ -1202,68 +2062,241 @@ class SQLStorage(BaseStorage):
                     await session.execute(upsert_stmt, updates)
 
                 if usage_updates:
-                    if self.dialect in ("mysql", "mariadb"):
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at) "
-                            "ON DUPLICATE KEY UPDATE "
-                            "pool_name=VALUES(pool_name), "
-                            "status=VALUES(status), "
-                            "quota=VALUES(quota), "
-                            "last_used_at=VALUES(last_used_at), "
-                            "use_count=VALUES(use_count), "
-                            "fail_count=VALUES(fail_count), "
-                            "last_fail_at=VALUES(last_fail_at), "
-                            "last_fail_reason=VALUES(last_fail_reason), "
-                            "last_sync_at=VALUES(last_sync_at), "
-                            "updated_at=VALUES(updated_at)"
-                        )
-                    elif self.dialect in ("postgres", "postgresql", "pgsql"):
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at) "
-                            "ON CONFLICT (token) DO UPDATE SET "
-                            "pool_name=EXCLUDED.pool_name, "
-                            "status=EXCLUDED.status, "
-                            "quota=EXCLUDED.quota, "
-                            "last_used_at=EXCLUDED.last_used_at, "
-                            "use_count=EXCLUDED.use_count, "
-                            "fail_count=EXCLUDED.fail_count, "
-                            "last_fail_at=EXCLUDED.last_fail_at, "
-                            "last_fail_reason=EXCLUDED.last_fail_reason, "
-                            "last_sync_at=EXCLUDED.last_sync_at, "
-                            "updated_at=EXCLUDED.updated_at"
-                        )
-                    else:
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at)"
-                        )
-                    await session.execute(usage_stmt, usage_updates)
+                    # 已存在的行仅更新状态/计数列，不重写 data 与 tags 等大字段
+                    usage_cols = (
+                        "pool_name",
+                        "status",
+                        "quota",
+                        "last_used_at",
+                        "use_count",
+                        "fail_count",
+                        "last_fail_at",
+                        "last_fail_reason",
+                        "last_sync_at",
+                        "updated_at",
+                    )
+                    usage_stmt = text(
+                        "UPDATE tokens SET "
+                        + ", ".join(f"{col}=:{col}" for col in usage_cols)
+                        + " WHERE token=:token"
+                    )
+                    await session.execute(
+                        usage_stmt,
+                        [
+                            {"token": row["token"], **{col: row[col] for col in usage_cols}}
+                            for row in usage_updates
+                        ],
+                    )
 
                 await session.commit()
+
+            for token_str in deleted_set:
+                self._row_hashes.pop(token_str, None)
+                if self._known_tokens is not None:
+                    self._known_tokens.discard(token_str)
+            for row in updates + usage_updates:
+                self._row_hashes[row["token"]] = row["data_hash"]
+                if self._known_tokens is not None:
+                    self._known_tokens.add(row["token"])
         except Exception as e:
             logger.error(f"SQLStorage: 增量保存 Token 失败: {e}")
             raise
 
+    async def get_video_context(self, video_id: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        now_ms = int(time.time() * 1000)
+        try:
+            async with self.async_session() as session:
+                res = await session.execute(
+                    text(
+                        "SELECT token, conversation_id, created_at FROM video_contexts "
+                        "WHERE video_id=:video_id AND expires_at>:now"
+                    ),
+                    {"video_id": video_id, "now": now_ms},
+                )
+                row = res.first()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 读取视频上下文失败: {e}")
+            return None
+        if not row:
+            return None
+        return {
+            "token": row[0],
+            "conversation_id": row[1] or "",
+            "ts": (row[2] or 0) / 1000,
+        }
+
+    async def set_video_context(self, video_id: str, ctx: Dict[str, Any], ttl: int):
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        now_ms = int(time.time() * 1000)
+        params = {
+            "video_id": video_id,
+            "token": ctx.get("token", ""),
+            "conversation_id": ctx.get("conversation_id", ""),
+            "created_at": int(float(ctx.get("ts") or time.time()) * 1000),
+            "expires_at": now_ms + max(1, int(ttl)) * 1000,
+        }
+        columns = (
+            "INSERT INTO video_contexts (video_id, token, conversation_id, created_at, expires_at) "
+            "VALUES (:video_id, :token, :conversation_id, :created_at, :expires_at)"
+        )
+        try:
+            async with self.async_session() as session:
+                if self.dialect in ("mysql", "mariadb"):
+                    await session.execute(
+                        text(
+                            f"{columns} ON DUPLICATE KEY UPDATE "
+                            "token=VALUES(token), "
+                            "conversation_id=VALUES(conversation_id), "
+                            "created_at=VALUES(created_at), "
+                            "expires_at=VALUES(expires_at)"
+                        ),
+                        params,
+                    )
+                elif self.dialect in ("postgres", "postgresql", "pgsql"):
+                    await session.execute(
+                        text(
+                            f"{columns} ON CONFLICT (video_id) DO UPDATE SET "
+                            "token=EXCLUDED.token, "
+                            "conversation_id=EXCLUDED.conversation_id, "
+                            "created_at=EXCLUDED.created_at, "
+                            "expires_at=EXCLUDED.expires_at"
+                        ),
+                        params,
+                    )
+                else:
+                    await session.execute(
+                        text("DELETE FROM video_contexts WHERE video_id=:video_id"),
+                        {"video_id": video_id},
+                    )
+                    await session.execute(text(columns), params)
+
+                # 过期记录按分钟级节流批量清理，单次写入的开销保持恒定
+                if time.time() - self._video_ctx_purged_at >= 60:
+                    self._video_ctx_purged_at = time.time()
+                    await session.execute(
+                        text("DELETE FROM video_contexts WHERE expires_at<=:now"),
+                        {"now": now_ms},
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 写入视频上下文失败: {e}")
+
+    async def save_batch_task(
+        self,
+        task_id: str,
+        state: Dict[str, Any],
+        ttl: int,
+        items: Optional[List[str]] = None,
+    ):
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        now_ms = int(time.time() * 1000)
+        params = {
+            "task_id": task_id,
+            "state": json_dumps(state),
+            "expires_at": now_ms + max(1, int(ttl)) * 1000,
+        }
+        try:
+            async with self.async_session() as session:
+                if items is None:
+                    await session.execute(
+                        text(
+                            "UPDATE batch_tasks SET state=:state, expires_at=:expires_at "
+                            "WHERE task_id=:task_id"
+                        ),
+                        params,
+                    )
+                else:
+                    params["items"] = json_dumps(items)
+                    await session.execute(
+                        text("DELETE FROM batch_tasks WHERE task_id=:task_id"),
+                        {"task_id": task_id},
+                    )
+                    await session.execute(
+                        text(
+                            "INSERT INTO batch_tasks (task_id, state, items, expires_at) "
+                            "VALUES (:task_id, :state, :items, :expires_at)"
+                        ),
+                        params,
+                    )
+                    await session.execute(
+                        text("DELETE FROM batch_tasks WHERE expires_at<=:now"),
+                        {"now": now_ms},
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 保存批量任务失败: {e}")
+
+    async def load_batch_task(
+        self, task_id: str, with_items: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        columns = "state, cancel_requested"
+        if with_items:
+            columns += ", items"
+        try:
+            async with self.async_session() as session:
+                res = await session.execute(
+                    text(
+                        f"SELECT {columns} FROM batch_tasks "
+                        "WHERE task_id=:task_id AND expires_at>:now"
+                    ),
+                    {"task_id": task_id, "now": int(time.time() * 1000)},
+                )
+                row = res.first()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 读取批量任务失败: {e}")
+            return None
+        if not row or not row[0]:
+            return None
+        state = json_loads(row[0])
+        if row[1]:
+            state["cancel_requested"] = True
+        if with_items:
+            state["items"] = json_loads(row[2]) if row[2] else []
+        return state
+
+    async def request_batch_cancel(self, task_id: str, ttl: int):
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        try:
+            async with self.async_session() as session:
+                await session.execute(
+                    text(
+                        "UPDATE batch_tasks SET cancel_requested=1 "
+                        "WHERE task_id=:task_id"
+                    ),
+                    {"task_id": task_id},
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 写入批量任务取消标记失败: {e}")
+
+    async def list_batch_tasks(self) -> List[Dict[str, Any]]:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        try:
+            async with self.async_session() as session:
+                res = await session.execute(
+                    text("SELECT state FROM batch_tasks WHERE expires_at>:now"),
+                    {"now": int(time.time() * 1000)},
+                )
+                rows = res.fetchall()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 列出批量任务失败: {e}")
+            return []
+        return [json_loads(row[0]) for row in rows if row[0]]
+
     async def close(self):
         await self.engine.dispose()
 
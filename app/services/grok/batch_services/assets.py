@@ -9,7 +9,8 @@ from app.core.config import get_config
 from app.core.logger import logger
 from app.services.reverse.assets_list import AssetsListReverse
 from app.services.reverse.assets_delete import AssetsDeleteReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import PooledSession, acquire_session
+from app.services.grok.utils.upload_cache import get_upload_cache
 from app.core.batch import run_batch
 
 
@@ -17,15 +18,11 @@ class BaseAssetsService:
     """Base assets service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
 
-    async def _get_session(self) -> ResettableSession:
+    async def _get_session(self) -> PooledSession:
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = acquire_session()
         return self._session
 
     async def close(self):
@@ -210,6 +207,7 @@ class DeleteService(BaseAssetsService):
                 asset_ids = result.get("asset_ids", [])
                 result = await delete_service.delete(token, asset_ids)
                 await mgr.mark_asset_clear(token)
+                await get_upload_cache().forget_token(token)
                 if include_ok:
                     return {"ok": True, "result": result}
                 return {"status": "success", "result": result}
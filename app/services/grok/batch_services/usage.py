@@ -8,7 +8,7 @@ from typing import Callable, Awaitable, Dict, Any, Optional, List
 from app.core.logger import logger
 from app.core.config import get_config
 from app.services.reverse.rate_limits import RateLimitsReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import acquire_session
 from app.core.batch import run_batch
 
 _USAGE_SEMAPHORE = None
@@ -42,12 +42,7 @@ class UsageService:
         """
         async with _get_usage_semaphore():
             try:
-                browser = get_config("proxy.browser")
-                if browser:
-                    session_ctx = ResettableSession(impersonate=browser)
-                else:
-                    session_ctx = ResettableSession()
-                async with session_ctx as session:
+                async with acquire_session() as session:
                     response = await RateLimitsReverse.request(session, token)
                 data = response.json()
                 remaining = data.get("remainingTokens")
@@ -4,7 +4,6 @@ Grok Chat 服务
 
 import asyncio
 import re
-import uuid
 from typing import Dict, List, Any, AsyncGenerator, AsyncIterable
 
 import orjson
@@ -13,18 +12,26 @@ from curl_cffi.requests.errors import RequestsError
 from app.core.logger import logger
 from app.core.config import get_config
 from app.core.exceptions import (
-    AppException,
     ValidationException,
-    ErrorType,
     UpstreamException,
     StreamIdleTimeoutError,
 )
 from app.services.grok.services.model import ModelService
 from app.services.grok.utils.upload import UploadService
 from app.services.grok.utils import process as proc_base
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.frames import (
+    FRAME_CARD,
+    FRAME_IMAGE,
+    FRAME_MODEL,
+    FRAME_OTHER,
+    FRAME_THINKING,
+    FRAME_TOKEN,
+    iter_frames,
+)
+from app.services.grok.utils.response import ChatChunkEncoder
+from app.services.grok.utils.retry import pick_token, no_token_error, rate_limited
 from app.services.reverse.app_chat import AppChatReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import acquire_session
 from app.services.grok.utils.stream import wrap_stream_with_usage
 from app.services.token import get_token_manager, EffortType
 
@@ -187,10 +194,8 @@ class GrokChatService:
             f"Chat request: model={model}, mode={mode}, stream={stream}, attachments={len(file_attachments or [])}"
         )
 
-        browser = get_config("proxy.browser")
-
         async def _stream():
-            session = ResettableSession(impersonate=browser)
+            session = acquire_session()
             try:
                 async with _get_chat_semaphore():
                     stream_response = await AppChatReverse.request(
@@ -247,14 +252,16 @@ class GrokChatService:
         if file_attachments or image_attachments:
             upload_service = UploadService()
             try:
-                for attach_data in file_attachments:
-                    file_id, _ = await upload_service.upload_file(attach_data, token)
-                    file_ids.append(file_id)
-                    logger.debug(f"Attachment uploaded: type=file, file_id={file_id}")
-                for attach_data in image_attachments:
-                    file_id, _ = await upload_service.upload_file(attach_data, token)
-                    image_ids.append(file_id)
-                    logger.debug(f"Attachment uploaded: type=image, file_id={file_id}")
+                uploaded = await upload_service.upload_files(
+                    file_attachments + image_attachments, token
+                )
+                for index, (file_id, _) in enumerate(uploaded):
+                    if index < len(file_attachments):
+                        file_ids.append(file_id)
+                        logger.debug(f"Attachment uploaded: type=file, file_id={file_id}")
+                    else:
+                        image_ids.append(file_id)
+                        logger.debug(f"Attachment uploaded: type=image, file_id={file_id}")
             finally:
                 await upload_service.close()
 
@@ -292,6 +299,7 @@ class ChatService:
         reasoning_effort: str | None = None,
         temperature: float = 0.8,
         top_p: float = 0.95,
+        stream_options: Dict[str, Any] | None = None,
     ):
         """Chat Completions 入口"""
         # 获取 token
@@ -305,6 +313,15 @@ class ChatService:
             show_think = reasoning_effort != "none"
         is_stream = stream if stream is not None else get_config("app.stream")
 
+        # 流式合并：请求参数优先，未指定时使用配置默认值（0 表示逐 token 输出）
+        stream_options = stream_options or {}
+        coalesce_ms = stream_options.get("coalesce_ms")
+        if coalesce_ms is None:
+            coalesce_ms = get_config("chat.stream_coalesce_ms", 0)
+        coalesce_bytes = stream_options.get("coalesce_bytes")
+        if coalesce_bytes is None:
+            coalesce_bytes = get_config("chat.stream_coalesce_bytes", 0)
+
         # 跨 Token 重试循环
         tried_tokens = set()
         max_token_retries = int(get_config("retry.max_retry"))
@@ -316,14 +333,10 @@ class ChatService:
             if not token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_token_error(token_mgr)
 
             tried_tokens.add(token)
+            lease = token_mgr.lease(token)
 
             try:
                 # 请求 Grok
@@ -341,9 +354,20 @@ class ChatService:
                 # 处理响应
                 if is_stream:
                     logger.debug(f"Processing stream response: model={model}")
-                    processor = StreamProcessor(model_name, token, show_think)
+                    processor = StreamProcessor(
+                        model_name,
+                        token,
+                        show_think,
+                        coalesce_ms=coalesce_ms,
+                        coalesce_bytes=coalesce_bytes,
+                    )
+                    stream_lease, lease = lease, None
                     return wrap_stream_with_usage(
-                        processor.process(response), token_mgr, token, model
+                        processor.process(response),
+                        token_mgr,
+                        token,
+                        model,
+                        lease=stream_lease,
                     )
 
                 # 非流式
@@ -377,21 +401,27 @@ class ChatService:
                 # 非 429 错误，不换 token，直接抛出
                 raise
 
+            finally:
+                if lease:
+                    lease.release()
+
         # 所有 token 都 429，抛出最后的错误
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_token_error(token_mgr)
 
 
 class StreamProcessor(proc_base.BaseProcessor):
     """Stream response processor."""
 
-    def __init__(self, model: str, token: str = "", show_think: bool = None):
+    def __init__(
+        self,
+        model: str,
+        token: str = "",
+        show_think: bool = None,
+        coalesce_ms: int = 0,
+        coalesce_bytes: int = 0,
+    ):
         super().__init__(model, token)
         self.response_id: str = None
         self.fingerprint: str = ""
@@ -407,6 +437,40 @@ class StreamProcessor(proc_base.BaseProcessor):
         self._tool_usage_buffer = ""
 
         self.show_think = bool(show_think)
+        self._encoder = ChatChunkEncoder(self.model, self.created)
+
+        # Token coalescing: buffer deltas for up to N ms / M bytes (0 = off)
+        self.coalesce_window = max(0, int(coalesce_ms or 0)) / 1000
+        self.coalesce_bytes = max(0, int(coalesce_bytes or 0))
+        self._coalesce = bool(self.coalesce_window or self.coalesce_bytes)
+        self._pending: list[str] = []
+        self._pending_size = 0
+        self._pending_deadline: float | None = None
+
+    def _flush_deadline(self) -> float | None:
+        return self._pending_deadline
+
+    def _buffer(self, text: str) -> bool:
+        """Buffer a coalesced delta; return True when it should be flushed."""
+        self._pending.append(text)
+        self._pending_size += len(text.encode())
+        if self.coalesce_bytes and self._pending_size >= self.coalesce_bytes:
+            return True
+        if self.coalesce_window:
+            now = asyncio.get_running_loop().time()
+            if self._pending_deadline is None:
+                self._pending_deadline = now + self.coalesce_window
+            elif now >= self._pending_deadline:
+                return True
+        return False
+
+    def _flush(self) -> bytes:
+        """Emit buffered deltas as a single chunk."""
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        self._pending_deadline = None
+        return self._sse(text)
 
     def _filter_tool_card(self, token: str) -> str:
         if not token or not self.tool_usage_enabled:
@@ -481,56 +545,41 @@ class StreamProcessor(proc_base.BaseProcessor):
 
         return token
 
-    def _sse(self, content: str = "", role: str = None, finish: str = None) -> str:
+    def _sse(self, content: str = "", role: str = None, finish: str = None) -> bytes:
         """Build SSE response."""
-        delta = {}
-        if role:
-            delta["role"] = role
-            delta["content"] = ""
-        elif content:
-            delta["content"] = content
-
-        chunk = {
-            "id": self.response_id or f"chatcmpl-{uuid.uuid4().hex[:24]}",
-            "object": "chat.completion.chunk",
-            "created": self.created,
-            "model": self.model,
-            "system_fingerprint": self.fingerprint,
-            "choices": [
-                {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
-            ],
-        }
-        return f"data: {orjson.dumps(chunk).decode()}\n\n"
+        return self._encoder.chunk(
+            content, role, finish, self.response_id, self.fingerprint
+        )
 
-    async def process(self, response: AsyncIterable[bytes]) -> AsyncGenerator[str, None]:
+    async def process(self, response: AsyncIterable[bytes]) -> AsyncGenerator[bytes, None]:
         """Process stream response.
         
         Args:
             response: AsyncIterable[bytes], async iterable of bytes
 
         Returns:
-            AsyncGenerator[str, None], async generator of strings
+            AsyncGenerator[bytes, None], async generator of SSE chunks
         """
         idle_timeout = get_config("chat.stream_timeout")
 
         try:
-            async for line in proc_base._with_idle_timeout(
-                response, idle_timeout, self.model
-            ):
-                line = proc_base._normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
+            frames = iter_frames(
+                proc_base._with_idle_timeout(response, idle_timeout, self.model)
+            )
+            if self._coalesce:
+                frames = proc_base._with_flush_deadline(frames, self._flush_deadline)
+
+            async for frame in frames:
+                if frame is None:
+                    # Coalescing window elapsed while waiting upstream
+                    if self._pending:
+                        yield self._flush()
                     continue
 
-                resp = data.get("result", {}).get("response", {})
-                is_thinking = bool(resp.get("isThinking"))
-                # isThinking controls <think> tagging
-                # when absent, treat as False
+                kind = frame.kind
+                resp = frame.resp
 
-                if (llm := resp.get("llmInfo")) and not self.fingerprint:
+                if not self.fingerprint and (llm := resp.get("llmInfo")):
                     self.fingerprint = llm.get("modelHash", "")
                 if rid := resp.get("responseId"):
                     self.response_id = rid
@@ -541,7 +590,42 @@ class StreamProcessor(proc_base.BaseProcessor):
                     yield self._sse(role="assistant")
                     self.role_sent = True
 
-                if img := resp.get("streamingImageGenerationResponse"):
+                # Token deltas dominate the stream; handle them first.
+                # isThinking controls <think> tagging, absent means False.
+                if kind == FRAME_TOKEN or kind == FRAME_THINKING:
+                    token = frame.token
+                    if not token:
+                        continue
+                    filtered = self._filter_token(token)
+                    if not filtered:
+                        continue
+                    in_think = frame.thinking or self.image_think_active
+                    if in_think:
+                        if not self.show_think:
+                            continue
+                        if not self.think_opened:
+                            if self._pending:
+                                yield self._flush()
+                            yield self._sse("<think>\n")
+                            self.think_opened = True
+                    else:
+                        if self.think_opened:
+                            if self._pending:
+                                yield self._flush()
+                            yield self._sse("\n</think>\n")
+                            self.think_opened = False
+                    if self._coalesce:
+                        if self._buffer(filtered):
+                            yield self._flush()
+                        continue
+                    yield self._sse(filtered)
+                    continue
+
+                if self._pending and kind != FRAME_OTHER:
+                    yield self._flush()
+
+                if kind == FRAME_IMAGE:
+                    img = frame.payload
                     if not self.show_think:
                         continue
                     self.image_think_active = True
@@ -555,7 +639,8 @@ class StreamProcessor(proc_base.BaseProcessor):
                     )
                     continue
 
-                if mr := resp.get("modelResponse"):
+                if kind == FRAME_MODEL:
+                    mr = frame.payload
                     if self.image_think_active and self.think_opened:
                         yield self._sse("\n</think>\n")
                         self.think_opened = False
@@ -577,8 +662,8 @@ class StreamProcessor(proc_base.BaseProcessor):
                         self.fingerprint = meta["llm_info"]["modelHash"]
                     continue
 
-                if card := resp.get("cardAttachment"):
-                    json_data = card.get("jsonData")
+                if kind == FRAME_CARD:
+                    json_data = frame.payload.get("jsonData")
                     if isinstance(json_data, str) and json_data.strip():
                         try:
                             card_data = orjson.loads(json_data)
@@ -594,31 +679,13 @@ class StreamProcessor(proc_base.BaseProcessor):
                                     yield self._sse(f"![{title_safe}]({original})\n")
                                 else:
                                     yield self._sse(f"![image]({original})\n")
-                    continue
-
-                if (token := resp.get("token")) is not None:
-                    if not token:
-                        continue
-                    filtered = self._filter_token(token)
-                    if not filtered:
-                        continue
-                    in_think = is_thinking or self.image_think_active
-                    if in_think:
-                        if not self.show_think:
-                            continue
-                        if not self.think_opened:
-                            yield self._sse("<think>\n")
-                            self.think_opened = True
-                    else:
-                        if self.think_opened:
-                            yield self._sse("\n</think>\n")
-                            self.think_opened = False
-                    yield self._sse(filtered)
 
+            if self._pending:
+                yield self._flush()
             if self.think_opened:
                 yield self._sse("</think>\n")
             yield self._sse(finish="stop")
-            yield "data: [DONE]\n\n"
+            yield self._encoder.done()
         except asyncio.CancelledError:
             logger.debug("Stream cancelled by client", extra={"model": self.model})
         except StreamIdleTimeoutError as e:
@@ -703,23 +770,14 @@ class CollectProcessor(proc_base.BaseProcessor):
         idle_timeout = get_config("chat.stream_timeout")
 
         try:
-            async for line in proc_base._with_idle_timeout(
-                response, idle_timeout, self.model
+            async for frame in iter_frames(
+                proc_base._with_idle_timeout(response, idle_timeout, self.model)
             ):
-                line = proc_base._normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                resp = data.get("result", {}).get("response", {})
-
-                if (llm := resp.get("llmInfo")) and not fingerprint:
+                if not fingerprint and (llm := frame.resp.get("llmInfo")):
                     fingerprint = llm.get("modelHash", "")
 
-                if mr := resp.get("modelResponse"):
+                if frame.kind == FRAME_MODEL:
+                    mr = frame.payload
                     response_id = mr.get("responseId", "")
                     content = mr.get("message", "")
 
@@ -15,9 +15,11 @@ import orjson
 from app.core.config import get_config
 from app.core.logger import logger
 from app.core.storage import DATA_DIR
-from app.core.exceptions import AppException, ErrorType, UpstreamException
+from app.core.exceptions import UpstreamException
+from app.services.grok.utils.b64 import payload_startswith, split_data_uri
+from app.services.grok.utils.cache_index import get_cache_index
 from app.services.grok.utils.process import BaseProcessor
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.retry import pick_token, no_token_error, rate_limited
 from app.services.grok.utils.response import make_response_id, make_chat_chunk, wrap_image_content
 from app.services.grok.utils.stream import wrap_stream_with_usage
 from app.services.token import EffortType
@@ -67,14 +69,10 @@ class ImageGenerationService:
                     if not current_token:
                         if last_error:
                             raise last_error
-                        raise AppException(
-                            message="No available tokens. Please try again later.",
-                            error_type=ErrorType.RATE_LIMIT.value,
-                            code="rate_limit_exceeded",
-                            status_code=429,
-                        )
+                        raise no_token_error(token_mgr)
 
                     tried_tokens.add(current_token)
+                    lease = token_mgr.lease(current_token)
                     yielded = False
                     try:
                         result = await self._stream_ws(
@@ -105,15 +103,12 @@ class ImageGenerationService:
                             )
                             continue
                         raise
+                    finally:
+                        lease.release()
 
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_token_error(token_mgr)
 
             return ImageGenerationResult(stream=True, data=_stream_retry())
 
@@ -125,14 +120,10 @@ class ImageGenerationService:
             if not current_token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_token_error(token_mgr)
 
             tried_tokens.add(current_token)
+            lease = token_mgr.lease(current_token)
             try:
                 return await self._collect_ws(
                     token_mgr=token_mgr,
@@ -161,15 +152,12 @@ class ImageGenerationService:
                         )
                     continue
                 raise
+            finally:
+                lease.release()
 
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_token_error(token_mgr)
 
     async def _stream_ws(
         self,
@@ -328,25 +316,19 @@ class ImageWSBaseProcessor(BaseProcessor):
     def _strip_base64(self, blob: str) -> str:
         if not blob:
             return ""
-        if "," in blob and "base64" in blob.split(",", 1)[0]:
-            return blob.split(",", 1)[1]
-        return blob
+        return split_data_uri(blob)[1]
 
     def _guess_ext(self, blob: str) -> Optional[str]:
         if not blob:
             return None
-        header = ""
-        data = blob
-        if "," in blob and "base64" in blob.split(",", 1)[0]:
-            header, data = blob.split(",", 1)
-        header = header.lower()
+        header = blob[: blob.find(",", 0, 256) + 1].lower()
         if "image/png" in header:
             return "png"
         if "image/jpeg" in header or "image/jpg" in header:
             return "jpg"
-        if data.startswith("iVBORw0KGgo"):
+        if payload_startswith(blob, "iVBORw0KGgo"):
             return "png"
-        if data.startswith("/9j/"):
+        if payload_startswith(blob, "/9j/"):
             return "jpg"
         return None
 
@@ -378,8 +360,10 @@ class ImageWSBaseProcessor(BaseProcessor):
         filepath = image_dir / filename
 
         def _write_file():
+            raw = base64.b64decode(data)
             with open(filepath, "wb") as f:
-                f.write(base64.b64decode(data))
+                f.write(raw)
+            get_cache_index().record("image", filename, len(raw))
 
         await asyncio.to_thread(_write_file)
         return self._build_file_url(filename)
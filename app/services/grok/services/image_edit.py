@@ -24,12 +24,13 @@ from app.core.logger import logger
 from app.services.grok.utils.process import (
     BaseProcessor,
     _with_idle_timeout,
-    _normalize_line,
     _collect_images,
     _is_http2_error,
 )
+from app.services.grok.utils.frames import FRAME_IMAGE, FRAME_MODEL, iter_frames
+from app.services.grok.utils.spool import UploadSpool
 from app.services.grok.utils.upload import UploadService
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.retry import pick_token, no_token_error, rate_limited
 from app.services.grok.utils.response import make_response_id, make_chat_chunk, wrap_image_content
 from app.services.grok.services.chat import GrokChatService
 from app.services.grok.services.video import VideoService
@@ -53,7 +54,7 @@ class ImageEditService:
         token: str,
         model_info: Any,
         prompt: str,
-        images: List[str],
+        images: List[Union[str, UploadSpool]],
         n: int,
         response_format: str,
         stream: bool,
@@ -71,14 +72,10 @@ class ImageEditService:
             if not current_token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_token_error(token_mgr)
 
             tried_tokens.add(current_token)
+            lease = token_mgr.lease(current_token)
             try:
                 image_urls = await self._upload_images(images, current_token)
                 parent_post_id = await self._get_parent_post_id(
@@ -117,6 +114,7 @@ class ImageEditService:
                         response_format=response_format,
                         chat_format=chat_format,
                     )
+                    stream_lease, lease = lease, None
                     return ImageEditResult(
                         stream=True,
                         data=wrap_stream_with_usage(
@@ -124,6 +122,7 @@ class ImageEditService:
                             token_mgr,
                             current_token,
                             model_info.model_id,
+                            lease=stream_lease,
                         ),
                     )
 
@@ -160,22 +159,21 @@ class ImageEditService:
                     )
                     continue
                 raise
+            finally:
+                if lease:
+                    lease.release()
 
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
-
-    async def _upload_images(self, images: List[str], token: str) -> List[str]:
+        raise no_token_error(token_mgr)
+
+    async def _upload_images(
+        self, images: List[Union[str, UploadSpool]], token: str
+    ) -> List[str]:
         image_urls: List[str] = []
         upload_service = UploadService()
         try:
-            for image in images:
-                _, file_uri = await upload_service.upload_file(image, token)
+            for _, file_uri in await upload_service.upload_files(images, token):
                 if file_uri:
                     if file_uri.startswith("http"):
                         image_urls.append(file_uri)
@@ -319,19 +317,12 @@ class ImageStreamProcessor(BaseProcessor):
         idle_timeout = get_config("image.stream_timeout")
 
         try:
-            async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                resp = data.get("result", {}).get("response", {})
-
+            async for frame in iter_frames(
+                _with_idle_timeout(response, idle_timeout, self.model)
+            ):
                 # Image generation progress
-                if img := resp.get("streamingImageGenerationResponse"):
+                if frame.kind == FRAME_IMAGE:
+                    img = frame.payload
                     image_index = img.get("imageIndex", 0)
                     progress = img.get("progress", 0)
 
@@ -367,7 +358,8 @@ class ImageStreamProcessor(BaseProcessor):
                     continue
 
                 # modelResponse
-                if mr := resp.get("modelResponse"):
+                if frame.kind == FRAME_MODEL:
+                    mr = frame.payload
                     if urls := _collect_images(mr):
                         for url in urls:
                             if self.response_format == "url":
@@ -377,14 +369,10 @@ class ImageStreamProcessor(BaseProcessor):
                                 continue
                             try:
                                 dl_service = self._get_dl()
-                                base64_data = await dl_service.parse_b64(
+                                _, b64 = await dl_service.fetch_b64(
                                     url, self.token, "image"
                                 )
-                                if base64_data:
-                                    if "," in base64_data:
-                                        b64 = base64_data.split(",", 1)[1]
-                                    else:
-                                        b64 = base64_data
+                                if b64:
                                     final_images.append(b64)
                             except Exception as e:
                                 logger.warning(
@@ -494,18 +482,12 @@ class ImageCollectProcessor(BaseProcessor):
         idle_timeout = get_config("image.stream_timeout")
 
         try:
-            async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                resp = data.get("result", {}).get("response", {})
+            async for frame in iter_frames(
+                _with_idle_timeout(response, idle_timeout, self.model)
+            ):
 
-                if mr := resp.get("modelResponse"):
+                if frame.kind == FRAME_MODEL:
+                    mr = frame.payload
                     if urls := _collect_images(mr):
                         for url in urls:
                             if self.response_format == "url":
@@ -515,14 +497,10 @@ class ImageCollectProcessor(BaseProcessor):
                                 continue
                             try:
                                 dl_service = self._get_dl()
-                                base64_data = await dl_service.parse_b64(
+                                _, b64 = await dl_service.fetch_b64(
                                     url, self.token, "image"
                                 )
-                                if base64_data:
-                                    if "," in base64_data:
-                                        b64 = base64_data.split(",", 1)[1]
-                                    else:
-                                        b64 = base64_data
+                                if b64:
                                     images.append(b64)
                             except Exception as e:
                                 logger.warning(
@@ -3,7 +3,6 @@ Grok video generation service.
 """
 
 import asyncio
-import uuid
 import re
 from typing import Any, AsyncGenerator, AsyncIterable, Optional
 
@@ -16,23 +15,23 @@ from app.core.exceptions import (
     UpstreamException,
     AppException,
     ValidationException,
-    ErrorType,
     StreamIdleTimeoutError,
 )
 from app.services.grok.services.model import ModelService
 from app.services.token import get_token_manager, EffortType
 from app.services.grok.utils.stream import wrap_stream_with_usage
+from app.services.grok.utils.response import ChatChunkEncoder
 from app.services.grok.utils.process import (
     BaseProcessor,
     _with_idle_timeout,
-    _normalize_line,
     _is_http2_error,
 )
-from app.services.grok.utils.retry import rate_limited
+from app.services.grok.utils.frames import FRAME_VIDEO, iter_frames
+from app.services.grok.utils.retry import no_token_error, rate_limited
 from app.services.reverse.app_chat import AppChatReverse
 from app.services.reverse.media_post import MediaPostReverse
 from app.services.reverse.video_upscale import VideoUpscaleReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import PooledSession, acquire_session
 from app.services.token.manager import BASIC_POOL_NAME
 from app.services.grok.services.video_token_cache import store_video_context
 
@@ -49,11 +48,8 @@ def _get_video_semaphore() -> asyncio.Semaphore:
     return _VIDEO_SEMAPHORE
 
 
-def _new_session() -> ResettableSession:
-    browser = get_config("proxy.browser")
-    if browser:
-        return ResettableSession(impersonate=browser)
-    return ResettableSession()
+def _new_session() -> PooledSession:
+    return acquire_session()
 
 
 class VideoService:
@@ -358,18 +354,14 @@ class VideoService:
                     if not token_info:
                         if last_error:
                             raise last_error
-                        raise AppException(
-                            message="No available tokens. Please try again later.",
-                            error_type=ErrorType.RATE_LIMIT.value,
-                            code="rate_limit_exceeded",
-                            status_code=429,
-                        )
+                        raise no_token_error(token_mgr)
 
                     token = token_info.token
                     if token.startswith("sso="):
                         token = token[4:]
                     pool_name = token_mgr.get_pool_name_for_token(token)
                     should_upscale = resolution == "720p" and pool_name == BASIC_POOL_NAME
+                    lease = token_mgr.lease(token)
 
                     try:
                         image_url = None
@@ -425,18 +417,13 @@ class VideoService:
                         # If we completed the stream successfully without exception, we are done
                         return
 
-                    except Exception as e:
+                    finally:
                         # Anything else outside the stream iteration breaks immediately
-                        raise
+                        lease.release()
 
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_token_error(token_mgr)
 
             return _stream_generator()
         
@@ -452,18 +439,14 @@ class VideoService:
                 if not token_info:
                     if last_error:
                         raise last_error
-                    raise AppException(
-                        message="No available tokens. Please try again later.",
-                        error_type=ErrorType.RATE_LIMIT.value,
-                        code="rate_limit_exceeded",
-                        status_code=429,
-                    )
+                    raise no_token_error(token_mgr)
 
                 token = token_info.token
                 if token.startswith("sso="):
                     token = token[4:]
                 pool_name = token_mgr.get_pool_name_for_token(token)
                 should_upscale = resolution == "720p" and pool_name == BASIC_POOL_NAME
+                lease = token_mgr.lease(token)
 
                 try:
                     image_url = None
@@ -510,14 +493,12 @@ class VideoService:
                         continue
                     raise
 
+                finally:
+                    lease.release()
+
             if last_error:
                 raise last_error
-            raise AppException(
-                message="No available tokens. Please try again later.",
-                error_type=ErrorType.RATE_LIMIT.value,
-                code="rate_limit_exceeded",
-                status_code=429,
-            )
+            raise no_token_error(token_mgr)
 
 
 class VideoStreamProcessor(BaseProcessor):
@@ -537,6 +518,7 @@ class VideoStreamProcessor(BaseProcessor):
 
         self.show_think = bool(show_think)
         self.upscale_on_finish = bool(upscale_on_finish)
+        self._encoder = ChatChunkEncoder(self.model, self.created, None)
 
     @staticmethod
     def _extract_video_id(video_url: str) -> str:
@@ -571,52 +553,30 @@ class VideoStreamProcessor(BaseProcessor):
             logger.warning(f"Video upscale failed: {e}")
         return video_url
 
-    def _sse(self, content: str = "", role: str = None, finish: str = None) -> str:
+    def _sse(self, content: str = "", role: str = None, finish: str = None) -> bytes:
         """Build SSE response."""
-        delta = {}
-        if role:
-            delta["role"] = role
-            delta["content"] = ""
-        elif content:
-            delta["content"] = content
-
-        chunk = {
-            "id": self.response_id or f"chatcmpl-{uuid.uuid4().hex[:24]}",
-            "object": "chat.completion.chunk",
-            "created": self.created,
-            "model": self.model,
-            "choices": [
-                {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
-            ],
-        }
-        return f"data: {orjson.dumps(chunk).decode()}\n\n"
+        return self._encoder.chunk(content, role, finish, self.response_id, None)
 
     async def process(
         self, response: AsyncIterable[bytes]
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """Process video stream response."""
         idle_timeout = get_config("video.stream_timeout")
         video_yielded = False
         _conversation_id = ""
 
         try:
-            async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
+            async for frame in iter_frames(
+                _with_idle_timeout(response, idle_timeout, self.model)
+            ):
                 # Capture conversationId from first response line
                 if not _conversation_id:
-                    conv = data.get("result", {}).get("conversation", {})
+                    conv = frame.result.get("conversation") or {}
                     if conv_id := conv.get("conversationId"):
                         _conversation_id = conv_id
 
-                resp = data.get("result", {}).get("response", {})
-                is_thinking = bool(resp.get("isThinking"))
+                resp = frame.resp
+                is_thinking = frame.thinking
 
                 if rid := resp.get("responseId"):
                     self.response_id = rid
@@ -625,7 +585,7 @@ class VideoStreamProcessor(BaseProcessor):
                     yield self._sse(role="assistant")
                     self.role_sent = True
 
-                if token := resp.get("token"):
+                if token := frame.token:
                     if is_thinking:
                         if not self.show_think:
                             continue
@@ -639,7 +599,8 @@ class VideoStreamProcessor(BaseProcessor):
                     yield self._sse(token)
                     continue
 
-                if video_resp := resp.get("streamingVideoGenerationResponse"):
+                if frame.kind == FRAME_VIDEO:
+                    video_resp = frame.payload
                     progress = video_resp.get("progress", 0)
 
                     if is_thinking:
@@ -697,7 +658,7 @@ class VideoStreamProcessor(BaseProcessor):
                             # Store token + conversationId for extend support
                             vid_for_cache = video_post_id or self._extract_video_id(video_url)
                             if vid_for_cache:
-                                store_video_context(vid_for_cache, self.token, _conversation_id)
+                                await store_video_context(vid_for_cache, self.token, _conversation_id)
                                 logger.info(f"Cached context for video extend: vid={vid_for_cache}, conv={_conversation_id}, token_hash={hash(self.token)}, token_prefix={self.token[:30]}...")
 
                             if self.upscale_on_finish:
@@ -729,7 +690,7 @@ class VideoStreamProcessor(BaseProcessor):
             if self.think_opened:
                 yield self._sse("</think>\n")
             yield self._sse(finish="stop")
-            yield "data: [DONE]\n\n"
+            yield self._encoder.done()
         except asyncio.CancelledError:
             logger.debug(
                 "Video stream cancelled by client", extra={"model": self.model}
@@ -820,26 +781,19 @@ class VideoCollectProcessor(BaseProcessor):
         _conversation_id = ""
 
         try:
-            async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
+            async for frame in iter_frames(
+                _with_idle_timeout(response, idle_timeout, self.model)
+            ):
                 # Capture conversationId for extend support
                 if not _conversation_id:
-                    conv = data.get("result", {}).get("conversation", {})
+                    conv = frame.result.get("conversation") or {}
                     if conv_id := conv.get("conversationId"):
                         _conversation_id = conv_id
 
-                resp = data.get("result", {}).get("response", {})
-
-                if video_resp := resp.get("streamingVideoGenerationResponse"):
+                if frame.kind == FRAME_VIDEO:
+                    video_resp = frame.payload
                     if video_resp.get("progress") == 100:
-                        response_id = resp.get("responseId", "")
+                        response_id = frame.resp.get("responseId", "")
                         video_url = video_resp.get("videoUrl", "")
                         thumbnail_url = video_resp.get("thumbnailImageUrl", "")
                         moderated = video_resp.get("moderated", None)
@@ -866,7 +820,7 @@ class VideoCollectProcessor(BaseProcessor):
                                 or self._extract_video_id(video_url)
                             )
                             if vid_for_cache:
-                                store_video_context(vid_for_cache, self.token, _conversation_id)
+                                await store_video_context(vid_for_cache, self.token, _conversation_id)
                                 logger.info(f"Cached context for video extend: vid={vid_for_cache}, conv={_conversation_id}, token_hash={hash(self.token)}, token_prefix={self.token[:30]}...")
 
                             if self.upscale_on_finish:
@@ -10,7 +10,7 @@ Key insight: Grok video extend requires staying in the SAME conversation
 Dependencies:
   - video_token_cache (standalone module, no video.py imports)
   - Grok REST API (direct HTTP, not via AppChatReverse)
-  - ResettableSession (existing session helper)
+  - Pooled reverse sessions (session_pool.acquire_session)
 """
 
 import re
@@ -26,19 +26,16 @@ from app.services.grok.services.video_token_cache import (
     get_video_context, store_video_context,
 )
 from app.services.reverse.utils.headers import build_headers
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import PooledSession, acquire_session
 
 
 # Conversation continuation endpoint (NOT /new)
 CHAT_CONTINUE_API = "https://grok.com/rest/app-chat/conversations/{conversation_id}/responses"
 
 
-def _new_session() -> ResettableSession:
-    """Create a fresh session for reverse API calls."""
-    browser = get_config("proxy.browser")
-    if browser:
-        return ResettableSession(impersonate=browser)
-    return ResettableSession()
+def _new_session() -> PooledSession:
+    """Lease a pooled session for reverse API calls."""
+    return acquire_session()
 
 
 def _build_extend_payload(
@@ -137,7 +134,7 @@ async def extend_video(
         raise ValidationException("reference_id (video_post_id) is required")
 
     # Resolve the context (token + conversation_id) from cache
-    ctx = get_video_context(reference_id)
+    ctx = await get_video_context(reference_id)
 
     token = token_override
     conversation_id = ""
@@ -150,7 +147,7 @@ async def extend_video(
     if not token:
         raise AppException(
             message="Video extend failed: token not found for this video. "
-                    "The original generation may have expired from cache (1hr TTL) "
+                    "The original generation may have expired from the video context store "
                     "or was generated on a different instance.",
             status_code=404,
         )
@@ -320,7 +317,7 @@ async def extend_video(
     # Use the same conversation_id so next extend stays in the same conversation
     chain_conv = new_conversation_id or conversation_id
     if new_video_post_id:
-        store_video_context(new_video_post_id, token, chain_conv)
+        await store_video_context(new_video_post_id, token, chain_conv)
         logger.info(
             f"Stored context for chain extend: post={new_video_post_id}, conv={chain_conv}"
         )
@@ -4,16 +4,30 @@ Independent video token cache module.
 Maps video_post_id -> (token, conversation_id, timestamp) so that
 video extend can reuse the same Grok account AND conversation.
 
+Contexts live in a pluggable store: an in-process map with a TTL heap, or
+the active Redis/SQL storage backend (shared by every worker, expired by
+the backend) fronted by the same in-process map. ``video.context_store``
+picks the store: "memory", "storage", or "auto" (storage unless the backend
+is local files).
+
 This module is intentionally standalone — no imports from video.py
 or video_extend.py — so that reverting either file never causes
 ImportError cascades.
 """
 
+import heapq
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_config
+from app.core.logger import logger
+from app.core.storage import LocalStorage, get_storage
 
-_TTL = 14400  # 4 hours
+DEFAULT_CONTEXT_TTL = 14400  # 4 hours
+DEFAULT_CONTEXT_STORE = "auto"
+# Upper bound for the in-process map (oldest expiries are dropped first)
+MEMORY_MAX_ENTRIES = 10000
 
 
 @dataclass
@@ -23,36 +37,126 @@ class VideoContext:
     timestamp: float
 
 
-_cache: dict[str, VideoContext] = {}
-
-
-def store_video_context(
+def _context_ttl() -> int:
+    try:
+        return max(1, int(get_config("video.context_ttl", DEFAULT_CONTEXT_TTL)))
+    except (TypeError, ValueError):
+        return DEFAULT_CONTEXT_TTL
+
+
+class MemoryContextStore:
+    """In-process store; a min-heap of expiry times keeps eviction O(log n) per insert."""
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[VideoContext, float]] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def _evict(self, now: float):
+        heap = self._heap
+        while heap and (heap[0][0] <= now or len(self._entries) > self.max_entries):
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Stale heap items (key re-stored with a later expiry) are skipped
+            if entry and entry[1] == expires_at:
+                del self._entries[key]
+        # Re-stored keys leave stale heap items behind; rebuild if they pile up
+        if len(heap) > 2 * max(len(self._entries), 64):
+            self._heap = [(exp, key) for key, (_, exp) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    async def get(self, reference_id: str) -> Optional[VideoContext]:
+        entry = self._entries.get(reference_id)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        return None
+
+    async def put(self, reference_id: str, ctx: VideoContext, ttl: int):
+        now = time.time()
+        expires_at = ctx.timestamp + ttl
+        if expires_at <= now:
+            return
+        self._entries[reference_id] = (ctx, expires_at)
+        heapq.heappush(self._heap, (expires_at, reference_id))
+        self._evict(now)
+
+
+class StorageContextStore:
+    """Store backed by the active storage backend, with a local read-through map."""
+
+    def __init__(self):
+        self._local = MemoryContextStore()
+
+    async def get(self, reference_id: str) -> Optional[VideoContext]:
+        ctx = await self._local.get(reference_id)
+        if ctx:
+            return ctx
+        try:
+            data = await get_storage().get_video_context(reference_id)
+        except Exception as e:
+            logger.debug(f"Video context lookup failed: {e}")
+            return None
+        if not data or not data.get("token"):
+            return None
+        ctx = VideoContext(
+            token=data["token"],
+            conversation_id=data.get("conversation_id", ""),
+            timestamp=float(data.get("ts") or time.time()),
+        )
+        await self._local.put(reference_id, ctx, _context_ttl())
+        return ctx
+
+    async def put(self, reference_id: str, ctx: VideoContext, ttl: int):
+        await self._local.put(reference_id, ctx, ttl)
+        try:
+            await get_storage().set_video_context(
+                reference_id,
+                {
+                    "token": ctx.token,
+                    "conversation_id": ctx.conversation_id,
+                    "ts": ctx.timestamp,
+                },
+                ttl,
+            )
+        except Exception as e:
+            logger.debug(f"Video context store failed: {e}")
+
+
+_STORES: Dict[str, object] = {}
+
+
+def get_context_store():
+    """Return the store selected by ``video.context_store``."""
+    kind = str(get_config("video.context_store", DEFAULT_CONTEXT_STORE) or "").lower()
+    if kind not in ("memory", "storage"):
+        kind = "memory" if isinstance(get_storage(), LocalStorage) else "storage"
+    store = _STORES.get(kind)
+    if store is None:
+        store = MemoryContextStore() if kind == "memory" else StorageContextStore()
+        _STORES[kind] = store
+    return store
+
+
+async def store_video_context(
     reference_id: str, token: str, conversation_id: str = ""
 ) -> None:
     """Store token + conversation for video generation."""
-    _cache[reference_id] = VideoContext(
+    ctx = VideoContext(
         token=token, conversation_id=conversation_id, timestamp=time.time()
     )
-    # Evict expired entries
-    cutoff = time.time() - _TTL
-    for k in list(_cache.keys()):
-        if _cache[k].timestamp < cutoff:
-            del _cache[k]
+    await get_context_store().put(reference_id, ctx, _context_ttl())
 
 
-def get_video_context(reference_id: str) -> Optional[VideoContext]:
+async def get_video_context(reference_id: str) -> Optional[VideoContext]:
     """Get full context (token + conversation_id) for a video."""
-    entry = _cache.get(reference_id)
-    if entry and (time.time() - entry.timestamp) < _TTL:
-        return entry
-    return None
+    return await get_context_store().get(reference_id)
 
 
 # Backward-compatible aliases
-def store_video_token(reference_id: str, token: str) -> None:
-    store_video_context(reference_id, token)
+async def store_video_token(reference_id: str, token: str) -> None:
+    await store_video_context(reference_id, token)
 
 
-def get_video_token(reference_id: str) -> Optional[str]:
-    ctx = get_video_context(reference_id)
+async def get_video_token(reference_id: str) -> Optional[str]:
+    ctx = await get_video_context(reference_id)
     return ctx.token if ctx else None
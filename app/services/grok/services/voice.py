@@ -4,9 +4,8 @@ Grok Voice Mode Service
 
 from typing import Any, Dict
 
-from app.core.config import get_config
 from app.services.reverse.ws_livekit import LivekitTokenReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import acquire_session
 
 
 class VoiceService:
@@ -19,8 +18,7 @@ class VoiceService:
         personality: str = "assistant",
         speed: float = 1.0,
     ) -> Dict[str, Any]:
-        browser = get_config("proxy.browser")
-        async with ResettableSession(impersonate=browser) as session:
+        async with acquire_session() as session:
             response = await LivekitTokenReverse.request(
                 session,
                 token=token,
@@ -0,0 +1,71 @@
+"""
+Base64 helpers that avoid copying large image payloads.
+"""
+
+import base64
+from typing import AsyncIterable, List, Optional, Tuple
+
+# A data URI header ("data:image/png;base64,") is never longer than this
+_MAX_HEADER = 256
+
+
+def _header_end(value: str) -> int:
+    """Index of the comma ending a base64 data URI header, or -1."""
+    comma = value.find(",", 0, _MAX_HEADER)
+    if comma < 0 or value.find("base64", 0, comma) < 0:
+        return -1
+    return comma
+
+
+def split_data_uri(value: str) -> Tuple[Optional[str], str]:
+    """
+    Split a base64 data URI into (mime, payload) with a single copy of the payload.
+
+    Plain base64 strings are returned as (None, value) without copying.
+    """
+    if not value:
+        return None, ""
+    comma = _header_end(value)
+    if comma < 0:
+        return None, value
+    header = value[:comma]
+    mime = header[5:].split(";", 1)[0] if header.startswith("data:") else None
+    return mime or None, value[comma + 1 :]
+
+
+def payload_startswith(value: str, prefix: str) -> bool:
+    """Check the base64 payload prefix without slicing the payload out."""
+    comma = _header_end(value)
+    return value.startswith(prefix, comma + 1)
+
+
+async def encode_b64_stream(
+    chunks: AsyncIterable[bytes], prefix: str = ""
+) -> str:
+    """
+    Base64-encode a byte stream incrementally.
+
+    Only the encoded pieces are kept (never the whole raw payload), and they are
+    joined once together with ``prefix`` (e.g. a data URI header).
+    """
+    parts: List[str] = [prefix] if prefix else []
+    remain = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if remain:
+            chunk = remain + chunk
+        keep = len(chunk) % 3
+        if keep:
+            remain = chunk[-keep:]
+            chunk = memoryview(chunk)[:-keep]
+        else:
+            remain = b""
+        if chunk:
+            parts.append(base64.b64encode(chunk).decode("ascii"))
+    if remain:
+        parts.append(base64.b64encode(remain).decode("ascii"))
+    return "".join(parts)
+
+
+__all__ = ["split_data_uri", "payload_startswith", "encode_b64_stream"]
@@ -0,0 +1,332 @@
+"""
+Persistent index of the local media cache.
+
+Tracks size, mtime and last access of every file under ``data/tmp/{image,video}``
+in a small SQLite database so cache stats are O(1), listings are paged in SQL and
+eviction pops a true LRU (by last access) instead of walking the directories.
+The index is shared by every worker process through SQLite's own locking.
+
+SQLite calls block (up to the busy timeout while another worker writes), so
+async code must use the ``a``-prefixed methods, which run the query in a worker
+thread; the plain methods are for code that is already off the event loop.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logger import logger
+from app.core.storage import DATA_DIR
+
+MEDIA_TYPES = ("image", "video")
+
+# Re-touching a hot file more often than this is not worth a write
+TOUCH_INTERVAL_SEC = 60
+EVICT_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    media_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (media_type, name)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_mtime ON entries (media_type, mtime);
+CREATE TABLE IF NOT EXISTS totals (
+    media_type TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+INSERT OR IGNORE INTO totals (media_type) VALUES ('image'), ('video');
+CREATE TRIGGER IF NOT EXISTS entries_ins AFTER INSERT ON entries BEGIN
+    UPDATE totals SET count = count + 1, bytes = bytes + NEW.size
+        WHERE media_type = NEW.media_type;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_del AFTER DELETE ON entries BEGIN
+    UPDATE totals SET count = count - 1, bytes = bytes - OLD.size
+        WHERE media_type = OLD.media_type;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_upd AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size + NEW.size
+        WHERE media_type = NEW.media_type;
+END;
+"""
+
+
+class CacheIndex:
+    """SQLite-backed LRU index of cached media files."""
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = base_dir or (DATA_DIR / "tmp")
+        self.db_path = self.base_dir / "cache_index.db"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._touched: Dict[Tuple[str, str], float] = {}
+
+    def media_dir(self, media_type: str) -> Path:
+        return self.base_dir / media_type
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            conn = self._open()
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Cache index unreadable, rebuilding: {e}")
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+            conn = self._open()
+        self._conn = conn
+        if conn.execute("SELECT value FROM meta WHERE key = 'scanned'").fetchone() is None:
+            self._rescan(conn)
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _rescan(self, conn: sqlite3.Connection):
+        """Import files already on disk (first run or after a rebuild)."""
+        rows = []
+        for media_type in MEDIA_TYPES:
+            media_dir = self.media_dir(media_type)
+            if not media_dir.exists():
+                continue
+            for f in media_dir.iterdir():
+                if f.suffix == ".tmp":
+                    continue
+                try:
+                    stat = f.stat()
+                except OSError:
+                    continue
+                if not f.is_file():
+                    continue
+                rows.append(
+                    (media_type, f.name, stat.st_size, stat.st_mtime, stat.st_mtime)
+                )
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries")
+            conn.execute("UPDATE totals SET count = 0, bytes = 0")
+            conn.executemany(
+                "INSERT INTO entries (media_type, name, size, mtime, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('scanned', ?)",
+                (str(time.time()),),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Cache index rebuilt: {len(rows)} files")
+
+    def _execute(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connect().execute(sql, params)
+
+    def open(self):
+        """Open the database (rebuilding it from disk if needed) ahead of first use."""
+        with self._lock:
+            self._connect()
+
+    def record(self, media_type: str, name: str, size: int):
+        """Register a newly written file (also counts as an access)."""
+        now = time.time()
+        try:
+            self._execute(
+                "INSERT INTO entries (media_type, name, size, mtime, last_access) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (media_type, name) DO UPDATE SET "
+                "size = excluded.size, mtime = excluded.mtime, "
+                "last_access = excluded.last_access",
+                (media_type, name, int(size), now, now),
+            )
+            self._touched[(media_type, name)] = now
+        except Exception as e:
+            logger.warning(f"Cache index record failed: {e}")
+
+    def record_path(self, media_type: str, path: Path):
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        self.record(media_type, path.name, size)
+
+    def _claim_touch(self, media_type: str, name: str) -> Optional[float]:
+        """Return the access time to write, or None if the file was touched recently."""
+        key = (media_type, name)
+        now = time.time()
+        if now - self._touched.get(key, 0) < TOUCH_INTERVAL_SEC:
+            return None
+        self._touched[key] = now
+        if len(self._touched) > 100_000:
+            self._touched.clear()
+        return now
+
+    def touch(self, media_type: str, name: str):
+        """Mark a file as just accessed so it survives LRU eviction."""
+        now = self._claim_touch(media_type, name)
+        if now is not None:
+            self._write_touch(media_type, name, now)
+
+    def _write_touch(self, media_type: str, name: str, now: float):
+        try:
+            self._execute(
+                "UPDATE entries SET last_access = ? WHERE media_type = ? AND name = ?",
+                (now, media_type, name),
+            )
+        except Exception as e:
+            logger.debug(f"Cache index touch failed: {e}")
+
+    def remove(self, media_type: str, name: str):
+        self._touched.pop((media_type, name), None)
+        try:
+            self._execute(
+                "DELETE FROM entries WHERE media_type = ? AND name = ?",
+                (media_type, name),
+            )
+        except Exception as e:
+            logger.warning(f"Cache index remove failed: {e}")
+
+    def clear(self, media_type: str):
+        self._touched = {k: v for k, v in self._touched.items() if k[0] != media_type}
+        self._execute("DELETE FROM entries WHERE media_type = ?", (media_type,))
+
+    def stats(self, media_type: str) -> Tuple[int, int]:
+        """Return (count, bytes) for a media type."""
+        row = self._execute(
+            "SELECT count, bytes FROM totals WHERE media_type = ?", (media_type,)
+        ).fetchone()
+        return (int(row[0]), int(row[1])) if row else (0, 0)
+
+    def total_bytes(self) -> int:
+        row = self._execute("SELECT COALESCE(SUM(bytes), 0) FROM totals").fetchone()
+        return int(row[0]) if row else 0
+
+    def list(self, media_type: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Newest files first (by mtime)."""
+        rows = self._execute(
+            "SELECT name, size, mtime FROM entries WHERE media_type = ? "
+            "ORDER BY mtime DESC LIMIT ? OFFSET ?",
+            (media_type, int(limit), int(offset)),
+        ).fetchall()
+        return [
+            {"name": name, "size_bytes": size, "mtime_ms": int(mtime * 1000)}
+            for name, size, mtime in rows
+        ]
+
+    def evict(self, target_bytes: int) -> Tuple[int, int]:
+        """
+        Delete least recently accessed files until the total is <= target_bytes.
+
+        Returns:
+            (deleted_count, deleted_bytes)
+        """
+        deleted_count = 0
+        deleted_bytes = 0
+        total = self.total_bytes()
+        while total > target_bytes:
+            rows = self._execute(
+                "SELECT media_type, name, size FROM entries "
+                "ORDER BY last_access ASC LIMIT ?",
+                (EVICT_BATCH,),
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for media_type, name, size in rows:
+                try:
+                    (self.media_dir(media_type) / name).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.debug(f"Cache evict failed: {name} - {e}")
+                # Drop the entry either way so one stuck file cannot stall eviction
+                evicted.append((media_type, name))
+                self._touched.pop((media_type, name), None)
+                deleted_count += 1
+                deleted_bytes += size
+                total -= size
+                if total <= target_bytes:
+                    break
+            # One short write per batch so request-side queries interleave
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "DELETE FROM entries WHERE media_type = ? AND name = ?",
+                        evicted,
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        return deleted_count, deleted_bytes
+
+    # Async facade: every query runs in a worker thread, off the event loop
+
+    async def aopen(self):
+        await asyncio.to_thread(self.open)
+
+    async def arecord(self, media_type: str, name: str, size: int):
+        await asyncio.to_thread(self.record, media_type, name, size)
+
+    async def arecord_path(self, media_type: str, path: Path):
+        await asyncio.to_thread(self.record_path, media_type, path)
+
+    async def atouch(self, media_type: str, name: str):
+        # The rate limit is checked inline so hot files never leave the loop
+        now = self._claim_touch(media_type, name)
+        if now is not None:
+            await asyncio.to_thread(self._write_touch, media_type, name, now)
+
+    async def aremove(self, media_type: str, name: str):
+        await asyncio.to_thread(self.remove, media_type, name)
+
+    async def aclear(self, media_type: str):
+        await asyncio.to_thread(self.clear, media_type)
+
+    async def astats(self, media_type: str) -> Tuple[int, int]:
+        return await asyncio.to_thread(self.stats, media_type)
+
+    async def alist(
+        self, media_type: str, offset: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.list, media_type, offset, limit)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_CACHE_INDEX: Optional[CacheIndex] = None
+
+
+def get_cache_index() -> CacheIndex:
+    global _CACHE_INDEX
+    if _CACHE_INDEX is None:
+        _CACHE_INDEX = CacheIndex()
+    return _CACHE_INDEX
+
+
+__all__ = ["CacheIndex", "get_cache_index"]
@@ -5,11 +5,12 @@ Download service for assets.grok.com.
 """
 
 import asyncio
-import base64
 import hashlib
+import mimetypes
 import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 import aiofiles
@@ -19,56 +20,194 @@ from app.core.storage import DATA_DIR
 from app.core.config import get_config
 from app.core.exceptions import AppException
 from app.services.reverse.assets_download import AssetsDownloadReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import PooledSession, acquire_session
+from app.services.grok.utils.b64 import encode_b64_stream
+from app.services.grok.utils.cache_index import get_cache_index
 from app.services.grok.utils.locks import _get_download_semaphore, _file_lock
 
 
+# Local cache path -> MIME type of files known to be on disk (LRU-bounded)
+_MIME_CACHE: "OrderedDict[str, str]" = OrderedDict()
+MIME_CACHE_SIZE = 4096
+# Local cache path -> in-flight download shared by concurrent callers
+_INFLIGHT: Dict[str, "asyncio.Task[Tuple[Path, str]]"] = {}
+
+
+# Local cache path -> progress of a download that is still being written
+_TEE: Dict[str, "_TeeProgress"] = {}
+
+# Running cache cleanup, shared by every download in this process
+_CLEANUP_TASK: Optional["asyncio.Task[None]"] = None
+
+DEFAULT_TAIL_POLL_SEC = 0.05
+
+
+def _remember_mime(key: str, mime: str) -> None:
+    _MIME_CACHE[key] = mime
+    _MIME_CACHE.move_to_end(key)
+    while len(_MIME_CACHE) > MIME_CACHE_SIZE:
+        _MIME_CACHE.popitem(last=False)
+
+
+def _finish_inflight(key: str, task: asyncio.Task) -> None:
+    if _INFLIGHT.get(key) is task:
+        _INFLIGHT.pop(key, None)
+    if not task.cancelled():
+        # Mark the exception retrieved even when every waiter was cancelled
+        task.exception()
+
+
+def _tmp_path(cache_path: Path) -> Path:
+    return cache_path.with_suffix(cache_path.suffix + ".tmp")
+
+
+class _TeeProgress:
+    """Wakes readers that stream a file while it is still being downloaded."""
+
+    __slots__ = ("done", "failed", "_event")
+
+    def __init__(self):
+        self.done = False
+        self.failed = False
+        self._event = asyncio.Event()
+
+    def notify(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def finish(self, failed: bool = False):
+        self.done = True
+        self.failed = failed
+        self._event.set()
+
+    async def wait(self, timeout: float):
+        event = self._event
+        if self.done:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def iter_partial(
+    media_type: str, name: str, chunk_size: int = 64 * 1024
+) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream a cache file that is still being downloaded (tee mode).
+
+    Works for downloads running in this process (woken per chunk) and, by
+    tailing the ``.tmp`` file, for downloads running in another worker.
+
+    Returns:
+        An async byte iterator, or None when no download is in progress.
+    """
+    name = name.replace("/", "-")
+    cache_path = DATA_DIR / "tmp" / media_type / name
+    tmp_path = _tmp_path(cache_path)
+    tee = _TEE.get(str(cache_path))
+    if tee is None and not tmp_path.exists():
+        return None
+
+    idle_timeout = max(1, int(get_config("asset.download_timeout")))
+
+    async def _wait(t: float):
+        if tee is not None:
+            await tee.wait(t)
+        else:
+            await asyncio.sleep(DEFAULT_TAIL_POLL_SEC)
+
+    def _finished() -> bool:
+        # The writer renames .tmp away when done (or deletes it on failure)
+        if tee is not None:
+            return tee.done
+        return not tmp_path.exists()
+
+    async def _iter() -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + idle_timeout
+        f = None
+        try:
+            while f is None:
+                try:
+                    f = await aiofiles.open(tmp_path, "rb")
+                except FileNotFoundError:
+                    if cache_path.is_file():
+                        f = await aiofiles.open(cache_path, "rb")
+                    elif _finished() or loop.time() >= deadline:
+                        return
+                    else:
+                        await _wait(deadline - loop.time())
+            while True:
+                chunk = await f.read(chunk_size)
+                if chunk:
+                    deadline = loop.time() + idle_timeout
+                    yield chunk
+                    continue
+                if _finished():
+                    # Drain what was written between the last read and completion
+                    chunk = await f.read()
+                    if chunk:
+                        yield chunk
+                    return
+                if loop.time() >= deadline:
+                    logger.warning(f"Tee download stalled: {name}")
+                    return
+                await _wait(min(1.0, deadline - loop.time()))
+        finally:
+            if f is not None:
+                await f.close()
+
+    return _iter()
+
+
 class DownloadService:
     """Assets download service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
         base_dir = DATA_DIR / "tmp"
         self.image_dir = base_dir / "image"
         self.video_dir = base_dir / "video"
         self.image_dir.mkdir(parents=True, exist_ok=True)
         self.video_dir.mkdir(parents=True, exist_ok=True)
-        self._cleanup_running = False
 
-    async def create(self) -> ResettableSession:
-        """Create or reuse a session."""
+    async def create(self) -> PooledSession:
+        """Lease a pooled session (reused until close)."""
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = acquire_session(asset=True)
         return self._session
 
     async def close(self):
-        """Close the session."""
+        """Release the pooled session."""
         if self._session:
             await self._session.close()
             self._session = None
 
+    @staticmethod
+    def _split_url(path_or_url: str) -> Tuple[str, str]:
+        """Return (path, upstream asset URL) for an asset path or URL."""
+        if path_or_url.startswith("http"):
+            parsed = urlparse(path_or_url)
+            return parsed.path or "", path_or_url
+        if not path_or_url.startswith("/"):
+            path_or_url = f"/{path_or_url}"
+        return path_or_url, f"https://assets.grok.com{path_or_url}"
+
     async def resolve_url(
         self, path_or_url: str, token: str, media_type: str = "image"
     ) -> str:
-        asset_url = path_or_url
-        path = path_or_url
-        if path_or_url.startswith("http"):
-            parsed = urlparse(path_or_url)
-            path = parsed.path or ""
-            asset_url = path_or_url
-        else:
-            if not path_or_url.startswith("/"):
-                path_or_url = f"/{path_or_url}"
-            path = path_or_url
-            asset_url = f"https://assets.grok.com{path_or_url}"
+        path, asset_url = self._split_url(path_or_url)
 
         app_url = get_config("app.app_url")
         if app_url:
-            await self.download_file(asset_url, token, media_type)
+            if get_config("asset.tee_download", True):
+                # Clients stream /v1/files while the download is still running;
+                # hand out the link only once the .tmp file is there for any
+                # worker to tail, and let upstream failures reach the caller
+                await self.start_download(asset_url, token, media_type, wait=True)
+            else:
+                await self.download_file(asset_url, token, media_type)
             return f"{app_url.rstrip('/')}/v1/files/{media_type}{path}"
         return asset_url
 
@@ -87,8 +226,8 @@ class DownloadService:
             return f"![{image_id}]({final_url})"
         except Exception as e:
             logger.warning(f"Image render failed, fallback to URL: {e}")
-            final_url = await self.resolve_url(url, token, "image")
-            return f"![{image_id}]({final_url})"
+            _, asset_url = self._split_url(url)
+            return f"![{image_id}]({asset_url})"
 
     async def render_video(
         self, video_url: str, token: str, thumbnail_url: str = ""
@@ -116,40 +255,71 @@ class DownloadService:
 
     async def parse_b64(self, file_path: str, token: str, media_type: str = "image") -> str:
         """Download and return data URI."""
+        _, data_uri = await self.fetch_b64(file_path, token, media_type, data_uri=True)
+        return data_uri
+
+    async def fetch_b64(
+        self,
+        file_path: str,
+        token: str,
+        media_type: str = "image",
+        data_uri: bool = False,
+    ) -> Tuple[str, str]:
+        """Download an asset as base64 without buffering the raw bytes.
+
+        Reads from the local cache when the asset is already there.
+
+        Returns:
+            Tuple[str, str]: The MIME type and the base64 payload (or the full
+            data URI when ``data_uri`` is set).
+        """
         try:
             if not isinstance(file_path, str) or not file_path.strip():
                 raise AppException("Invalid file path", code="invalid_file_path")
             if file_path.startswith("data:"):
                 raise AppException("Invalid file path", code="invalid_file_path")
             file_path = self._normalize_path(file_path)
-            lock_name = f"dl_b64_{hashlib.sha1(file_path.encode()).hexdigest()[:16]}"
-            lock_timeout = max(1, int(get_config("asset.download_timeout")))
-            async with _get_download_semaphore():
-                async with _file_lock(lock_name, timeout=lock_timeout):
-                    session = await self.create()
-                    response = await AssetsDownloadReverse.request(
-                        session, token, file_path
-                    )
 
-            if hasattr(response, "aiter_content"):
-                data = bytearray()
-                async for chunk in response.aiter_content():
-                    if chunk:
-                        data.extend(chunk)
-                raw = bytes(data)
+            cache_path = self._cache_path(file_path, media_type)
+            content_type = await self._cached(cache_path, media_type)
+            if content_type is not None:
+                chunks = self._iter_file(cache_path)
             else:
-                raw = response.content
-
-            content_type = response.headers.get(
-                "content-type", "application/octet-stream"
-            ).split(";")[0]
-            data_uri = f"data:{content_type};base64,{base64.b64encode(raw).decode()}"
+                lock_name = f"dl_b64_{hashlib.sha1(file_path.encode()).hexdigest()[:16]}"
+                lock_timeout = max(1, int(get_config("asset.download_timeout")))
+                async with _get_download_semaphore():
+                    async with _file_lock(lock_name, timeout=lock_timeout):
+                        session = await self.create()
+                        response = await AssetsDownloadReverse.request(
+                            session, token, file_path
+                        )
+                content_type = response.headers.get(
+                    "content-type", "application/octet-stream"
+                ).split(";")[0]
+                if hasattr(response, "aiter_content"):
+                    chunks = response.aiter_content()
+                else:
+                    chunks = self._iter_bytes(response.content)
 
-            return data_uri
+            prefix = f"data:{content_type};base64," if data_uri else ""
+            return content_type, await encode_b64_stream(chunks, prefix)
         except Exception as e:
             logger.error(f"Failed to convert {file_path} to base64: {e}")
             raise
 
+    @staticmethod
+    async def _iter_bytes(data: bytes) -> AsyncIterator[bytes]:
+        yield data
+
+    @staticmethod
+    async def _iter_file(path: Path, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        async with aiofiles.open(path, "rb") as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
     def _normalize_path(self, file_path: str) -> str:
         """Normalize URL or path to assets path for download."""
         if not isinstance(file_path, str) or not file_path.strip():
@@ -178,9 +348,33 @@ class DownloadService:
 
         return path
 
+    def _cache_path(self, file_path: str, media_type: str) -> Path:
+        cache_dir = self.image_dir if media_type == "image" else self.video_dir
+        filename = file_path.lstrip("/").replace("/", "-")
+        return cache_dir / filename
+
+    @staticmethod
+    async def _cached(cache_path: Path, media_type: str) -> Optional[str]:
+        """Return the cached MIME type if the file is already on disk."""
+        key = str(cache_path)
+        mime = _MIME_CACHE.get(key)
+        if cache_path.is_file():
+            if mime is None:
+                mime = mimetypes.guess_type(cache_path.name)[0] or "application/octet-stream"
+            _remember_mime(key, mime)
+            await get_cache_index().atouch(media_type, cache_path.name)
+            return mime
+        if mime is not None:
+            _MIME_CACHE.pop(key, None)
+        return None
+
     async def download_file(self, file_path: str, token: str, media_type: str = "image") -> Tuple[Optional[Path], str]:
         """Download asset to local cache.
 
+        Cache hits return without touching the network. Concurrent requests for
+        the same missing asset in this process share one download; the file lock
+        only coordinates with other worker processes.
+
         Args:
             file_path: str, the path of the file to download.
             token: str, the SSO token.
@@ -189,46 +383,142 @@ class DownloadService:
         Returns:
             Tuple[Optional[Path], str]: The path of the downloaded file and the MIME type.
         """
-        async with _get_download_semaphore():
-            file_path = self._normalize_path(file_path)
-            cache_dir = self.image_dir if media_type == "image" else self.video_dir
-            filename = file_path.lstrip("/").replace("/", "-")
-            cache_path = cache_dir / filename
+        file_path = self._normalize_path(file_path)
+        cache_path = self._cache_path(file_path, media_type)
+        mime = await self._cached(cache_path, media_type)
+        if mime is not None:
+            return cache_path, mime
 
+        task = self._download_task(file_path, token, media_type, cache_path)
+        # shield: a cancelled caller must not abort the download for the others
+        return await asyncio.shield(task)
+
+    async def start_download(
+        self,
+        file_path: str,
+        token: str,
+        media_type: str = "image",
+        wait: bool = False,
+    ):
+        """Start caching an asset in the background.
+
+        Args:
+            wait: bool, return only once the first bytes are on disk (the
+                ``.tmp`` file exists) or the download has finished, raising
+                if it failed before that.
+        """
+        file_path = self._normalize_path(file_path)
+        cache_path = self._cache_path(file_path, media_type)
+        if await self._cached(cache_path, media_type) is not None:
+            return
+        task = self._download_task(file_path, token, media_type, cache_path)
+        if not wait:
+            return
+        tmp_path = _tmp_path(cache_path)
+        while not task.done():
+            if tmp_path.exists() or cache_path.is_file():
+                return
+            # asyncio.wait never cancels the shared download if this caller is
+            await asyncio.wait({task}, timeout=DEFAULT_TAIL_POLL_SEC)
+        task.result()
+
+    def _download_task(
+        self, file_path: str, token: str, media_type: str, cache_path: Path
+    ) -> "asyncio.Task[Tuple[Path, str]]":
+        key = str(cache_path)
+        task = _INFLIGHT.get(key)
+        if task is None:
+            # Register progress before the task runs so early readers can attach
+            _TEE.setdefault(key, _TeeProgress())
+            task = asyncio.create_task(
+                self._fetch_to_cache(file_path, token, media_type, cache_path)
+            )
+            _INFLIGHT[key] = task
+            task.add_done_callback(lambda t, k=key: _finish_inflight(k, t))
+        return task
+
+    async def _fetch_to_cache(
+        self, file_path: str, token: str, media_type: str, cache_path: Path
+    ) -> Tuple[Path, str]:
+        key = str(cache_path)
+        tee = _TEE.setdefault(key, _TeeProgress())
+        failed = True
+        try:
+            result = await self._fetch_locked(
+                file_path, token, media_type, cache_path, tee
+            )
+            failed = False
+            return result
+        finally:
+            tee.finish(failed=failed)
+            if _TEE.get(key) is tee:
+                _TEE.pop(key, None)
+
+    async def _fetch_locked(
+        self,
+        file_path: str,
+        token: str,
+        media_type: str,
+        cache_path: Path,
+        tee: _TeeProgress,
+    ) -> Tuple[Path, str]:
+        async with _get_download_semaphore():
             lock_name = (
                 f"dl_{media_type}_{hashlib.sha1(str(cache_path).encode()).hexdigest()[:16]}"
             )
             lock_timeout = max(1, int(get_config("asset.download_timeout")))
             async with _file_lock(lock_name, timeout=lock_timeout):
-                session = await self.create()
-                response = await AssetsDownloadReverse.request(session, token, file_path)
+                # Another worker may have finished it while we waited for the lock
+                mime = await self._cached(cache_path, media_type)
+                if mime is not None:
+                    return cache_path, mime
 
-                tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
-                try:
-                    async with aiofiles.open(tmp_path, "wb") as f:
-                        if hasattr(response, "aiter_content"):
-                            async for chunk in response.aiter_content():
-                                if chunk:
-                                    await f.write(chunk)
-                        else:
-                            await f.write(response.content)
-                    os.replace(tmp_path, cache_path)
-                finally:
-                    if tmp_path.exists() and not cache_path.exists():
-                        try:
-                            tmp_path.unlink()
-                        except Exception:
-                            pass
+                async with acquire_session(asset=True) as session:
+                    response = await AssetsDownloadReverse.request(
+                        session, token, file_path
+                    )
+
+                    tmp_path = _tmp_path(cache_path)
+                    try:
+                        async with aiofiles.open(tmp_path, "wb") as f:
+                            tee.notify()
+                            if hasattr(response, "aiter_content"):
+                                async for chunk in response.aiter_content():
+                                    if chunk:
+                                        await f.write(chunk)
+                                        # Make the bytes visible to tee readers
+                                        await f.flush()
+                                        tee.notify()
+                            else:
+                                await f.write(response.content)
+                        os.replace(tmp_path, cache_path)
+                        await get_cache_index().arecord_path(media_type, cache_path)
+                    finally:
+                        if tmp_path.exists() and not cache_path.exists():
+                            try:
+                                tmp_path.unlink()
+                            except Exception:
+                                pass
 
                 mime = response.headers.get(
                     "content-type", "application/octet-stream"
                 ).split(";")[0]
+                _remember_mime(str(cache_path), mime)
                 logger.info(f"Downloaded: {file_path}")
 
-                asyncio.create_task(self._check_limit())
+                self._schedule_cleanup()
 
             return cache_path, mime
 
+    def _schedule_cleanup(self) -> None:
+        """Start a cache cleanup unless one is already running in this process."""
+        global _CLEANUP_TASK
+        if _CLEANUP_TASK is not None and not _CLEANUP_TASK.done():
+            return
+        if not get_config("cache.enable_auto_clean"):
+            return
+        _CLEANUP_TASK = asyncio.create_task(self._check_limit())
+
     async def _check_limit(self):
         """Check cache limit and cleanup.
 
@@ -238,61 +528,30 @@ class DownloadService:
         Returns:
             None
         """
-        if self._cleanup_running or not get_config("cache.enable_auto_clean"):
+        if not get_config("cache.enable_auto_clean"):
             return
 
-        self._cleanup_running = True
         try:
-            try:
-                async with _file_lock("cache_cleanup", timeout=5):
-                    limit_mb = get_config("cache.limit_mb")
-                    total_size = 0
-                    all_files: List[Tuple[Path, float, int]] = []
-
-                    for d in [self.image_dir, self.video_dir]:
-                        if d.exists():
-                            for f in d.glob("*"):
-                                if f.is_file():
-                                    try:
-                                        stat = f.stat()
-                                        total_size += stat.st_size
-                                        all_files.append(
-                                            (f, stat.st_mtime, stat.st_size)
-                                        )
-                                    except Exception:
-                                        pass
-                    current_mb = total_size / 1024 / 1024
-
-                    if current_mb <= limit_mb:
-                        return
-
-                    logger.info(
-                        f"Cache limit exceeded ({current_mb:.2f}MB > {limit_mb}MB), cleaning..."
-                    )
-                    all_files.sort(key=lambda x: x[1])
-
-                    deleted_count = 0
-                    deleted_size = 0
-                    target_mb = limit_mb * 0.8
-
-                    for f, _, size in all_files:
-                        try:
-                            f.unlink()
-                            deleted_count += 1
-                            deleted_size += size
-                            total_size -= size
-                            if (total_size / 1024 / 1024) <= target_mb:
-                                break
-                        except Exception:
-                            pass
-
-                    logger.info(
-                        f"Cache cleanup: {deleted_count} files ({deleted_size / 1024 / 1024:.2f}MB)"
-                    )
-            except Exception as e:
-                logger.warning(f"Cache cleanup failed: {e}")
-        finally:
-            self._cleanup_running = False
+            async with _file_lock("cache_cleanup", timeout=5):
+                limit_mb = get_config("cache.limit_mb")
+                index = get_cache_index()
+                current_mb = await asyncio.to_thread(index.total_bytes) / 1024 / 1024
+                if current_mb <= limit_mb:
+                    return
+
+                logger.info(
+                    f"Cache limit exceeded ({current_mb:.2f}MB > {limit_mb}MB), cleaning..."
+                )
+                target_bytes = int(limit_mb * 0.8 * 1024 * 1024)
+                deleted_count, deleted_size = await asyncio.to_thread(
+                    index.evict, target_bytes
+                )
+
+                logger.info(
+                    f"Cache cleanup: {deleted_count} files ({deleted_size / 1024 / 1024:.2f}MB)"
+                )
+        except Exception as e:
+            logger.warning(f"Cache cleanup failed: {e}")
 
 
-__all__ = ["DownloadService"]
+__all__ = ["DownloadService", "iter_partial"]
@@ -0,0 +1,210 @@
+"""
+上游 app-chat 流式帧解码器
+
+直接处理原始字节块：按换行切帧、不经过中间 str，字节直接交给 orjson，
+并在解码时预先分类帧类型（token / thinking / 图片进度 / 视频进度 /
+modelResponse / card），处理器按类型分派，无需再逐层 .get() 遍历。
+token 增量帧占绝大多数，分类时优先判断并直接取值。
+"""
+
+from typing import Any, AsyncGenerator, AsyncIterable, List, Optional
+
+import orjson
+
+FRAME_TOKEN = "token"
+FRAME_THINKING = "thinking"
+FRAME_IMAGE = "image"
+FRAME_VIDEO = "video"
+FRAME_MODEL = "model"
+FRAME_CARD = "card"
+FRAME_OTHER = "other"
+
+_DATA_PREFIX = b"data:"
+_DONE = b"[DONE]"
+_EMPTY: dict = {}
+
+# 非 token 帧的分类顺序（与处理器原有判断顺序一致）
+_PAYLOAD_KINDS = (
+    ("streamingImageGenerationResponse", FRAME_IMAGE),
+    ("streamingVideoGenerationResponse", FRAME_VIDEO),
+    ("modelResponse", FRAME_MODEL),
+    ("cardAttachment", FRAME_CARD),
+)
+
+
+class Frame:
+    """
+    已解码的上游帧
+
+    Attributes:
+        kind: 帧类型（FRAME_*）
+        data: 完整 JSON 对象
+        resp: ``result.response`` 对象（不存在时为空 dict）
+        payload: 图片/视频进度、modelResponse 或 cardAttachment 对象
+        token: token 文本（帧中无字符串 token 时为 None）
+        thinking: 是否为思考内容
+    """
+
+    __slots__ = ("kind", "data", "resp", "payload", "token", "thinking")
+
+    def __init__(
+        self,
+        kind: str,
+        data: dict,
+        resp: dict,
+        payload: Any = None,
+        token: Optional[str] = None,
+        thinking: bool = False,
+    ):
+        self.kind = kind
+        self.data = data
+        self.resp = resp
+        self.payload = payload
+        self.token = token
+        self.thinking = thinking
+
+    @property
+    def result(self) -> dict:
+        """返回 ``result`` 对象"""
+        result = self.data.get("result")
+        return result if isinstance(result, dict) else _EMPTY
+
+
+def _to_frame(data: Any) -> Optional[Frame]:
+    """将解析后的 JSON 对象分类为帧"""
+    try:
+        resp = data["result"]["response"]
+        token = resp.get("token")
+    except (KeyError, TypeError, AttributeError):
+        if not isinstance(data, dict):
+            return None
+        return Frame(FRAME_OTHER, data, _EMPTY)
+
+    # token 增量帧占绝大多数：直接取值，跳过其余字段的判断
+    if (
+        token.__class__ is str
+        and "modelResponse" not in resp
+        and "cardAttachment" not in resp
+        and "streamingImageGenerationResponse" not in resp
+        and "streamingVideoGenerationResponse" not in resp
+    ):
+        if resp.get("isThinking"):
+            return Frame(FRAME_THINKING, data, resp, None, token, True)
+        return Frame(FRAME_TOKEN, data, resp, None, token, False)
+
+    if not isinstance(token, str):
+        token = None
+    thinking = bool(resp.get("isThinking"))
+    for key, kind in _PAYLOAD_KINDS:
+        if payload := resp.get(key):
+            return Frame(kind, data, resp, payload, token, thinking)
+    if token is not None:
+        kind = FRAME_THINKING if thinking else FRAME_TOKEN
+        return Frame(kind, data, resp, None, token, thinking)
+    return Frame(FRAME_OTHER, data, resp, None, None, thinking)
+
+
+def decode_frame(line: bytes) -> Optional[Frame]:
+    """解码单行（兼容 SSE ``data:`` 前缀与空行），无法解析时返回 None"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith(_DATA_PREFIX):
+        line = line[5:].lstrip()
+        if line == _DONE:
+            return None
+    try:
+        data = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None
+    return _to_frame(data)
+
+
+class FrameDecoder:
+    """
+    增量帧解码器：喂入任意切分的字节块，产出完整帧
+
+    上游为每行一个 JSON 对象（NDJSON）。一个块内的完整行拼成 JSON 数组，
+    由 orjson 一次解析，省去逐行调用的开销；块内出现空行、``data:``
+    前缀或坏行导致整体解析失败时，本块回退逐行解析，且此后不再尝试批量解析。
+    """
+
+    __slots__ = ("_pending", "_batch")
+
+    def __init__(self):
+        self._pending = b""
+        self._batch = True
+
+    def feed(self, chunk: Any) -> List[Frame]:
+        """
+        喂入一个数据块
+
+        bytes 视为原始字节流片段（可在任意位置截断）；
+        str 视为已切分好的完整行（兼容按行迭代的上游）。
+        """
+        if not chunk:
+            return []
+        if isinstance(chunk, str):
+            frame = decode_frame(chunk.encode())
+            return [frame] if frame else []
+        if not isinstance(chunk, bytes):
+            chunk = bytes(chunk)
+
+        if self._pending:
+            chunk = self._pending + chunk
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            self._pending = chunk
+            return []
+        # 最后一个换行之后是未结束的行
+        self._pending = chunk[end + 1 :]
+        body = chunk[:end]
+
+        if self._batch and body[:1] == b"{":
+            try:
+                items = orjson.loads(b"[" + body.replace(b"\n", b",") + b"]")
+            except orjson.JSONDecodeError:
+                self._batch = False
+            else:
+                frames: List[Frame] = []
+                for data in items:
+                    if frame := _to_frame(data):
+                        frames.append(frame)
+                return frames
+
+        frames = []
+        for line in body.split(b"\n"):
+            if frame := decode_frame(line):
+                frames.append(frame)
+        return frames
+
+    def flush(self) -> List[Frame]:
+        """处理流结束时残留的最后一行（无结尾换行）"""
+        pending, self._pending = self._pending, b""
+        frame = decode_frame(pending) if pending else None
+        return [frame] if frame else []
+
+
+async def iter_frames(stream: AsyncIterable[Any]) -> AsyncGenerator[Frame, None]:
+    """将上游字节流（或行流）解码为帧序列"""
+    decoder = FrameDecoder()
+    async for chunk in stream:
+        for frame in decoder.feed(chunk):
+            yield frame
+    for frame in decoder.flush():
+        yield frame
+
+
+__all__ = [
+    "Frame",
+    "FrameDecoder",
+    "decode_frame",
+    "iter_frames",
+    "FRAME_TOKEN",
+    "FRAME_THINKING",
+    "FRAME_IMAGE",
+    "FRAME_VIDEO",
+    "FRAME_MODEL",
+    "FRAME_CARD",
+    "FRAME_OTHER",
+]
@@ -3,20 +3,10 @@ Shared locking helpers for assets operations.
 """
 
 import asyncio
-import time
 from contextlib import asynccontextmanager
-from pathlib import Path
 
 from app.core.config import get_config
-from app.core.storage import DATA_DIR
-
-try:
-    import fcntl
-except ImportError:
-    fcntl = None
-
-
-LOCK_DIR = DATA_DIR / ".locks"
+from app.core.locks import get_lock_manager
 
 _UPLOAD_SEMAPHORE = None
 _UPLOAD_SEM_VALUE = None
@@ -48,39 +38,13 @@ def _get_download_semaphore() -> asyncio.Semaphore:
 
 @asynccontextmanager
 async def _file_lock(name: str, timeout: int = 10):
-    """File lock guard."""
-    if fcntl is None:
-        yield
-        return
-
-    LOCK_DIR.mkdir(parents=True, exist_ok=True)
-    lock_path = Path(LOCK_DIR) / f"{name}.lock"
-    fd = None
-    locked = False
-    start = time.monotonic()
+    """
+    Named lock guard (per-key asyncio lock in-process, flock across processes).
 
-    try:
-        fd = open(lock_path, "a+")
-        while True:
-            try:
-                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                locked = True
-                break
-            except BlockingIOError:
-                if time.monotonic() - start >= timeout:
-                    break
-                await asyncio.sleep(0.05)
-        if not locked:
-            raise TimeoutError(f"Failed to acquire lock: {name}")
+    Raises TimeoutError if the lock is not acquired within ``timeout`` seconds.
+    """
+    async with get_lock_manager().acquire(name, timeout):
         yield
-    finally:
-        if fd:
-            if locked:
-                try:
-                    fcntl.flock(fd, fcntl.LOCK_UN)
-                except Exception:
-                    pass
-            fd.close()
 
 
 __all__ = ["_get_upload_semaphore", "_get_download_semaphore", "_file_lock"]
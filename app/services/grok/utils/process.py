@@ -4,7 +4,15 @@
 
 import asyncio
 import time
-from typing import Any, AsyncGenerator, Optional, AsyncIterable, List, TypeVar
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    List,
+    Optional,
+    TypeVar,
+)
 
 from app.core.config import get_config
 from app.core.logger import logger
@@ -21,24 +29,6 @@ def _is_http2_error(e: Exception) -> bool:
     return "http/2" in err_str or "curl: (92)" in err_str or "stream" in err_str
 
 
-def _normalize_line(line: Any) -> Optional[str]:
-    """规范化流式响应行，兼容 SSE data 前缀与空行"""
-    if line is None:
-        return None
-    if isinstance(line, (bytes, bytearray)):
-        text = line.decode("utf-8", errors="ignore")
-    else:
-        text = str(line)
-    text = text.strip()
-    if not text:
-        return None
-    if text.startswith("data:"):
-        text = text[5:].strip()
-    if text == "[DONE]":
-        return None
-    return text
-
-
 def _collect_images(obj: Any) -> List[str]:
     """递归收集响应中的图片 URL"""
     urls: List[str] = []
@@ -115,6 +105,58 @@ async def _with_idle_timeout(
             break
 
 
+async def _with_flush_deadline(
+    iterable: AsyncIterable[T], deadline: Callable[[], Optional[float]]
+) -> AsyncGenerator[Optional[T], None]:
+    """
+    包装异步迭代器，等待下一项时若到达刷新截止时间则产出 None
+
+    没有待刷新内容（截止时间为 None）时直接等待上游，不创建任务；
+    仅在有截止时间时把读取放进独立任务与截止时间竞争，
+    截止时间到达时该读取不会被取消，产出 None 后继续等待同一次读取。
+
+    Args:
+        iterable: 原始异步迭代器
+        deadline: 返回当前刷新截止时间（loop.time()），None 表示无需定时刷新
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iterable.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            when = deadline()
+            if pending is None:
+                if when is None:
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    yield item
+                    continue
+                if when <= loop.time():
+                    yield None
+                    continue
+                pending = asyncio.ensure_future(iterator.__anext__())
+            if when is not None and not pending.done():
+                timeout = when - loop.time()
+                if timeout <= 0:
+                    yield None
+                    continue
+                done, _ = await asyncio.wait((pending,), timeout=timeout)
+                if not done:
+                    yield None
+                    continue
+            try:
+                item = await pending
+            except StopAsyncIteration:
+                break
+            pending = None
+            yield item
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
 class BaseProcessor:
     """基础处理器"""
 
@@ -146,7 +188,7 @@ class BaseProcessor:
 __all__ = [
     "BaseProcessor",
     "_with_idle_timeout",
-    "_normalize_line",
+    "_with_flush_deadline",
     "_collect_images",
     "_is_http2_error",
 ]
@@ -7,6 +7,12 @@ import time
 import uuid
 from typing import Optional
 
+import orjson
+
+_CHUNK_DONE = b"data: [DONE]\n\n"
+_CONTENT_OPEN = b'{"content":'
+_CONTENT_TAIL = b'},"logprobs":null,"finish_reason":null}]}\n\n'
+
 
 def make_response_id() -> str:
     """Generate a unique response ID."""
@@ -136,9 +142,98 @@ def wrap_image_content(content: str, response_format: str = "url") -> str:
         return f"![image](data:image/png;base64,{content})"
 
 
+class ChatChunkEncoder:
+    """
+    Pre-rendered ``chat.completion.chunk`` SSE encoder for one stream.
+
+    The envelope (id, object, created, model, fingerprint) is rendered to
+    bytes once and reused, so a content delta only costs one JSON string
+    escape. The envelope is re-rendered when the id or fingerprint changes.
+    Until the upstream response id is known, a stable per-stream id is used.
+
+    ``fingerprint=None`` omits ``system_fingerprint`` from the envelope.
+    """
+
+    __slots__ = ("model", "created", "fallback_id", "_key", "_head")
+
+    def __init__(self, model: str, created: int, fingerprint: Optional[str] = ""):
+        self.model = model
+        self.created = created
+        self.fallback_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self._key = None
+        self._head = b""
+        self._render("", fingerprint)
+
+    def _render(self, response_id: str, fingerprint: Optional[str]) -> bytes:
+        envelope = {
+            "id": response_id or self.fallback_id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+        }
+        if fingerprint is not None:
+            envelope["system_fingerprint"] = fingerprint
+        self._key = (response_id, fingerprint)
+        self._head = (
+            b"data: " + orjson.dumps(envelope)[:-1] + b',"choices":[{"index":0,"delta":'
+        )
+        return self._head
+
+    def _envelope(self, response_id: str, fingerprint: Optional[str]) -> bytes:
+        if self._key == (response_id, fingerprint):
+            return self._head
+        return self._render(response_id, fingerprint)
+
+    def content(
+        self, text: str, response_id: str = "", fingerprint: Optional[str] = ""
+    ) -> bytes:
+        """Encode a content delta chunk."""
+        return b"".join(
+            (
+                self._envelope(response_id, fingerprint),
+                _CONTENT_OPEN,
+                orjson.dumps(text),
+                _CONTENT_TAIL,
+            )
+        )
+
+    def chunk(
+        self,
+        content: str = "",
+        role: Optional[str] = None,
+        finish: Optional[str] = None,
+        response_id: str = "",
+        fingerprint: Optional[str] = "",
+    ) -> bytes:
+        """Encode a chunk with an optional role or finish reason."""
+        if content and not role and not finish:
+            return self.content(content, response_id, fingerprint)
+        delta = {}
+        if role:
+            delta["role"] = role
+            delta["content"] = ""
+        elif content:
+            delta["content"] = content
+        return b"".join(
+            (
+                self._envelope(response_id, fingerprint),
+                orjson.dumps(delta),
+                b',"logprobs":null,"finish_reason":',
+                orjson.dumps(finish),
+                b"}]}\n\n",
+            )
+        )
+
+    @staticmethod
+    def done() -> bytes:
+        """Encode the terminating ``[DONE]`` event."""
+        return _CHUNK_DONE
+
+
 __all__ = [
     "make_response_id",
     "make_chat_chunk",
     "make_chat_response",
     "wrap_image_content",
+    "ChatChunkEncoder",
 ]
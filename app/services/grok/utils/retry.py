@@ -2,36 +2,71 @@
 Retry helpers for token switching.
 """
 
-from typing import Optional, Set
+import asyncio
+from typing import List, Optional, Set
 
-from app.core.exceptions import UpstreamException
+from app.core.config import get_config
+from app.core.exceptions import RateLimitException, UpstreamException
 from app.services.grok.services.model import ModelService
 
 
+DEFAULT_TOKEN_WAIT_SEC = 5.0
+
+
+def _token_wait_sec() -> float:
+    try:
+        return max(0.0, float(get_config("token.wait_timeout_sec", DEFAULT_TOKEN_WAIT_SEC)))
+    except (TypeError, ValueError):
+        return DEFAULT_TOKEN_WAIT_SEC
+
+
+def _select(token_mgr, pools: List[str], tried: Set[str]) -> Optional[str]:
+    for pool_name in pools:
+        token = token_mgr.get_token(pool_name, exclude=tried)
+        if token:
+            return token
+    return None
+
+
 async def pick_token(
     token_mgr,
     model_id: str,
     tried: Set[str],
     preferred: Optional[str] = None,
 ) -> Optional[str]:
+    """
+    Pick a token for the model without blocking on upstream refreshes.
+
+    When every token is busy or cooling, a background recovery is triggered
+    and the caller waits at most ``token.wait_timeout_sec`` for a lease to be
+    released or a token to recover.
+    """
     if preferred and preferred not in tried:
         return preferred
 
-    token = None
-    for pool_name in ModelService.pool_candidates_for_model(model_id):
-        token = token_mgr.get_token(pool_name, exclude=tried)
-        if token:
+    pools = ModelService.pool_candidates_for_model(model_id)
+    token = _select(token_mgr, pools, tried)
+    if token:
+        return token
+
+    token_mgr.trigger_cooling_recovery()
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _token_wait_sec()
+    while token_mgr.has_pending_capacity():
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await token_mgr.wait_for_token(remaining):
             break
+        token = _select(token_mgr, pools, tried)
+        if token:
+            return token
+
+    return None
 
-    if not token and not tried:
-        result = await token_mgr.refresh_cooling_tokens()
-        if result.get("recovered", 0) > 0:
-            for pool_name in ModelService.pool_candidates_for_model(model_id):
-                token = token_mgr.get_token(pool_name)
-                if token:
-                    break
 
-    return token
+def no_token_error(token_mgr) -> RateLimitException:
+    """Build the 429 raised when no token is available, with Retry-After."""
+    return RateLimitException(retry_after=token_mgr.next_recovery_in())
 
 
 def rate_limited(error: Exception) -> bool:
@@ -42,4 +77,4 @@ def rate_limited(error: Exception) -> bool:
     return status == 429 or code == "rate_limit_exceeded"
 
 
-__all__ = ["pick_token", "rate_limited"]
+__all__ = ["pick_token", "no_token_error", "rate_limited"]
@@ -0,0 +1,131 @@
+"""
+Spooled upload buffer.
+
+Raw upload bytes stay in memory up to a threshold and spill to a temp file
+beyond it. The base64 form needed by the upload API is produced chunk by chunk
+when the request body is sent, so a large attachment never exists in memory as
+one base64 string. Once the buffer has spilled, file I/O from async code runs
+in a worker thread.
+"""
+
+import asyncio
+import base64
+import hashlib
+import tempfile
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional
+
+from app.core.config import get_config
+from app.core.exceptions import ValidationException
+from app.core.storage import DATA_DIR
+
+DEFAULT_UPLOAD_MAX_MB = 100
+DEFAULT_UPLOAD_SPILL_KB = 1024
+# Multiple of 3 so every chunk encodes without padding
+B64_READ_SIZE = 48 * 1024
+
+
+def upload_max_bytes() -> int:
+    try:
+        value = float(get_config("asset.upload_max_mb", DEFAULT_UPLOAD_MAX_MB))
+    except (TypeError, ValueError):
+        value = DEFAULT_UPLOAD_MAX_MB
+    return int(value * 1024 * 1024) if value > 0 else 0
+
+
+def upload_spill_bytes() -> int:
+    try:
+        value = int(get_config("asset.upload_spill_kb", DEFAULT_UPLOAD_SPILL_KB))
+    except (TypeError, ValueError):
+        value = DEFAULT_UPLOAD_SPILL_KB
+    return max(0, value) * 1024
+
+
+class UploadSpool:
+    """Upload bytes buffered in memory or on disk, with a size cap and running sha256."""
+
+    def __init__(
+        self,
+        filename: str,
+        mime: str,
+        max_bytes: Optional[int] = None,
+        spill_bytes: Optional[int] = None,
+    ):
+        self.filename = filename
+        self.mime = mime
+        self.size = 0
+        self.max_bytes = upload_max_bytes() if max_bytes is None else max_bytes
+        spill = upload_spill_bytes() if spill_bytes is None else spill_bytes
+        spill_dir = DATA_DIR / "tmp" / "upload"
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        self._file = tempfile.SpooledTemporaryFile(max_size=spill, dir=spill_dir)
+        self._sha256 = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise ValidationException(
+                message=(
+                    f"File too large. Maximum is {self.max_bytes // (1024 * 1024)}MB."
+                ),
+                param="file",
+                code="file_too_large",
+            )
+        self._sha256.update(chunk)
+        self._file.write(chunk)
+
+    async def write_stream(self, chunks: AsyncIterable[bytes]):
+        async for chunk in chunks:
+            if self.spilled:
+                await asyncio.to_thread(self.write, chunk)
+            else:
+                self.write(chunk)
+
+    @property
+    def spilled(self) -> bool:
+        return bool(getattr(self._file, "_rolled", False))
+
+    @property
+    def digest(self) -> str:
+        """sha256 of the raw content (same key as UploadService.content_digest)."""
+        return self._sha256.hexdigest()
+
+    @property
+    def b64_size(self) -> int:
+        return (self.size + 2) // 3 * 4
+
+    def _read_b64(self) -> bytes:
+        chunk = self._file.read(B64_READ_SIZE)
+        return base64.b64encode(chunk) if chunk else b""
+
+    def iter_b64(self) -> Iterator[bytes]:
+        """Yield the base64 encoding in chunks; can be called again for a retry."""
+        self._file.seek(0)
+        while chunk := self._read_b64():
+            yield chunk
+
+    async def aiter_b64(self) -> AsyncIterator[bytes]:
+        """Async ``iter_b64``: spilled chunks are read in a worker thread."""
+        spilled = self.spilled
+        self._file.seek(0)
+        while True:
+            if spilled:
+                chunk = await asyncio.to_thread(self._read_b64)
+            else:
+                chunk = self._read_b64()
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    async def __aenter__(self) -> "UploadSpool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+__all__ = ["UploadSpool", "upload_max_bytes", "upload_spill_bytes"]
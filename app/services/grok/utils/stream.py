@@ -2,15 +2,19 @@
 流式响应通用工具
 """
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from app.core.logger import logger
 from app.services.grok.services.model import ModelService
-from app.services.token import EffortType
+from app.services.token import EffortType, TokenLease
 
 
 async def wrap_stream_with_usage(
-    stream: AsyncGenerator, token_mgr, token: str, model: str
+    stream: AsyncGenerator,
+    token_mgr,
+    token: str,
+    model: str,
+    lease: Optional[TokenLease] = None,
 ) -> AsyncGenerator:
     """
     包装流式响应，在完成时记录使用
@@ -20,6 +24,7 @@ async def wrap_stream_with_usage(
         token_mgr: TokenManager 实例
         token: Token 字符串
         model: 模型名称
+        lease: Token 在途租约，流结束或客户端断开时释放
     """
     success = False
     try:
@@ -27,6 +32,8 @@ async def wrap_stream_with_usage(
             yield chunk
         success = True
     finally:
+        if lease:
+            lease.release()
         if success:
             try:
                 model_info = ModelService.get(model)
@@ -4,12 +4,14 @@ Upload service.
 Upload service for assets.grok.com.
 """
 
+import asyncio
 import base64
+import binascii
 import hashlib
 import mimetypes
 import re
 from pathlib import Path
-from typing import AsyncIterator, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import aiofiles
@@ -19,29 +21,30 @@ from app.core.exceptions import AppException, UpstreamException, ValidationExcep
 from app.core.logger import logger
 from app.core.storage import DATA_DIR
 from app.services.reverse.assets_upload import AssetsUploadReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session_pool import PooledSession, acquire_session
 from app.services.grok.utils.locks import _get_upload_semaphore, _file_lock
+from app.services.grok.utils.spool import UploadSpool
+from app.services.grok.utils.upload_cache import get_upload_cache
+
+
+DEFAULT_UPLOAD_REQUEST_CONCURRENT = 4
 
 
 class UploadService:
     """Assets upload service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
         self._chunk_size = 64 * 1024
 
-    async def create(self) -> ResettableSession:
-        """Create or reuse a session."""
+    async def create(self) -> PooledSession:
+        """Lease a pooled session (reused until close)."""
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = acquire_session(asset=True)
         return self._session
 
     async def close(self):
-        """Close the session."""
+        """Release the pooled session."""
         if self._session:
             await self._session.close()
             self._session = None
@@ -62,27 +65,7 @@ class UploadService:
         mime, _ = mimetypes.guess_type(filename)
         return mime or fallback
 
-    @staticmethod
-    async def _encode_b64_stream(chunks: AsyncIterator[bytes]) -> str:
-        parts = []
-        remain = b""
-        async for chunk in chunks:
-            if not chunk:
-                continue
-            chunk = remain + chunk
-            keep = len(chunk) % 3
-            if keep:
-                remain = chunk[-keep:]
-                chunk = chunk[:-keep]
-            else:
-                remain = b""
-            if chunk:
-                parts.append(base64.b64encode(chunk).decode())
-        if remain:
-            parts.append(base64.b64encode(remain).decode())
-        return "".join(parts)
-
-    async def _read_local_file(self, local_type: str, name: str) -> Tuple[str, str, str]:
+    async def _read_local_file(self, local_type: str, name: str) -> UploadSpool:
         base_dir = DATA_DIR / "tmp"
         if local_type == "video":
             local_dir = base_dir / "video"
@@ -116,12 +99,16 @@ class UploadService:
                             break
                         yield chunk
 
-            b64 = await self._encode_b64_stream(_iter_file())
-        filename = name or "file"
-        return filename, b64, mime
+            spool = UploadSpool(name or "file", mime)
+            try:
+                await spool.write_stream(_iter_file())
+            except BaseException:
+                spool.close()
+                raise
+        return spool
 
-    async def parse_b64(self, url: str) -> Tuple[str, str, str]:
-        """Fetch URL content and return (filename, base64, mime)."""
+    async def fetch_spool(self, url: str) -> UploadSpool:
+        """Fetch URL content into a spooled buffer (size-capped while streaming)."""
         try:
             app_url = get_config("app.app_url") or ""
             if app_url and self._is_url(url):
@@ -161,13 +148,18 @@ class UploadService:
                 ).split(";")[0].strip()
                 if not content_type:
                     content_type = self._infer_mime(filename)
-                if hasattr(response, "aiter_content"):
-                    b64 = await self._encode_b64_stream(response.aiter_content())
-                else:
-                    b64 = base64.b64encode(response.content).decode()
+                spool = UploadSpool(filename, content_type)
+                try:
+                    if hasattr(response, "aiter_content"):
+                        await spool.write_stream(response.aiter_content())
+                    else:
+                        spool.write(response.content)
+                except BaseException:
+                    spool.close()
+                    raise
 
                 logger.debug(f"Fetched: {url}")
-                return filename, b64, content_type
+                return spool
         except Exception as e:
             if isinstance(e, AppException):
                 raise
@@ -195,54 +187,146 @@ class UploadService:
         ext = mime.split("/")[-1] if "/" in mime else "bin"
         return f"file.{ext}", b64, mime
 
-    async def check_format(self, file_input: str) -> Tuple[str, str, str]:
-        """Check file input format and return (filename, base64, mime)."""
+    async def check_format(
+        self, file_input: str
+    ) -> Tuple[str, Union[str, UploadSpool], str]:
+        """
+        Check file input format and return (filename, content, mime).
+
+        Content is the base64 string for data URIs (already in memory) and an
+        UploadSpool for URLs, which the caller must close.
+        """
         if not isinstance(file_input, str) or not file_input.strip():
             raise ValidationException("Invalid file input: empty content")
 
         if self._is_url(file_input):
-            return await self.parse_b64(file_input)
+            spool = await self.fetch_spool(file_input)
+            return spool.filename, spool, spool.mime
 
         if file_input.startswith("data:"):
             return self.format_b64(file_input)
 
         raise ValidationException("Invalid file input: must be URL or base64")
 
-    async def upload_file(self, file_input: str, token: str) -> Tuple[str, str]:
+    @staticmethod
+    def content_digest(b64: str) -> str:
+        """sha256 of the decoded content (falls back to the raw string if not valid base64)."""
+        try:
+            data = base64.b64decode(b64)
+        except (binascii.Error, ValueError):
+            data = b64.encode()
+        return hashlib.sha256(data).hexdigest()
+
+    async def upload_file(
+        self, file_input: Union[str, UploadSpool], token: str
+    ) -> Tuple[str, str]:
         """
         Upload file to Grok.
 
         Args:
-            file_input: str, the file input.
+            file_input: str (URL or data URI), or an UploadSpool owned by the caller.
             token: str, the SSO token.
 
         Returns:
             Tuple[str, str]: The file ID and URI.
         """
         async with _get_upload_semaphore():
-            filename, b64, mime = await self.check_format(file_input)
-
-            logger.debug(
-                f"Upload prepare: filename={filename}, type={mime}, size={len(b64)}"
-            )
+            owned: Optional[UploadSpool] = None
+            if isinstance(file_input, UploadSpool):
+                filename, content, mime = file_input.filename, file_input, file_input.mime
+            else:
+                filename, content, mime = await self.check_format(file_input)
+                if isinstance(content, UploadSpool):
+                    owned = content
+
+            try:
+                if isinstance(content, UploadSpool):
+                    size = content.size
+                    spilled = " (spilled)" if content.spilled else ""
+                    logger.debug(
+                        f"Upload prepare: filename={filename}, type={mime}, bytes={size}{spilled}"
+                    )
+                else:
+                    size = len(content)
+                    logger.debug(
+                        f"Upload prepare: filename={filename}, type={mime}, size={size}"
+                    )
 
-            if not b64:
-                raise ValidationException("Invalid file input: empty content")
+                if not size:
+                    raise ValidationException("Invalid file input: empty content")
+
+                cache = get_upload_cache()
+                digest = ""
+                if cache.enabled:
+                    if isinstance(content, UploadSpool):
+                        digest = content.digest
+                    else:
+                        digest = self.content_digest(content)
+                if digest:
+                    cached = await cache.get(token, digest)
+                    if cached:
+                        logger.debug(f"Upload cache hit: {filename} -> {cached[0]}")
+                        return cached
 
-            session = await self.create()
-            response = await AssetsUploadReverse.request(
-                session,
-                token,
-                filename,
-                mime,
-                b64,
-            )
+                session = await self.create()
+                response = await AssetsUploadReverse.request(
+                    session,
+                    token,
+                    filename,
+                    mime,
+                    content,
+                )
+            finally:
+                if owned is not None:
+                    owned.close()
 
             result = response.json()
             file_id = result.get("fileMetadataId", "")
             file_uri = result.get("fileUri", "")
             logger.info(f"Upload success: {filename} -> {file_id}")
+            if digest:
+                await cache.put(token, digest, file_id, file_uri)
             return file_id, file_uri
 
+    async def upload_files(
+        self, file_inputs: List[Union[str, UploadSpool]], token: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Upload several files concurrently.
+
+        Concurrency is capped per call by ``asset.upload_request_concurrent``
+        (on top of the global upload semaphore). Results keep the input order;
+        the first failure cancels the remaining uploads and is re-raised.
+        """
+        if len(file_inputs) <= 1:
+            return [await self.upload_file(item, token) for item in file_inputs]
+
+        try:
+            limit = max(
+                1,
+                int(
+                    get_config(
+                        "asset.upload_request_concurrent",
+                        DEFAULT_UPLOAD_REQUEST_CONCURRENT,
+                    )
+                ),
+            )
+        except (TypeError, ValueError):
+            limit = DEFAULT_UPLOAD_REQUEST_CONCURRENT
+        semaphore = asyncio.Semaphore(limit)
+        results: List[Optional[Tuple[str, str]]] = [None] * len(file_inputs)
+
+        async def _upload_one(index: int, item: Union[str, UploadSpool]):
+            async with semaphore:
+                results[index] = await self.upload_file(item, token)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for index, item in enumerate(file_inputs):
+                    group.create_task(_upload_one(index, item))
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0]
+        return results
+
 
 __all__ = ["UploadService"]
@@ -0,0 +1,136 @@
+"""
+Content-addressed upload cache.
+
+Maps (token, sha256 of the decoded file bytes) -> (fileMetadataId, fileUri) so
+that attachments resent with every turn of a conversation are uploaded to
+assets.grok.com only once per token. Entries live in a local TTL/LRU map and,
+when the storage backend supports it, are shared across workers.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import get_config
+from app.core.logger import logger
+from app.core.storage import get_storage
+
+
+DEFAULT_UPLOAD_CACHE_TTL = 3600
+DEFAULT_UPLOAD_CACHE_SIZE = 2048
+
+
+def _owner_key(token: str) -> str:
+    """Stable token digest so raw tokens never end up in cache keys."""
+    if token.startswith("sso="):
+        token = token[4:]
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+class UploadCache:
+    """TTL/LRU map of uploaded file references."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, str, float]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def _ttl() -> int:
+        try:
+            return max(0, int(get_config("asset.upload_cache_ttl", DEFAULT_UPLOAD_CACHE_TTL)))
+        except (TypeError, ValueError):
+            return DEFAULT_UPLOAD_CACHE_TTL
+
+    @staticmethod
+    def _max_size() -> int:
+        try:
+            return max(1, int(get_config("asset.upload_cache_size", DEFAULT_UPLOAD_CACHE_SIZE)))
+        except (TypeError, ValueError):
+            return DEFAULT_UPLOAD_CACHE_SIZE
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl() > 0
+
+    def _remember(self, key: Tuple[str, str], file_id: str, file_uri: str, ts: float):
+        self._entries[key] = (file_id, file_uri, ts)
+        self._entries.move_to_end(key)
+        limit = self._max_size()
+        while len(self._entries) > limit:
+            self._entries.popitem(last=False)
+
+    async def get(self, token: str, digest: str) -> Optional[Tuple[str, str]]:
+        """Return (file_id, file_uri) uploaded earlier with this token, if still fresh."""
+        ttl = self._ttl()
+        if ttl <= 0:
+            return None
+
+        owner = _owner_key(token)
+        key = (owner, digest)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry:
+            file_id, file_uri, ts = entry
+            if now - ts < ttl:
+                self._entries.move_to_end(key)
+                return file_id, file_uri
+            self._entries.pop(key, None)
+
+        try:
+            ref = await get_storage().get_upload_ref(owner, digest)
+        except Exception as e:
+            logger.debug(f"Upload cache lookup failed: {e}")
+            return None
+        if not ref or not ref.get("file_id"):
+            return None
+        ts = float(ref.get("ts") or 0)
+        if now - ts >= ttl:
+            return None
+        file_id = ref["file_id"]
+        file_uri = ref.get("file_uri", "")
+        self._remember(key, file_id, file_uri, ts)
+        return file_id, file_uri
+
+    async def put(self, token: str, digest: str, file_id: str, file_uri: str):
+        """Record a successful upload."""
+        ttl = self._ttl()
+        if ttl <= 0 or not file_id:
+            return
+
+        owner = _owner_key(token)
+        ts = time.time()
+        self._remember((owner, digest), file_id, file_uri, ts)
+        try:
+            await get_storage().set_upload_ref(
+                owner,
+                digest,
+                {"file_id": file_id, "file_uri": file_uri, "ts": ts},
+                ttl,
+            )
+        except Exception as e:
+            logger.debug(f"Upload cache store failed: {e}")
+
+    async def forget_token(self, token: str):
+        """Drop every entry for a token (its assets were deleted upstream)."""
+        owner = _owner_key(token)
+        for key in [k for k in self._entries if k[0] == owner]:
+            self._entries.pop(key, None)
+        try:
+            await get_storage().clear_upload_refs(owner)
+        except Exception as e:
+            logger.debug(f"Upload cache clear failed: {e}")
+
+
+_UPLOAD_CACHE: Optional[UploadCache] = None
+
+
+def get_upload_cache() -> UploadCache:
+    global _UPLOAD_CACHE
+    if _UPLOAD_CACHE is None:
+        _UPLOAD_CACHE = UploadCache()
+    return _UPLOAD_CACHE
+
+
+__all__ = ["UploadCache", "get_upload_cache"]
@@ -175,11 +175,12 @@ class AppChatReverse:
 
             response = await retry_on_status(_do_request, extract_status=extract_status)
 
-            # Stream response
+            # Stream raw byte chunks; frames are split by the consumer's
+            # FrameDecoder, avoiding a per-line copy here.
             async def stream_response():
                 try:
-                    async for line in response.aiter_lines():
-                        yield line
+                    async for chunk in response.aiter_content():
+                        yield chunk
                 finally:
                     await session.close()
 
@@ -2,7 +2,10 @@
 Reverse interface: upload asset.
 """
 
-from typing import Any
+import inspect
+from typing import Any, AsyncIterator, Union
+
+import orjson
 from curl_cffi.requests import AsyncSession
 
 from app.core.logger import logger
@@ -14,12 +17,32 @@ from app.services.reverse.utils.retry import retry_on_status
 
 UPLOAD_API = "https://grok.com/rest/app-chat/upload-file"
 
+_STREAMING_BODY = None
+
+
+def _supports_streaming_body(session: Any) -> bool:
+    """curl_cffi accepts an async iterable ``content`` body from 0.14 on."""
+    global _STREAMING_BODY
+    if _STREAMING_BODY is None:
+        try:
+            params = inspect.signature(session.request).parameters
+            _STREAMING_BODY = "content" in params
+        except (TypeError, ValueError):
+            _STREAMING_BODY = False
+    return _STREAMING_BODY
+
 
 class AssetsUploadReverse:
     """/rest/app-chat/upload-file reverse interface."""
 
     @staticmethod
-    async def request(session: AsyncSession, token: str, fileName: str, fileMimeType: str, content: str) -> Any:
+    async def request(
+        session: AsyncSession,
+        token: str,
+        fileName: str,
+        fileMimeType: str,
+        content: Union[str, Any],
+    ) -> Any:
         """Upload asset to Grok.
 
         Args:
@@ -27,7 +50,11 @@ class AssetsUploadReverse:
             token: str, the SSO token.
             fileName: str, the name of the file.
             fileMimeType: str, the MIME type of the file.
-            content: str, the content of the file.
+            content: str, the base64 content of the file, or a spooled upload
+                exposing ``b64_size`` and ``aiter_b64()``; the latter is sent as
+                a streamed JSON body without building the base64 string. On
+                curl_cffi builds without streaming request bodies the spool is
+                still accepted, but its whole base64 payload is buffered.
 
         Returns:
             Any: The response from the request.
@@ -50,24 +77,54 @@ class AssetsUploadReverse:
             )
 
             # Build payload
-            payload = {
-                "fileName": fileName,
-                "fileMimeType": fileMimeType,
-                "content": content,
-            }
+            streamed = not isinstance(content, str)
+            if streamed:
+                # "content" is the last key: split the JSON around an empty value
+                envelope = orjson.dumps(
+                    {"fileName": fileName, "fileMimeType": fileMimeType, "content": ""}
+                )
+                prefix, suffix = envelope[:-2], envelope[-2:]
+                body_size = len(prefix) + content.b64_size + len(suffix)
+                headers["Content-Length"] = str(body_size)
+
+                async def _iter_body() -> AsyncIterator[bytes]:
+                    yield prefix
+                    async for chunk in content.aiter_b64():
+                        yield chunk
+                    yield suffix
+
+            else:
+                payload = {
+                    "fileName": fileName,
+                    "fileMimeType": fileMimeType,
+                    "content": content,
+                }
 
             # Curl Config
             timeout = get_config("asset.upload_timeout")
             browser = get_config("proxy.browser")
 
             async def _do_request():
+                if not streamed:
+                    body_kwargs = {"json": payload}
+                elif _supports_streaming_body(session):
+                    # A fresh generator per attempt so retries resend the body
+                    body_kwargs = {"content": _iter_body()}
+                else:
+                    # No streaming body support: the whole base64 payload is buffered
+                    logger.warning(
+                        "AssetsUploadReverse: curl_cffi cannot stream request bodies, "
+                        f"buffering {body_size} bytes"
+                    )
+                    chunks = [chunk async for chunk in content.aiter_b64()]
+                    body_kwargs = {"data": prefix + b"".join(chunks) + suffix}
                 response = await session.post(
                     UPLOAD_API,
                     headers=headers,
-                    json=payload,
                     proxies=proxies,
                     timeout=timeout,
                     impersonate=browser,
+                    **body_kwargs,
                 )
                 if response.status_code != 200:
                     logger.error(
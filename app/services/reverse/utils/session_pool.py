@@ -0,0 +1,272 @@
+"""
+Process-wide pooled sessions for reverse requests.
+
+Sessions are keyed by (impersonate, proxy_url) so keep-alive connections to
+grok.com / assets.grok.com are reused across requests instead of paying a new
+TLS handshake per call.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from curl_cffi.requests import AsyncSession
+
+from app.core.config import get_config
+from app.core.logger import logger
+
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_CLIENTS = 32
+DEFAULT_IDLE_SEC = 300
+DEFAULT_FAIL_THRESHOLD = 3
+
+SessionKey = Tuple[str, str]
+
+
+def _config_int(key: str, default: int, minimum: int = 1) -> int:
+    try:
+        value = int(get_config(key, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, value)
+
+
+def _reset_status_codes() -> set:
+    codes = get_config("retry.reset_session_status_codes")
+    if codes is None:
+        codes = [403]
+    if isinstance(codes, int):
+        codes = [codes]
+    return {int(code) for code in codes} if codes else set()
+
+
+class _SessionSlot:
+    """One AsyncSession shared by several leases."""
+
+    def __init__(self, key: SessionKey, max_clients: int):
+        self.key = key
+        impersonate, _ = key
+        session_kwargs: Dict[str, Any] = {"max_clients": max_clients}
+        if impersonate:
+            session_kwargs["impersonate"] = impersonate
+        self.session = AsyncSession(**session_kwargs)
+        self.max_clients = max_clients
+        self.leases = 0
+        self.fail_count = 0
+        self.retired = False
+        self.closed = False
+        self.last_used = time.monotonic()
+
+    @property
+    def full(self) -> bool:
+        return self.leases >= self.max_clients
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.session.close()
+        except Exception:
+            pass
+
+
+class PooledSession:
+    """
+    Lease on a pooled session.
+
+    Behaves like ResettableSession for callers: ``close()`` / ``async with``
+    release the lease back to the pool instead of closing the connection.
+    """
+
+    def __init__(self, pool: "SessionPool", slot: _SessionSlot):
+        self._pool = pool
+        self._slot = slot
+        self._released = False
+
+    async def _request(self, method: str, *args: Any, **kwargs: Any):
+        if self._slot.retired and not self._released:
+            # Reset semantics: swap to a fresh session before the next request
+            old_slot = self._slot
+            self._slot = self._pool._lease_slot(old_slot.key)
+            await self._pool._release(old_slot)
+        slot = self._slot
+        try:
+            response = await getattr(slot.session, method)(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._pool._record_failure(slot)
+            raise
+        self._pool._record_response(slot, response.status_code)
+        return response
+
+    async def get(self, *args: Any, **kwargs: Any):
+        return await self._request("get", *args, **kwargs)
+
+    async def post(self, *args: Any, **kwargs: Any):
+        return await self._request("post", *args, **kwargs)
+
+    async def delete(self, *args: Any, **kwargs: Any):
+        return await self._request("delete", *args, **kwargs)
+
+    async def reset(self) -> None:
+        """Retire the underlying slot; the next lease gets a fresh session."""
+        self._pool._retire(self._slot, "manual reset")
+
+    async def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        await self._pool._release(self._slot)
+
+    async def __aenter__(self) -> "PooledSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._slot.session, name)
+
+
+class SessionPool:
+    """Keyed, bounded pool of curl_cffi sessions."""
+
+    def __init__(self):
+        self._slots: Dict[SessionKey, List[_SessionSlot]] = {}
+        self._closing: set = set()
+
+    @staticmethod
+    def make_key(impersonate: Optional[str] = None, proxy: Optional[str] = None) -> SessionKey:
+        if impersonate is None:
+            impersonate = get_config("proxy.browser") or ""
+        return (impersonate or "", proxy or "")
+
+    def acquire(
+        self, impersonate: Optional[str] = None, proxy: Optional[str] = None
+    ) -> PooledSession:
+        """Lease the least-loaded healthy session for the given key."""
+        key = self.make_key(impersonate, proxy)
+        return PooledSession(self, self._lease_slot(key))
+
+    def _lease_slot(self, key: SessionKey) -> _SessionSlot:
+        pool_size = _config_int("proxy.session_pool_size", DEFAULT_POOL_SIZE)
+        max_clients = _config_int("proxy.session_max_clients", DEFAULT_MAX_CLIENTS)
+
+        self._evict_idle()
+
+        slots = self._slots.setdefault(key, [])
+        live = [s for s in slots if not s.retired]
+        slot = min(live, key=lambda s: s.leases) if live else None
+        if slot is None or (slot.full and len(live) < pool_size):
+            slot = _SessionSlot(key, max_clients)
+            slots.append(slot)
+            logger.debug(
+                f"SessionPool: new session (browser={key[0] or '-'}, proxy={'yes' if key[1] else 'no'}, "
+                f"sessions={len(live) + 1})"
+            )
+
+        slot.leases += 1
+        slot.last_used = time.monotonic()
+        return slot
+
+    def _record_response(self, slot: _SessionSlot, status_code: int) -> None:
+        if status_code in _reset_status_codes():
+            self._retire(slot, f"status {status_code}")
+            return
+        slot.fail_count = 0
+
+    def _record_failure(self, slot: _SessionSlot) -> None:
+        slot.fail_count += 1
+        threshold = _config_int("proxy.session_fail_threshold", DEFAULT_FAIL_THRESHOLD)
+        if slot.fail_count >= threshold:
+            self._retire(slot, f"{slot.fail_count} consecutive errors")
+
+    def _retire(self, slot: _SessionSlot, reason: str) -> None:
+        """Stop handing out the slot; close it once the last lease is released."""
+        if slot.retired:
+            return
+        slot.retired = True
+        logger.debug(f"SessionPool: session retired ({reason})")
+        if slot.leases == 0:
+            self._discard(slot)
+
+    def _discard(self, slot: _SessionSlot) -> None:
+        slots = self._slots.get(slot.key)
+        if slots and slot in slots:
+            slots.remove(slot)
+            if not slots:
+                self._slots.pop(slot.key, None)
+        task = asyncio.create_task(slot.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _release(self, slot: _SessionSlot) -> None:
+        slot.leases = max(0, slot.leases - 1)
+        slot.last_used = time.monotonic()
+        if slot.retired and slot.leases == 0:
+            self._discard(slot)
+
+    def _evict_idle(self) -> None:
+        idle_sec = _config_int("proxy.session_idle_sec", DEFAULT_IDLE_SEC, minimum=0)
+        if idle_sec <= 0:
+            return
+        cutoff = time.monotonic() - idle_sec
+        for slots in list(self._slots.values()):
+            for slot in list(slots):
+                if slot.leases == 0 and slot.last_used < cutoff:
+                    slot.retired = True
+                    self._discard(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = [s for slots in self._slots.values() for s in slots]
+        return {
+            "keys": len(self._slots),
+            "sessions": len(sessions),
+            "leases": sum(s.leases for s in sessions),
+            "retired": sum(1 for s in sessions if s.retired),
+        }
+
+    async def close(self) -> None:
+        """Close every pooled session (used on shutdown)."""
+        slots = [s for group in self._slots.values() for s in group]
+        self._slots = {}
+        for slot in slots:
+            await slot.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+_pool: Optional[SessionPool] = None
+
+
+def get_session_pool() -> SessionPool:
+    """Return the process-wide session pool."""
+    global _pool
+    if _pool is None:
+        _pool = SessionPool()
+    return _pool
+
+
+def base_proxy_url() -> str:
+    return get_config("proxy.base_proxy_url") or ""
+
+
+def asset_proxy_url() -> str:
+    return get_config("proxy.asset_proxy_url") or base_proxy_url()
+
+
+def acquire_session(asset: bool = False) -> PooledSession:
+    """Lease a pooled session for grok.com (or assets.grok.com when ``asset``)."""
+    proxy = asset_proxy_url() if asset else base_proxy_url()
+    return get_session_pool().acquire(proxy=proxy)
+
+
+__all__ = [
+    "PooledSession",
+    "SessionPool",
+    "get_session_pool",
+    "acquire_session",
+]
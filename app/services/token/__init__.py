@@ -10,7 +10,7 @@ from app.services.token.models import (
     EFFORT_COST,
 )
 from app.services.token.pool import TokenPool
-from app.services.token.manager import TokenManager, get_token_manager
+from app.services.token.manager import TokenManager, TokenLease, get_token_manager
 from app.services.token.service import TokenService
 from app.services.token.scheduler import TokenRefreshScheduler, get_scheduler
 
@@ -26,6 +26,7 @@ __all__ = [
     # Core
     "TokenPool",
     "TokenManager",
+    "TokenLease",
     # API
     "TokenService",
     "get_token_manager",
@@ -1,6 +1,7 @@
 """Token 管理服务"""
 
 import asyncio
+import math
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
@@ -9,6 +10,7 @@ from app.core.logger import logger
 from app.services.token.models import (
     TokenInfo,
     EffortType,
+    EFFORT_COST,
     FAIL_THRESHOLD,
     TokenStatus,
     BASIC__DEFAULT_QUOTA,
@@ -26,8 +28,12 @@ DEFAULT_REFRESH_CONCURRENCY = 5
 DEFAULT_SUPER_REFRESH_INTERVAL_HOURS = 2
 DEFAULT_REFRESH_INTERVAL_HOURS = 8
 DEFAULT_RELOAD_INTERVAL_SEC = 30
+DEFAULT_FULL_RELOAD_INTERVAL_SEC = 600
 DEFAULT_SAVE_DELAY_MS = 500
 DEFAULT_USAGE_FLUSH_INTERVAL_SEC = 5
+DEFAULT_MAX_INFLIGHT = 4
+DEFAULT_SUPER_MAX_INFLIGHT = 8
+DEFAULT_RECOVERY_COOLDOWN_SEC = 30
 
 SUPER_POOL_NAME = "ssoSuper"
 BASIC_POOL_NAME = "ssoBasic"
@@ -39,6 +45,45 @@ def _default_quota_for_pool(pool_name: str) -> int:
     return BASIC__DEFAULT_QUOTA
 
 
+class TokenLease:
+    """
+    Token 在途请求租约
+
+    持有期间计入该 Token 的在途请求数，release() 幂等；
+    未被显式释放（如流式响应从未开始迭代）时在回收时兜底释放。
+    """
+
+    __slots__ = ("token", "_manager", "_released")
+
+    def __init__(self, manager: "TokenManager", token: str):
+        self.token = token
+        self._manager = manager
+        self._released = False
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    def release(self):
+        """释放租约"""
+        if self._released:
+            return
+        self._released = True
+        self._manager._release_inflight(self.token)
+
+    def __enter__(self) -> "TokenLease":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
 class TokenManager:
     """管理 Token 的增删改查和配额同步"""
 
@@ -47,12 +92,24 @@ class TokenManager:
 
     def __init__(self):
         self.pools: Dict[str, TokenPool] = {}
+        # token -> pool_name 全局索引
+        self._token_pools: Dict[str, str] = {}
+        # token -> 在途请求数（独立于 TokenInfo，reload 后重新应用）
+        self._inflight: Dict[str, int] = {}
+        # cooling 恢复（单飞后台任务）与 Token 可用通知
+        self._recovery_task: Optional[asyncio.Task] = None
+        self._last_recovery_at = 0.0
+        self._token_freed = asyncio.Event()
         self.initialized = False
         self._save_lock = asyncio.Lock()
         self._dirty = False
         self._save_task: Optional[asyncio.Task] = None
         self._save_delay = DEFAULT_SAVE_DELAY_MS / 1000.0
         self._last_reload_at = 0.0
+        self._last_full_reload_at = 0.0
+        # 增量同步游标（后端不支持时为 None）与后台同步任务
+        self._sync_cursor: Optional[str] = None
+        self._sync_task: Optional[asyncio.Task] = None
         self._has_state_changes = False
         self._has_usage_changes = False
         self._state_change_seq = 0
@@ -76,6 +133,8 @@ class TokenManager:
         if not self.initialized:
             try:
                 storage = get_storage()
+                # 先取游标再全量加载，期间的变更会在下次增量同步中重放
+                cursor = await storage.get_tokens_cursor()
                 data = await storage.load_tokens()
 
                 # 如果后端返回 None 或空数据，尝试从本地 data/token.json 初始化后端
@@ -92,6 +151,7 @@ class TokenManager:
                         data = {}
 
                 self.pools = {}
+                self._token_pools = {}
                 for pool_name, tokens in data.items():
                     pool = TokenPool(pool_name)
                     for token_data in tokens:
@@ -109,7 +169,11 @@ class TokenManager:
                             token_info = TokenInfo(**token_data)
                             if quota_missing and pool_name == SUPER_POOL_NAME:
                                 token_info.quota = SUPER_DEFAULT_QUOTA
+                            token_info.set_inflight(
+                                self._inflight.get(token_info.token, 0)
+                            )
                             pool.add(token_info)
+                            self._token_pools.setdefault(token_info.token, pool_name)
                         except Exception as e:
                             logger.warning(
                                 f"Failed to load token in pool '{pool_name}': {e}"
@@ -119,7 +183,9 @@ class TokenManager:
                     self.pools[pool_name] = pool
 
                 self.initialized = True
+                self._sync_cursor = cursor
                 self._last_reload_at = time.monotonic()
+                self._last_full_reload_at = self._last_reload_at
                 total = sum(p.count() for p in self.pools.values())
                 logger.info(
                     f"TokenManager initialized: {len(self.pools)} pools with {total} tokens"
@@ -127,6 +193,7 @@ class TokenManager:
             except Exception as e:
                 logger.error(f"Failed to initialize TokenManager: {e}")
                 self.pools = {}
+                self._token_pools = {}
                 self.initialized = True
 
     async def reload(self):
@@ -136,7 +203,7 @@ class TokenManager:
             await self._load()
 
     async def reload_if_stale(self):
-        """在多 worker 场景下保持短周期一致性"""
+        """在多 worker 场景下保持短周期一致性（后台同步，不阻塞请求）"""
         interval = get_config("token.reload_interval_sec", DEFAULT_RELOAD_INTERVAL_SEC)
         try:
             interval = float(interval)
@@ -146,7 +213,201 @@ class TokenManager:
             return
         if time.monotonic() - self._last_reload_at < interval:
             return
-        await self.reload()
+        if self._sync_task and not self._sync_task.done():
+            return
+        self._sync_task = asyncio.create_task(self._sync())
+
+    async def _sync(self):
+        """优先增量同步变更的 Token，不支持或游标失效时回退全量加载"""
+        try:
+            if not await self._sync_changes():
+                await self.reload()
+        except Exception as e:
+            logger.error(f"Token sync failed: {e}")
+            self._last_reload_at = time.monotonic()
+
+    async def _sync_changes(self) -> bool:
+        """
+        增量同步其他 worker 写入的 Token 变更
+
+        Returns:
+            是否完成增量同步（False 表示需要全量加载）
+        """
+        if self._sync_cursor is None:
+            return False
+        full_interval = get_config(
+            "token.full_reload_interval_sec", DEFAULT_FULL_RELOAD_INTERVAL_SEC
+        )
+        try:
+            full_interval = float(full_interval)
+        except Exception:
+            full_interval = float(DEFAULT_FULL_RELOAD_INTERVAL_SEC)
+        if (
+            full_interval > 0
+            and time.monotonic() - self._last_full_reload_at >= full_interval
+        ):
+            return False
+
+        storage = get_storage()
+        changes = await storage.load_tokens_changes(self._sync_cursor)
+        if changes is None:
+            return False
+
+        async with self.__class__._lock:
+            applied = 0
+            for pool_name, tokens in changes.get("tokens", {}).items():
+                for token_data in tokens:
+                    if self._apply_remote_token(pool_name, token_data):
+                        applied += 1
+            for token_str in changes.get("deleted", []):
+                if token_str in self._dirty_tokens:
+                    continue
+                for pool in self.pools.values():
+                    pool.remove(token_str)
+                self._token_pools.pop(token_str, None)
+                applied += 1
+
+            total = changes.get("total")
+            if total is not None and total != len(self._token_pools):
+                # 有删除无法通过增量感知（如 SQL 后端），回退全量加载
+                return False
+
+            self._sync_cursor = changes.get("cursor", self._sync_cursor)
+            self._last_reload_at = time.monotonic()
+
+        if applied:
+            logger.debug(f"Token sync: applied {applied} remote changes")
+        return True
+
+    @staticmethod
+    def _apply_remote_fields(token: TokenInfo, fields: Dict):
+        """应用存储端原子操作返回的权威字段"""
+        for name, value in fields.items():
+            if name == "status":
+                try:
+                    value = TokenStatus(value)
+                except ValueError:
+                    continue
+            if getattr(token, name) != value:
+                setattr(token, name, value)
+
+    def _apply_remote_token(self, pool_name: str, token_data: Dict) -> bool:
+        """用存储中的数据替换本地 Token（本地有未落库变更时跳过）"""
+        raw_token = token_data.get("token")
+        if not isinstance(raw_token, str) or not raw_token:
+            return False
+        if raw_token.startswith("sso="):
+            raw_token = token_data["token"] = raw_token[4:]
+        if raw_token in self._dirty_tokens or raw_token in self._dirty_deletes:
+            return False
+        try:
+            token_info = TokenInfo(**token_data)
+        except Exception as e:
+            logger.warning(f"Failed to sync token in pool '{pool_name}': {e}")
+            return False
+
+        token_info.set_inflight(self._inflight.get(raw_token, 0))
+        pool = self.pools.get(pool_name)
+        if pool is None:
+            pool = self.pools[pool_name] = TokenPool(pool_name)
+        pool.add(token_info)
+
+        # Token 被移到其他池时，从旧池移除
+        previous = self._token_pools.get(raw_token)
+        if previous and previous != pool_name:
+            old_pool = self.pools.get(previous)
+            if old_pool:
+                old_pool.remove(raw_token)
+        self._token_pools[raw_token] = pool_name
+        return True
+
+    def _locate(self, raw_token: str) -> tuple[Optional[TokenPool], Optional[TokenInfo]]:
+        """通过全局索引定位 Token 所在池"""
+        pool_name = self._token_pools.get(raw_token)
+        if pool_name is not None:
+            pool = self.pools.get(pool_name)
+            if pool:
+                info = pool.get(raw_token)
+                if info:
+                    return pool, info
+        return None, None
+
+    def _max_inflight(self, pool_name: str) -> int:
+        """池内单个 Token 的在途请求上限（0 表示不限制）"""
+        if pool_name == SUPER_POOL_NAME:
+            value = get_config("token.super_max_inflight", DEFAULT_SUPER_MAX_INFLIGHT)
+        else:
+            value = get_config("token.max_inflight", DEFAULT_MAX_INFLIGHT)
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return DEFAULT_MAX_INFLIGHT
+
+    def lease(self, token_str: str) -> TokenLease:
+        """
+        为 Token 登记一个在途请求
+
+        Args:
+            token_str: Token 字符串
+
+        Returns:
+            TokenLease，请求结束（含客户端断开）时需 release
+        """
+        raw_token = token_str[4:] if token_str.startswith("sso=") else token_str
+        count = self._inflight.get(raw_token, 0) + 1
+        self._inflight[raw_token] = count
+        self._apply_inflight(raw_token, count)
+        return TokenLease(self, raw_token)
+
+    def _release_inflight(self, raw_token: str):
+        count = self._inflight.get(raw_token, 0) - 1
+        if count > 0:
+            self._inflight[raw_token] = count
+        else:
+            self._inflight.pop(raw_token, None)
+            count = 0
+        self._apply_inflight(raw_token, count)
+        self._notify_token_freed()
+
+    def _apply_inflight(self, raw_token: str, count: int):
+        """同步在途数到所有包含该 Token 的池"""
+        for pool in self.pools.values():
+            info = pool.get(raw_token)
+            if info:
+                info.set_inflight(count)
+
+    def _notify_token_freed(self):
+        """唤醒等待可用 Token 的请求"""
+        event = self._token_freed
+        self._token_freed = asyncio.Event()
+        event.set()
+
+    async def wait_for_token(self, timeout: float) -> bool:
+        """
+        等待有 Token 被释放或恢复
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            超时前是否收到通知
+        """
+        if timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._token_freed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def has_pending_capacity(self) -> bool:
+        """是否有在途请求或恢复任务可能很快释放出 Token"""
+        return bool(self._inflight) or self._recovery_running()
+
+    def get_inflight(self, token_str: str) -> int:
+        """获取 Token 当前在途请求数"""
+        raw_token = token_str[4:] if token_str.startswith("sso=") else token_str
+        return self._inflight.get(raw_token, 0)
 
     def _mark_state_change(self):
         self._has_state_changes = True
@@ -302,7 +563,9 @@ class TokenManager:
             logger.warning(f"Pool '{pool_name}' not found")
             return None
 
-        token_info = pool.select(exclude=exclude)
+        token_info = pool.select(
+            exclude=exclude, max_inflight=self._max_inflight(pool_name)
+        )
         if not token_info:
             logger.warning(f"No available token in pool '{pool_name}'")
             return None
@@ -327,7 +590,7 @@ class TokenManager:
             logger.warning(f"Pool '{pool_name}' not found")
             return None
 
-        token_info = pool.select()
+        token_info = pool.select(max_inflight=self._max_inflight(pool_name))
         if not token_info:
             logger.warning(f"No available token in pool '{pool_name}'")
             return None
@@ -403,10 +666,8 @@ class TokenManager:
     def get_pool_name_for_token(self, token_str: str) -> Optional[str]:
         """Return pool name for the given token string."""
         raw_token = token_str.replace("sso=", "")
-        for pool_name, pool in self.pools.items():
-            if pool.get(raw_token):
-                return pool_name
-        return None
+        pool, _ = self._locate(raw_token)
+        return pool.name if pool else None
 
     async def consume(
         self, token_str: str, effort: EffortType = EffortType.LOW
@@ -423,19 +684,31 @@ class TokenManager:
         """
         raw_token = token_str.replace("sso=", "")
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                old_status = token.status
-                consumed = token.consume(effort)
+        pool, token = self._locate(raw_token)
+        if token:
+            old_status = token.status
+            consumed = token.consume(effort)
+
+            # 支持原子操作的存储（Redis）直接在服务端扣减，并以服务端结果为准
+            remote = await get_storage().consume_token(
+                raw_token, pool.name, EFFORT_COST[effort]
+            )
+            if remote is not None:
+                self._apply_remote_fields(token, remote)
                 logger.debug(
-                    f"Token {raw_token[:10]}...: consumed {consumed} quota, use_count={token.use_count}"
+                    f"Token {raw_token[:10]}...: consumed {consumed} quota, "
+                    f"quota={token.quota}, use_count={token.use_count} (atomic)"
                 )
-                change_kind = "state" if token.status != old_status else "usage"
-                self._track_token_change(token, pool.name, change_kind)
-                self._schedule_save()
                 return True
 
+            logger.debug(
+                f"Token {raw_token[:10]}...: consumed {consumed} quota, use_count={token.use_count}"
+            )
+            change_kind = "state" if token.status != old_status else "usage"
+            self._track_token_change(token, pool.name, change_kind)
+            self._schedule_save()
+            return True
+
         logger.warning(f"Token {raw_token[:10]}...: not found for consumption")
         return False
 
@@ -463,13 +736,8 @@ class TokenManager:
         raw_token = token_str.replace("sso=", "")
 
         # 查找 Token 对象
-        target_token: Optional[TokenInfo] = None
-        target_pool_name: Optional[str] = None
-        for pool in self.pools.values():
-            target_token = pool.get(raw_token)
-            if target_token:
-                target_pool_name = pool.name
-                break
+        target_pool, target_token = self._locate(raw_token)
+        target_pool_name: Optional[str] = target_pool.name if target_pool else None
 
         if not target_token:
             logger.warning(f"Token {raw_token[:10]}...: not found for sync")
@@ -545,30 +813,35 @@ class TokenManager:
         """
         raw_token = token_str.replace("sso=", "")
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                if status_code == 401:
-                    threshold = get_config("token.fail_threshold", FAIL_THRESHOLD)
-                    try:
-                        threshold = int(threshold)
-                    except (TypeError, ValueError):
-                        threshold = FAIL_THRESHOLD
-                    if threshold < 1:
-                        threshold = 1
-
-                    token.record_fail(status_code, reason, threshold=threshold)
-                    logger.warning(
-                        f"Token {raw_token[:10]}...: recorded {status_code} failure "
-                        f"({token.fail_count}/{threshold}) - {reason}"
-                    )
+        pool, token = self._locate(raw_token)
+        if token:
+            if status_code == 401:
+                threshold = get_config("token.fail_threshold", FAIL_THRESHOLD)
+                try:
+                    threshold = int(threshold)
+                except (TypeError, ValueError):
+                    threshold = FAIL_THRESHOLD
+                if threshold < 1:
+                    threshold = 1
+
+                token.record_fail(status_code, reason, threshold=threshold)
+                remote = await get_storage().record_token_fail(
+                    raw_token, pool.name, reason, threshold
+                )
+                if remote is not None:
+                    self._apply_remote_fields(token, remote)
+                logger.warning(
+                    f"Token {raw_token[:10]}...: recorded {status_code} failure "
+                    f"({token.fail_count}/{threshold}) - {reason}"
+                )
+                if remote is None:
                     self._track_token_change(token, pool.name, "state")
                     self._schedule_save()
-                else:
-                    logger.info(
-                        f"Token {raw_token[:10]}...: non-auth error ({status_code}) - {reason} (not counted)"
-                    )
-                return True
+            else:
+                logger.info(
+                    f"Token {raw_token[:10]}...: non-auth error ({status_code}) - {reason} (not counted)"
+                )
+            return True
 
         logger.warning(f"Token {raw_token[:10]}...: not found for failure record")
         return False
@@ -588,19 +861,18 @@ class TokenManager:
         """
         raw_token = token_str.removeprefix("sso=")
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                old_quota = token.quota
-                token.quota = 0
-                token.status = TokenStatus.COOLING
-                logger.warning(
-                    f"Token {raw_token[:10]}...: marked as rate limited "
-                    f"(quota {old_quota} -> 0, status -> cooling)"
-                )
-                self._track_token_change(token, pool.name, "state")
-                self._schedule_save()
-                return True
+        pool, token = self._locate(raw_token)
+        if token:
+            old_quota = token.quota
+            token.quota = 0
+            token.status = TokenStatus.COOLING
+            logger.warning(
+                f"Token {raw_token[:10]}...: marked as rate limited "
+                f"(quota {old_quota} -> 0, status -> cooling)"
+            )
+            self._track_token_change(token, pool.name, "state")
+            self._schedule_save()
+            return True
 
         logger.warning(f"Token {raw_token[:10]}...: not found for rate limit marking")
         return False
@@ -630,7 +902,9 @@ class TokenManager:
             return False
 
         token_info = TokenInfo(token=token, quota=_default_quota_for_pool(pool_name))
+        token_info.set_inflight(self._inflight.get(token, 0))
         pool.add(token_info)
+        self._token_pools.setdefault(token, pool_name)
         self._track_token_change(token_info, pool_name, "state")
         await self._save(force=True)
         logger.info(f"Pool '{pool_name}': token added")
@@ -639,13 +913,12 @@ class TokenManager:
     async def mark_asset_clear(self, token: str) -> bool:
         """记录在线资产清理时间"""
         raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                info.last_asset_clear_at = int(datetime.now().timestamp() * 1000)
-                self._track_token_change(info, pool.name, "state")
-                self._schedule_save()
-                return True
+        pool, info = self._locate(raw_token)
+        if info:
+            info.last_asset_clear_at = int(datetime.now().timestamp() * 1000)
+            self._track_token_change(info, pool.name, "state")
+            self._schedule_save()
+            return True
         return False
 
     async def add_tag(self, token: str, tag: str) -> bool:
@@ -660,15 +933,14 @@ class TokenManager:
             是否成功
         """
         raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                if tag not in info.tags:
-                    info.tags.append(tag)
-                    self._track_token_change(info, pool.name, "state")
-                    self._schedule_save()
-                    logger.debug(f"Token {raw_token[:10]}...: added tag '{tag}'")
-                return True
+        pool, info = self._locate(raw_token)
+        if info:
+            if tag not in info.tags:
+                info.tags.append(tag)
+                self._track_token_change(info, pool.name, "state")
+                self._schedule_save()
+                logger.debug(f"Token {raw_token[:10]}...: added tag '{tag}'")
+            return True
         return False
 
     async def remove_tag(self, token: str, tag: str) -> bool:
@@ -683,15 +955,14 @@ class TokenManager:
             是否成功
         """
         raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                if tag in info.tags:
-                    info.tags.remove(tag)
-                    self._track_token_change(info, pool.name, "state")
-                    self._schedule_save()
-                    logger.debug(f"Token {raw_token[:10]}...: removed tag '{tag}'")
-                return True
+        pool, info = self._locate(raw_token)
+        if info:
+            if tag in info.tags:
+                info.tags.remove(tag)
+                self._track_token_change(info, pool.name, "state")
+                self._schedule_save()
+                logger.debug(f"Token {raw_token[:10]}...: removed tag '{tag}'")
+            return True
         return False
 
     async def remove(self, token: str) -> bool:
@@ -706,6 +977,12 @@ class TokenManager:
         """
         for pool_name, pool in self.pools.items():
             if pool.remove(token):
+                if self._token_pools.get(token) == pool_name:
+                    del self._token_pools[token]
+                    for other_name, other_pool in self.pools.items():
+                        if other_pool.get(token):
+                            self._token_pools[token] = other_name
+                            break
                 self._track_token_delete(token)
                 await self._save(force=True)
                 logger.info(f"Pool '{pool_name}': token removed")
@@ -739,15 +1016,14 @@ class TokenManager:
         """
         raw_token = token_str.replace("sso=", "")
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                default_quota = _default_quota_for_pool(pool.name)
-                token.reset(default_quota)
-                self._track_token_change(token, pool.name, "state")
-                await self._save(force=True)
-                logger.info(f"Token {raw_token[:10]}...: reset completed")
-                return True
+        pool, token = self._locate(raw_token)
+        if token:
+            default_quota = _default_quota_for_pool(pool.name)
+            token.reset(default_quota)
+            self._track_token_change(token, pool.name, "state")
+            await self._save(force=True)
+            logger.info(f"Token {raw_token[:10]}...: reset completed")
+            return True
 
         logger.warning(f"Token {raw_token[:10]}...: not found for reset")
         return False
@@ -775,7 +1051,89 @@ class TokenManager:
             return []
         return pool.list()
 
+    def _refresh_interval_hours(self, pool_name: str) -> float:
+        if pool_name == SUPER_POOL_NAME:
+            return get_config(
+                "token.super_refresh_interval_hours",
+                DEFAULT_SUPER_REFRESH_INTERVAL_HOURS,
+            )
+        return get_config(
+            "token.refresh_interval_hours",
+            DEFAULT_REFRESH_INTERVAL_HOURS,
+        )
+
+    def _recovery_running(self) -> bool:
+        return self._recovery_task is not None and not self._recovery_task.done()
+
+    def trigger_cooling_recovery(self) -> Optional[asyncio.Task]:
+        """
+        在后台触发 cooling Token 恢复（不阻塞请求）
+
+        单飞：已有恢复任务时直接复用；距上次恢复不足冷却时间时忽略。
+
+        Returns:
+            正在运行的恢复任务或 None
+        """
+        if self._recovery_running():
+            return self._recovery_task
+        if time.monotonic() - self._last_recovery_at < DEFAULT_RECOVERY_COOLDOWN_SEC:
+            return None
+        self._recovery_task = asyncio.create_task(self._run_recovery())
+        return self._recovery_task
+
+    async def _run_recovery(self) -> Dict[str, int]:
+        try:
+            result = await self._refresh_cooling_tokens()
+        except Exception as e:
+            logger.error(f"Cooling recovery failed: {e}")
+            result = {"checked": 0, "refreshed": 0, "recovered": 0, "expired": 0}
+        finally:
+            self._last_recovery_at = time.monotonic()
+        return result
+
+    def next_recovery_in(self) -> Optional[int]:
+        """
+        估算下一次可能有 Token 可用的秒数（用于 Retry-After）
+
+        Returns:
+            秒数，无法估计时返回 None
+        """
+        if self.has_pending_capacity():
+            return 1
+
+        now_ms = int(datetime.now().timestamp() * 1000)
+        soonest_ms: Optional[float] = None
+        for pool in self.pools.values():
+            interval_ms = self._refresh_interval_hours(pool.name) * 3600 * 1000
+            for token in pool:
+                if token.status != TokenStatus.COOLING:
+                    continue
+                if token.last_sync_at is None:
+                    wait_ms = 0
+                else:
+                    wait_ms = token.last_sync_at + interval_ms - now_ms
+                if soonest_ms is None or wait_ms < soonest_ms:
+                    soonest_ms = wait_ms
+
+        if soonest_ms is None:
+            return None
+        cooldown = DEFAULT_RECOVERY_COOLDOWN_SEC - (
+            time.monotonic() - self._last_recovery_at
+        )
+        return max(1, math.ceil(max(soonest_ms / 1000, cooldown)))
+
     async def refresh_cooling_tokens(self) -> Dict[str, int]:
+        """
+        批量刷新 cooling 状态的 Token 配额（与后台恢复任务共享同一次执行）
+
+        Returns:
+            {"checked": int, "refreshed": int, "recovered": int, "expired": int}
+        """
+        if not self._recovery_running():
+            self._recovery_task = asyncio.create_task(self._run_recovery())
+        return await asyncio.shield(self._recovery_task)
+
+    async def _refresh_cooling_tokens(self) -> Dict[str, int]:
         """
         批量刷新 cooling 状态的 Token 配额
 
@@ -785,16 +1143,7 @@ class TokenManager:
         # 收集需要刷新的 token
         to_refresh: List[tuple[str, TokenInfo]] = []
         for pool in self.pools.values():
-            if pool.name == SUPER_POOL_NAME:
-                interval_hours = get_config(
-                    "token.super_refresh_interval_hours",
-                    DEFAULT_SUPER_REFRESH_INTERVAL_HOURS,
-                )
-            else:
-                interval_hours = get_config(
-                    "token.refresh_interval_hours",
-                    DEFAULT_REFRESH_INTERVAL_HOURS,
-                )
+            interval_hours = self._refresh_interval_hours(pool.name)
             for token in pool:
                 if token.need_refresh(interval_hours):
                     to_refresh.append((pool.name, token))
@@ -842,10 +1191,11 @@ class TokenManager:
                                 f"{old_quota} -> {new_quota}, status: {old_status} -> {token_info.status}"
                             )
 
-                            return {
-                                "recovered": new_quota > 0 and old_quota == 0,
-                                "expired": False,
-                            }
+                            recovered_now = new_quota > 0 and old_quota == 0
+                            if recovered_now:
+                                # 立即唤醒等待中的请求，不等整轮刷新结束
+                                self._notify_token_freed()
+                            return {"recovered": recovered_now, "expired": False}
 
                         return {"recovered": False, "expired": False}
 
@@ -913,4 +1263,4 @@ async def get_token_manager() -> TokenManager:
     return await TokenManager.get_instance()
 
 
-__all__ = ["TokenManager", "get_token_manager"]
+__all__ = ["TokenManager", "TokenLease", "get_token_manager"]
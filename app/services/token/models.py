@@ -9,8 +9,8 @@ Token 数据模型
 """
 
 from enum import Enum
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Optional, List
+from pydantic import BaseModel, Field, PrivateAttr
 from datetime import datetime
 
 
@@ -21,6 +21,9 @@ SUPER_DEFAULT_QUOTA = 140
 # 失败阈值
 FAIL_THRESHOLD = 5
 
+# 影响池索引的字段（变更时通知所属 TokenPool）
+INDEXED_FIELDS = frozenset({"quota", "status", "_inflight"})
+
 
 class TokenStatus(str, Enum):
     """Token 状态"""
@@ -71,10 +74,30 @@ class TokenInfo(BaseModel):
     note: str = ""
     last_asset_clear_at: Optional[int] = None
 
+    # 所属池的索引回调与在途请求数（不参与序列化）
+    _on_change: Optional[Callable[["TokenInfo"], None]] = PrivateAttr(default=None)
+    _inflight: int = PrivateAttr(default=0)
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in INDEXED_FIELDS and self._on_change is not None:
+            self._on_change(self)
+
     def is_available(self) -> bool:
         """检查是否可用（状态正常且配额 > 0）"""
         return self.status == TokenStatus.ACTIVE and self.quota > 0
 
+    @property
+    def inflight(self) -> int:
+        """当前在途请求数"""
+        return self._inflight
+
+    def set_inflight(self, count: int):
+        """更新在途请求数（由 TokenManager 的租约维护）"""
+        count = max(0, int(count))
+        if count != self._inflight:
+            self._inflight = count
+
     def consume(self, effort: EffortType = EffortType.LOW) -> int:
         """
         消耗配额
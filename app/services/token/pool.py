@@ -1,11 +1,19 @@
 """Token 池管理"""
 
+import bisect
 import random
-from typing import Dict, List, Optional, Iterator
+from typing import Dict, List, Optional, Iterator, Tuple
 
 from app.services.token.models import TokenInfo, TokenStatus, TokenPoolStats
 
 
+# 索引键：(在途请求数, -剩余额度)
+IndexKey = Tuple[int, int]
+
+# 带 exclude 选择时，先随机抽样的次数，失败后再退化为过滤当前桶
+_EXCLUDE_SAMPLE_TRIES = 4
+
+
 class TokenPool:
     """Token 池（管理一组 Token）"""
 
@@ -13,48 +21,60 @@ class TokenPool:
         self.name = name
         self._tokens: Dict[str, TokenInfo] = {}
 
+        # 可用 Token 索引：(在途请求数, -quota) -> 该键下的 active Token 列表
+        self._buckets: Dict[IndexKey, List[TokenInfo]] = {}
+        # 有可用 Token 的索引键（升序：负载最低、额度最高的在前）
+        self._keys: List[IndexKey] = []
+        # token -> (所在桶键, 桶内下标)
+        self._slots: Dict[str, tuple[IndexKey, int]] = {}
+
     def add(self, token: TokenInfo):
         """添加 Token"""
+        old = self._tokens.get(token.token)
+        if old is not None and old is not token:
+            self._detach(old)
         self._tokens[token.token] = token
+        token._on_change = self._reindex
+        self._reindex(token)
 
     def remove(self, token_str: str) -> bool:
         """删除 Token"""
-        if token_str in self._tokens:
-            del self._tokens[token_str]
-            return True
-        return False
+        token = self._tokens.pop(token_str, None)
+        if token is None:
+            return False
+        self._detach(token)
+        return True
 
     def get(self, token_str: str) -> Optional[TokenInfo]:
         """获取 Token"""
         return self._tokens.get(token_str)
 
-    def select(self, exclude: set = None) -> Optional[TokenInfo]:
+    def select(self, exclude: set = None, max_inflight: int = 0) -> Optional[TokenInfo]:
         """
         选择一个可用 Token
         策略:
         1. 选择 active 状态且有配额的 token
-        2. 优先选择剩余额度最多的
-        3. 如果额度相同，随机选择（避免并发冲突）
+        2. 优先选择在途请求最少的，其次剩余额度最多的
+        3. 在途请求数达到 max_inflight（> 0 时生效）的 token 不参与选择
+        4. 如果负载与额度都相同，随机选择（避免并发冲突）
         """
-        # 选择 token
-        available = [
-            t
-            for t in self._tokens.values()
-            if t.status == TokenStatus.ACTIVE and t.quota > 0
-            and (not exclude or t.token not in exclude)
-        ]
-
-        if not available:
-            return None
+        for key in self._keys:
+            if max_inflight > 0 and key[0] >= max_inflight:
+                break
+            bucket = self._buckets[key]
+            if not exclude:
+                return random.choice(bucket)
 
-        # 找到最大额度
-        max_quota = max(t.quota for t in available)
+            for _ in range(min(_EXCLUDE_SAMPLE_TRIES, len(bucket))):
+                candidate = random.choice(bucket)
+                if candidate.token not in exclude:
+                    return candidate
 
-        # 筛选最大额度
-        candidates = [t for t in available if t.quota == max_quota]
+            candidates = [t for t in bucket if t.token not in exclude]
+            if candidates:
+                return random.choice(candidates)
 
-        # 随机选择
-        return random.choice(candidates)
+        return None
 
     def count(self) -> int:
         """Token 数量"""
@@ -86,8 +106,63 @@ class TokenPool:
         return stats
 
     def _rebuild_index(self):
-        """重建索引（预留接口，用于加载时调用）"""
-        pass
+        """重建索引（加载时调用）"""
+        self._buckets = {}
+        self._keys = []
+        self._slots = {}
+        for token in self._tokens.values():
+            self._index(token)
+
+    def _detach(self, token: TokenInfo):
+        if token._on_change == self._reindex:
+            token._on_change = None
+        self._unindex(token.token)
+
+    @staticmethod
+    def _key(token: TokenInfo) -> Optional[IndexKey]:
+        if token.status == TokenStatus.ACTIVE and token.quota > 0:
+            return (token.inflight, -token.quota)
+        return None
+
+    def _reindex(self, token: TokenInfo):
+        """Token 的 quota/status/在途数变化后原地更新索引"""
+        if self._tokens.get(token.token) is not token:
+            return
+        slot = self._slots.get(token.token)
+        key = self._key(token)
+        if slot is not None:
+            if slot[0] == key:
+                return
+            self._unindex(token.token)
+        if key is not None:
+            self._index(token)
+
+    def _index(self, token: TokenInfo):
+        key = self._key(token)
+        if key is None:
+            return
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = []
+            bisect.insort(self._keys, key)
+        self._slots[token.token] = (key, len(bucket))
+        bucket.append(token)
+
+    def _unindex(self, token_str: str):
+        slot = self._slots.pop(token_str, None)
+        if slot is None:
+            return
+        key, idx = slot
+        bucket = self._buckets[key]
+        last = bucket.pop()
+        if idx < len(bucket):
+            bucket[idx] = last
+            self._slots[last.token] = (key, idx)
+        if not bucket:
+            del self._buckets[key]
+            pos = bisect.bisect_left(self._keys, key)
+            if pos < len(self._keys) and self._keys[pos] == key:
+                self._keys.pop(pos)
 
     def __iter__(self) -> Iterator[TokenInfo]:
         return iter(self._tokens.values())
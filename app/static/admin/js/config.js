@@ -16,6 +16,13 @@ const NUMERIC_FIELDS = new Set([
   'usage_flush_interval_sec',
   'upload_concurrent',
   'upload_timeout',
+  'upload_max_mb',
+  'upload_spill_kb',
+  'upload_request_concurrent',
+  'upload_cache_ttl',
+  'upload_cache_size',
+  'context_ttl',
+  'public_session_ttl',
   'download_concurrent',
   'download_timeout',
   'list_concurrent',
@@ -25,12 +32,22 @@ const NUMERIC_FIELDS = new Set([
   'delete_timeout',
   'delete_batch_size',
   'reload_interval_sec',
+  'full_reload_interval_sec',
+  'max_inflight',
+  'super_max_inflight',
+  'wait_timeout_sec',
   'stream_timeout',
+  'stream_coalesce_ms',
+  'stream_coalesce_bytes',
   'final_timeout',
   'final_min_bytes',
   'medium_min_bytes',
   'concurrent',
-  'batch_size'
+  'batch_size',
+  'session_pool_size',
+  'session_max_clients',
+  'session_idle_sec',
+  'session_fail_threshold'
 ]);
 
 const LOCALE_MAP = {
@@ -40,6 +57,8 @@ const LOCALE_MAP = {
     "app_key": { title: "后台密码", desc: "登录 Grok2API 管理后台的密码（必填）。" },
     "public_enabled": { title: "启用功能玩法", desc: "是否启用功能玩法入口（关闭则功能玩法页面不可访问）。" },
     "public_key": { title: "Public 密码", desc: "功能玩法页面的访问密码（可选）。" },
+    "public_session_ttl": { title: "Public 会话有效期", desc: "功能玩法 start 后等待 sse/ws 连接的会话保留时间（秒）。" },
+    "public_session_store": { title: "Public 会话存储", desc: "auto：Redis 存储时多 Worker 共享；memory：仅本进程（多 Worker 时需按 grok2api_worker Cookie 做粘性路由）；storage：始终使用存储后端。" },
     "app_url": { title: "应用地址", desc: "当前 Grok2API 服务的外部访问 URL，用于文件链接访问。" },
     "image_format": { title: "图片格式", desc: "默认生成的图片格式（url 或 base64）。" },
     "video_format": { title: "视频格式", desc: "默认生成的视频格式（html 或 url，url 为处理后的链接）。" },
@@ -58,6 +77,10 @@ const LOCALE_MAP = {
     "asset_proxy_url": { title: "资源代理 URL", desc: "代理请求到 Grok 官网的静态资源（图片/视频）地址。" },
     "cf_clearance": { title: "CF Clearance", desc: "Cloudflare Clearance Cookie，用于绕过反爬虫验证。" },
     "browser": { title: "浏览器指纹", desc: "curl_cffi 浏览器指纹标识（如 chrome136）。" },
+    "session_pool_size": { title: "Session 池大小", desc: "每个（指纹, 代理）组合复用的 session 数上限。" },
+    "session_max_clients": { title: "Session 并发", desc: "单个 session 的最大并发连接数，满后新建 session。" },
+    "session_idle_sec": { title: "Session 空闲回收", desc: "空闲 session 的回收时间（秒）。" },
+    "session_fail_threshold": { title: "Session 失败阈值", desc: "session 连续网络异常多少次后重建。" },
     "user_agent": { title: "User-Agent", desc: "HTTP 请求的 User-Agent 字符串，需与浏览器指纹匹配。" }
   },
 
@@ -77,7 +100,9 @@ const LOCALE_MAP = {
     "label": "对话配置",
     "concurrent": { title: "并发上限", desc: "Reverse 接口并发上限。" },
     "timeout": { title: "请求超时", desc: "Reverse 接口超时时间（秒）。" },
-    "stream_timeout": { title: "流空闲超时", desc: "流式空闲超时时间（秒）。" }
+    "stream_timeout": { title: "流空闲超时", desc: "流式空闲超时时间（秒）。" },
+    "stream_coalesce_ms": { title: "Token 合并窗口", desc: "流式输出时将 token 合并后再发送的最长等待时间（毫秒），<think> 切换与结束时立即发送；0 表示逐 token 输出。" },
+    "stream_coalesce_bytes": { title: "Token 合并字节上限", desc: "合并的 token 累计达到该字节数时立即发送；0 表示不按字节刷新。" }
   },
 
 
@@ -85,7 +110,9 @@ const LOCALE_MAP = {
     "label": "视频配置",
     "concurrent": { title: "并发上限", desc: "Reverse 接口并发上限。" },
     "timeout": { title: "请求超时", desc: "Reverse 接口超时时间（秒）。" },
-    "stream_timeout": { title: "流空闲超时", desc: "流式空闲超时时间（秒）。" }
+    "stream_timeout": { title: "流空闲超时", desc: "流式空闲超时时间（秒）。" },
+    "context_ttl": { title: "续写上下文有效期", desc: "视频续写所需的 Token 与会话上下文的保留时间（秒）。" },
+    "context_store": { title: "续写上下文存储", desc: "auto：非本地存储时写入 Redis/SQL 供多 Worker 共享；memory：仅本进程；storage：始终使用存储后端。" }
   },
 
 
@@ -104,8 +131,14 @@ const LOCALE_MAP = {
     "label": "资产配置",
     "upload_concurrent": { title: "上传并发", desc: "上传接口的最大并发数。推荐 30。" },
     "upload_timeout": { title: "上传超时", desc: "上传接口超时时间（秒）。推荐 60。" },
+    "upload_max_mb": { title: "上传大小上限", desc: "单个上传文件的大小上限（MB，0 为不限制），拉取远程文件时边下载边校验。" },
+    "upload_spill_kb": { title: "上传落盘阈值", desc: "上传内容超过该大小（KB）时暂存到磁盘并流式编码发送，避免整文件驻留内存。" },
+    "upload_request_concurrent": { title: "单请求上传并发", desc: "同一请求内多个附件的并行上传数（同时受上传并发数限制）。" },
+    "upload_cache_ttl": { title: "上传去重有效期", desc: "同一 Token 重复上传相同内容（按 sha256）时复用已有文件 ID 的有效期（秒，0 为关闭）。Redis 存储下多实例共享。" },
+    "upload_cache_size": { title: "上传去重容量", desc: "上传去重缓存的本地最大条目数（LRU 淘汰）。" },
     "download_concurrent": { title: "下载并发", desc: "下载接口的最大并发数。推荐 30。" },
     "download_timeout": { title: "下载超时", desc: "下载接口超时时间（秒）。推荐 60。" },
+    "tee_download": { title: "边下载边返回", desc: "生成本地链接时不等待资源下载完成，请求 /v1/files 时直接转发下载中的内容。" },
     "list_concurrent": { title: "查询并发", desc: "资产查询接口的最大并发数。推荐 10。" },
     "list_timeout": { title: "查询超时", desc: "资产查询接口超时时间（秒）。推荐 60。" },
     "list_batch_size": { title: "查询批次大小", desc: "单次查询可处理的 Token 数量。推荐 10。" },
@@ -129,7 +162,11 @@ const LOCALE_MAP = {
     "fail_threshold": { title: "失败阈值", desc: "单个 Token 连续失败多少次后被标记为不可用。" },
     "save_delay_ms": { title: "保存延迟", desc: "Token 变更合并写入的延迟（毫秒）。" },
     "usage_flush_interval_sec": { title: "用量落库间隔", desc: "用量类字段写入数据库的最小间隔（秒）。" },
-    "reload_interval_sec": { title: "同步间隔", desc: "多 worker 场景下 Token 状态刷新间隔（秒）。" }
+    "reload_interval_sec": { title: "同步间隔", desc: "多 worker 场景下 Token 状态刷新间隔（秒）。" },
+    "full_reload_interval_sec": { title: "全量重载间隔", desc: "Redis/SQL 存储下仅增量同步变更的 Token，按此间隔兜底全量重载（秒，0 为仅在增量不可用时重载）。" },
+    "max_inflight": { title: "在途上限", desc: "普通 Token 单个账号同时处理的请求上限，优先调度负载最低的账号（0 为不限制）。" },
+    "super_max_inflight": { title: "Super 在途上限", desc: "Super Token 单个账号同时处理的请求上限（0 为不限制）。" },
+    "wait_timeout_sec": { title: "等待超时", desc: "无可用 Token 时等待释放或后台恢复的最长时间（秒），超时返回 429 并附带 Retry-After（0 为立即返回）。" }
   },
 
 
@@ -74,17 +74,36 @@ async def lifespan(app: FastAPI):
         scheduler = get_scheduler(interval)
         scheduler.start()
 
+    # 5. 启动批量任务引擎（接管中断的批量任务）
+    from app.core.batch import start_engine, stop_engine
+
+    start_engine()
+
+    # 6. 预先打开本地缓存索引（首次运行需扫描缓存目录，放到线程中执行）
+    from app.services.grok.utils.cache_index import get_cache_index
+
+    try:
+        await get_cache_index().aopen()
+    except Exception as e:
+        logger.warning(f"Cache index open failed: {e}")
+
     logger.info("Application startup complete.")
     yield
 
     # 关闭
     logger.info("Shutting down Grok2API...")
 
+    await stop_engine()
+
     from app.core.storage import StorageFactory
 
     if StorageFactory._instance:
         await StorageFactory._instance.close()
 
+    from app.services.reverse.utils.session_pool import get_session_pool
+
+    await get_session_pool().close()
+
     if refresh_enabled:
         scheduler = get_scheduler()
         scheduler.stop()
@@ -0,0 +1,183 @@
+"""
+/v1/files 条件请求与 Range 测试
+
+直接以 ASGI 方式调用文件路由（无需启动服务），覆盖：
+后缀区间、If-Range 不匹配、多段/无法识别的 Range 回退完整内容、越界 416、
+304 协商缓存。
+
+运行：python test_files_range.py  或  python -m pytest test_files_range.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="grok2api-test-"))
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.api.v1.files import IMAGE_DIR, router  # noqa: E402
+
+CONTENT = bytes(range(256)) * 4  # 1024 字节
+NAME = "range-test.png"
+PATH = f"/v1/files/image/{NAME}"
+
+app = FastAPI()
+app.include_router(router, prefix="/v1/files")
+
+
+class _Response:
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+async def _call(path: str, headers: dict = None) -> _Response:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (k.lower().encode(), v.encode()) for k, v in (headers or {}).items()
+        ],
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+    messages = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return _Response(start["status"], headers, body)
+
+
+def _get(headers: dict = None) -> _Response:
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = IMAGE_DIR / NAME
+    if not file_path.exists():
+        file_path.write_bytes(CONTENT)
+    return asyncio.run(_call(PATH, headers))
+
+
+def test_full_body():
+    resp = _get()
+    assert resp.status == 200
+    assert resp.body == CONTENT
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert resp.headers["etag"]
+
+
+def test_explicit_range():
+    resp = _get({"Range": "bytes=10-19"})
+    assert resp.status == 206
+    assert resp.body == CONTENT[10:20]
+    assert resp.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert resp.headers["content-length"] == "10"
+
+
+def test_open_ended_range_is_clamped():
+    resp = _get({"Range": "bytes=1000-5000"})
+    assert resp.status == 206
+    assert resp.body == CONTENT[1000:]
+    assert resp.headers["content-range"] == f"bytes 1000-1023/{len(CONTENT)}"
+
+
+def test_suffix_range():
+    resp = _get({"Range": "bytes=-100"})
+    assert resp.status == 206
+    assert resp.body == CONTENT[-100:]
+    assert resp.headers["content-range"] == f"bytes 924-1023/{len(CONTENT)}"
+
+
+def test_suffix_range_larger_than_file():
+    resp = _get({"Range": "bytes=-5000"})
+    assert resp.status == 206
+    assert resp.body == CONTENT
+
+
+def test_if_range_match_serves_range():
+    etag = _get().headers["etag"]
+    resp = _get({"Range": "bytes=0-9", "If-Range": etag})
+    assert resp.status == 206
+    assert resp.body == CONTENT[:10]
+
+
+def test_if_range_mismatch_serves_full_body():
+    resp = _get({"Range": "bytes=0-9", "If-Range": '"stale-etag"'})
+    assert resp.status == 200
+    assert resp.body == CONTENT
+
+
+def test_multi_range_falls_back_to_full_body():
+    resp = _get({"Range": "bytes=0-9,20-29"})
+    assert resp.status == 200
+    assert resp.body == CONTENT
+
+
+def test_malformed_range_serves_full_body():
+    for header in ("bytes=abc", "items=0-5"):
+        resp = _get({"Range": header})
+        assert resp.status == 200
+        assert resp.body == CONTENT
+
+
+def test_start_beyond_size_is_416():
+    resp = _get({"Range": f"bytes={len(CONTENT)}-"})
+    assert resp.status == 416
+    assert resp.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_zero_suffix_is_416():
+    resp = _get({"Range": "bytes=-0"})
+    assert resp.status == 416
+
+
+def test_if_none_match_is_304():
+    etag = _get().headers["etag"]
+    resp = _get({"If-None-Match": etag})
+    assert resp.status == 304
+    assert resp.body == b""
+    assert resp.headers["etag"] == etag
+
+
+def test_if_modified_since_is_304():
+    last_modified = _get().headers["last-modified"]
+    resp = _get({"If-Modified-Since": last_modified})
+    assert resp.status == 304
+
+
+def test_stale_if_none_match_serves_body():
+    resp = _get({"If-None-Match": '"stale-etag"'})
+    assert resp.status == 200
+    assert resp.body == CONTENT
+
+
+def test_missing_file_is_404():
+    resp = asyncio.run(_call("/v1/files/image/missing.png"))
+    assert resp.status == 404
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"ok  {name}")
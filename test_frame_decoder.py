@@ -0,0 +1,229 @@
+"""
+FrameDecoder 测试
+
+以旧的逐行解析（按行切分 → 去 ``data:`` 前缀 / 空行 / [DONE] → orjson.loads）
+为基准，校验增量解码器在各种切块方式下产出相同的帧，并覆盖批量解析失败后的
+逐行回退、跨块截断的行以及 flush() 处理无结尾换行的最后一行。
+
+运行：python test_frame_decoder.py  或  python -m pytest test_frame_decoder.py
+"""
+
+import asyncio
+import random
+from typing import Any, List
+
+import orjson
+
+from app.services.grok.utils.frames import (
+    FRAME_CARD,
+    FRAME_IMAGE,
+    FRAME_MODEL,
+    FRAME_OTHER,
+    FRAME_THINKING,
+    FRAME_TOKEN,
+    FRAME_VIDEO,
+    FrameDecoder,
+    iter_frames,
+)
+
+
+def _frame(response: Any) -> bytes:
+    return orjson.dumps({"result": {"response": response}})
+
+
+FRAMES = [
+    _frame({"token": "Hel", "isThinking": False}),
+    _frame({"token": "思考中", "isThinking": True}),
+    _frame({"token": "lo, \"world\"\\n", "responseId": "r1"}),
+    _frame({"streamingImageGenerationResponse": {"progress": 50, "imageIndex": 0}}),
+    _frame({"streamingVideoGenerationResponse": {"progress": 100, "videoUrl": "v.mp4"}}),
+    _frame({"cardAttachment": {"jsonData": "{}"}, "token": ""}),
+    _frame({"modelResponse": {"message": "done", "generatedImageUrls": []}}),
+    _frame({"token": 123}),
+    orjson.dumps({"result": {"conversation": {"conversationId": "c1"}}}),
+    orjson.dumps({"error": {"message": "x"}}),
+]
+
+EXPECTED_KINDS = [
+    FRAME_TOKEN,
+    FRAME_THINKING,
+    FRAME_TOKEN,
+    FRAME_IMAGE,
+    FRAME_VIDEO,
+    FRAME_CARD,
+    FRAME_MODEL,
+    FRAME_OTHER,
+    FRAME_OTHER,
+    FRAME_OTHER,
+]
+
+
+def _legacy_parse(stream: bytes) -> List[dict]:
+    """旧实现：逐行规范化后 orjson.loads，跳过无法解析的行"""
+    results = []
+    for raw in stream.split(b"\n"):
+        text = raw.decode("utf-8", errors="ignore").strip()
+        if not text:
+            continue
+        if text.startswith("data:"):
+            text = text[5:].strip()
+        if text == "[DONE]":
+            continue
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            results.append(data)
+    return results
+
+
+def _decode(chunks: List[bytes]) -> List[Any]:
+    decoder = FrameDecoder()
+    frames = []
+    for chunk in chunks:
+        frames.extend(decoder.feed(chunk))
+    frames.extend(decoder.flush())
+    return frames
+
+
+def _split_every(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _assert_matches_legacy(stream: bytes, chunks: List[bytes]):
+    frames = _decode(chunks)
+    assert [f.data for f in frames] == _legacy_parse(stream)
+
+
+def test_whole_stream_in_one_chunk():
+    stream = b"\n".join(FRAMES) + b"\n"
+    frames = _decode([stream])
+    assert [f.kind for f in frames] == EXPECTED_KINDS
+    _assert_matches_legacy(stream, [stream])
+
+
+def test_frame_fields():
+    frames = _decode([b"\n".join(FRAMES) + b"\n"])
+    assert frames[0].token == "Hel" and not frames[0].thinking
+    assert frames[1].token == "思考中" and frames[1].thinking
+    assert frames[2].token == 'lo, "world"\\n'
+    assert frames[3].payload == {"progress": 50, "imageIndex": 0}
+    assert frames[5].token == "" and frames[5].payload == {"jsonData": "{}"}
+    assert frames[6].payload["message"] == "done"
+    assert frames[7].token is None
+    assert frames[8].result == {"conversation": {"conversationId": "c1"}}
+    assert frames[9].result == {}
+
+
+def test_lines_split_across_chunks():
+    stream = b"\n".join(FRAMES) + b"\n"
+    for size in (1, 2, 3, 7, 16, 64, 100, 333):
+        _assert_matches_legacy(stream, _split_every(stream, size))
+
+
+def test_random_chunking():
+    stream = b"\n".join(FRAMES * 5) + b"\n"
+    rng = random.Random(23)
+    for _ in range(50):
+        chunks, pos = [], 0
+        while pos < len(stream):
+            step = rng.randint(1, 200)
+            chunks.append(stream[pos : pos + step])
+            pos += step
+        _assert_matches_legacy(stream, chunks)
+
+
+def test_multibyte_character_split_across_chunks():
+    line = _frame({"token": "汉字🙂"})
+    stream = line + b"\n"
+    cut = line.index("🙂".encode()) + 2
+    frames = _decode([stream[:cut], stream[cut:]])
+    assert [f.token for f in frames] == ["汉字🙂"]
+
+
+def test_flush_handles_last_line_without_newline():
+    stream = b"\n".join(FRAMES)
+    decoder = FrameDecoder()
+    fed = decoder.feed(stream)
+    assert len(fed) == len(FRAMES) - 1
+    flushed = decoder.flush()
+    assert [f.data for f in flushed] == [orjson.loads(FRAMES[-1])]
+    assert decoder.flush() == []
+    _assert_matches_legacy(stream, [stream])
+
+
+def test_flush_ignores_partial_garbage():
+    decoder = FrameDecoder()
+    decoder.feed(FRAMES[0] + b"\n" + FRAMES[1][:10])
+    assert decoder.flush() == []
+
+
+def test_batch_failure_falls_back_to_per_line():
+    stream = b"\n".join(
+        [
+            FRAMES[0],
+            b"",
+            b"data: " + FRAMES[1],
+            b"not json",
+            b"data: [DONE]",
+            b"  " + FRAMES[2] + b"\r",
+            FRAMES[3],
+        ]
+    ) + b"\n"
+    decoder = FrameDecoder()
+    frames = decoder.feed(stream)
+    assert not decoder._batch
+    assert [f.data for f in frames] == _legacy_parse(stream)
+    assert [f.kind for f in frames] == [
+        FRAME_TOKEN,
+        FRAME_THINKING,
+        FRAME_TOKEN,
+        FRAME_IMAGE,
+    ]
+    # 回退后后续块继续逐行解析
+    more = decoder.feed(FRAMES[4] + b"\n" + FRAMES[5] + b"\n")
+    assert [f.kind for f in more] == [FRAME_VIDEO, FRAME_CARD]
+
+
+def test_fallback_matches_legacy_under_chunking():
+    lines = []
+    for i, frame in enumerate(FRAMES * 3):
+        lines.append(b"data: " + frame if i % 4 == 1 else frame)
+        if i % 5 == 2:
+            lines.append(b"")
+        if i % 7 == 3:
+            lines.append(b"{broken")
+    stream = b"\n".join(lines) + b"\n"
+    for size in (1, 5, 50, 500):
+        _assert_matches_legacy(stream, _split_every(stream, size))
+
+
+def test_str_lines_are_treated_as_complete_lines():
+    decoder = FrameDecoder()
+    frames = []
+    for line in (FRAMES[0].decode(), "", "data: " + FRAMES[1].decode(), "data: [DONE]"):
+        frames.extend(decoder.feed(line))
+    assert [f.kind for f in frames] == [FRAME_TOKEN, FRAME_THINKING]
+
+
+def test_iter_frames():
+    stream = b"\n".join(FRAMES)
+
+    async def _source():
+        for chunk in _split_every(stream, 17):
+            yield chunk
+
+    async def _collect():
+        return [frame async for frame in iter_frames(_source())]
+
+    frames = asyncio.run(_collect())
+    assert [f.kind for f in frames] == EXPECTED_KINDS
+    assert [f.data for f in frames] == _legacy_parse(stream)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"ok  {name}")